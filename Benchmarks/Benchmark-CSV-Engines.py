@@ -0,0 +1,38 @@
+import argparse
+import os
+import sys
+import tempfile
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline.benchmark import CSV_RESULT_FIELDS, append_results, benchmark_csv_engines
+from netsim_pipeline.synthetic import generate_trace
+from netsim_pipeline.trace_features import CSV_ENGINES
+
+parser = argparse.ArgumentParser(description='Rows per second of each Packet Trace CSV engine on the same trace.')
+parser.add_argument('--trace', default=None,
+                    help='Packet Trace CSV to parse (default: a synthetic trace of --packets rows)')
+parser.add_argument('--packets', type=int, default=2_000_000,
+                    help='rows of the synthetic trace (default: 2000000)')
+parser.add_argument('--sensors', type=int, default=200,
+                    help='sensors of the synthetic trace (default: 200)')
+parser.add_argument('--engines', nargs='+', choices=CSV_ENGINES, default=CSV_ENGINES,
+                    help='engines to compare; the first is the baseline (default: pandas pyarrow)')
+parser.add_argument('--chunksize', nargs='+', type=int, default=[0],
+                    help='also stream the trace in chunks of these many rows; 0 loads it whole (default: 0)')
+parser.add_argument('--repeats', type=int, default=3,
+                    help='runs per engine; the fastest counts (default: 3)')
+parser.add_argument('--results', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'csv_engine_results.csv'),
+                    help='CSV the results are appended to (default: csv_engine_results.csv next to this script)')
+args = parser.parse_args()
+
+with tempfile.TemporaryDirectory() as work_dir:
+    trace_path = args.trace or generate_trace(os.path.join(work_dir, 'Packet Trace.csv'), args.sensors,
+                                              packets=args.packets)
+    for chunksize in args.chunksize:
+        print(f"{trace_path}, " + (f"streamed in chunks of {chunksize:,} rows" if chunksize else "loaded whole"))
+        records = benchmark_csv_engines(trace_path, args.engines, chunksize or None, args.repeats)
+        append_results(records, args.results, CSV_RESULT_FIELDS)
+
+print(f"Results appended to {args.results}")
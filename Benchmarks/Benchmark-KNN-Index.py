@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import scenarios
+from netsim_pipeline.benchmark import KNN_CONFIGS, KNN_RESULT_FIELDS, append_results, benchmark_knn_indexes
+from netsim_pipeline.classifiers import LABEL_COLUMN
+from netsim_pipeline.dataio import read_table
+
+
+def parse_config(text):
+    # INDEX or INDEX:KEY=VALUE,..., e.g. ivf:n_probe=8
+    index, _, options = text.partition(':')
+    params = dict(option.split('=', 1) for option in options.split(',') if option)
+    return index, {key: int(value) for key, value in params.items()}
+
+
+parser = argparse.ArgumentParser(description='Query latency versus accuracy of the k-NN index backends.')
+parser.add_argument('--train-data', default=None,
+                    help="normalized features to resample, Parquet, CSV or Excel (default: the manifest's Training-Data workbook)")
+parser.add_argument('--sizes', nargs='+', type=int, default=[10_000, 100_000],
+                    help='rows of the enlarged data set, 80%% indexed and 20%% queried (default: 10000 100000)')
+parser.add_argument('--configs', nargs='+', type=parse_config, default=KNN_CONFIGS, metavar='INDEX[:KEY=VALUE,...]',
+                    help='index configurations to compare (default: brute, kd_tree, ball_tree and ivf:n_probe=1..16)')
+parser.add_argument('--n-neighbors', type=int, default=5,
+                    help='neighbors per query (default: 5)')
+parser.add_argument('--results', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'knn_index_results.csv'),
+                    help='CSV the results are appended to (default: knn_index_results.csv next to this script)')
+scenarios.add_arguments(parser, selection=False)
+args = parser.parse_args()
+
+# Normalized training data whose rows are resampled to the benchmark sizes
+train_df = read_table(args.train_data or scenarios.from_args(args).train_data_path)
+X, y = train_df.drop(LABEL_COLUMN, axis=1), train_df[LABEL_COLUMN]
+for rows in args.sizes:
+    print(f"{rows:,} rows")
+    records = benchmark_knn_indexes(X, y, rows, args.configs, n_neighbors=args.n_neighbors)
+    append_results(records, args.results, KNN_RESULT_FIELDS)
+
+print(f"Results appended to {args.results}")
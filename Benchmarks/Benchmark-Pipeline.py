@@ -0,0 +1,54 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline.benchmark import append_results, run_benchmark
+from netsim_pipeline.classifiers import MODELS
+from netsim_pipeline.plots import CHARTS
+
+
+def parse_size(text):
+    # SENSORS:PACKETS, e.g. 45:100000
+    sensors, packets = text.split(':')
+    return int(sensors), int(packets)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Time and memory-profile every pipeline stage on synthetic traces of several sizes.')
+    parser.add_argument('--sizes', nargs='+', type=parse_size, default=[(45, 100_000), (45, 1_000_000)],
+                        metavar='SENSORS:PACKETS', help='network sizes to benchmark (default: 45:100000 45:1000000)')
+    parser.add_argument('--scenarios', nargs='+', default=['2', '4'],
+                        help='scenarios whose malicious sensors are simulated (default: 2 4)')
+    parser.add_argument('--seeds', type=int, default=2,
+                        help='seeds per scenario; the last one is the test set (default: 2)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes for feature count and plots (default: one per CPU)')
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=list(MODELS),
+                        help='classifiers to train and evaluate (default: all)')
+    parser.add_argument('--charts', nargs='+', choices=list(CHARTS), default=list(CHARTS),
+                        help='charts to render (default: all three)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record peak Python allocations with tracemalloc (slows the stages down)')
+    parser.add_argument('--work-dir', default=None,
+                        help='folder for the synthetic traces (default: a temporary folder, removed afterwards)')
+    parser.add_argument('--results', default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark_results.csv'),
+                        help='CSV the results are appended to (default: benchmark_results.csv next to this script)')
+    args = parser.parse_args()
+
+    for sensors, packets in args.sizes:
+        work_dir = args.work_dir or tempfile.mkdtemp(prefix='netsim-bench-')
+        base_path = os.path.join(work_dir, f'{sensors}-sensors-{packets}-packets')
+        try:
+            records = run_benchmark(base_path, sensors, packets, args.scenarios, args.seeds, args.workers,
+                                    args.models, args.charts, trace_memory=args.trace_memory)
+            append_results(records, args.results)
+        finally:
+            if args.work_dir is None:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"Results appended to {args.results}")
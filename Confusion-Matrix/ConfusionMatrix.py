@@ -1,76 +1,72 @@
-import pandas as pd
-from sklearn.metrics import confusion_matrix, accuracy_score, precision_score, recall_score, f1_score
-import matplotlib.pyplot as plt
-import seaborn as sns
-import numpy as np
+import argparse
 import os
-
-# Load data from Excel files
-predicted_df = pd.read_excel('E:\\Test-Training-Data\\Confusion-Matrix\\NaiveBayes.xlsx')
-actual_df = pd.read_excel('E:\\Test-Training-Data\\Confusion-Matrix\\Test-Data-With-Label.xlsx')
-
-# Extract labels (assuming the columns are named 'Label' or adjust as necessary)
-predicted_labels = predicted_df['Label']
-actual_labels = actual_df['Label']
-
-# Calculate the confusion matrix
-cm = confusion_matrix(actual_labels, predicted_labels)
-
-# Extract TP, TN, FP, FN
-TN, FP, FN, TP = cm.ravel()
-
-# Calculate additional metrics
-accuracy = accuracy_score(actual_labels, predicted_labels)
-precision = precision_score(actual_labels, predicted_labels)
-recall = recall_score(actual_labels, predicted_labels)
-f1 = f1_score(actual_labels, predicted_labels)
-
-# Display the confusion matrix with metrics
-fig, ax = plt.subplots(figsize=(12, 8))  # Increase figure size
-
-# Create a mask for the confusion matrix to differentiate positives and negatives
-positive_mask = np.array([[False, True], [True, False]])  # Positions for TP and FP
-negative_mask = np.array([[True, False], [False, True]])  # Positions for TN and FN
-
-# Define a custom color map with light green for positives and light sky blue for negatives
-cmap_pos = sns.color_palette(["#a1d99b"])  # Light green for positives
-cmap_neg = sns.color_palette(["#9ecae1"])  # Light sky blue for negatives
-
-# Plot confusion matrix with seaborn heatmap for positives
-sns.heatmap(cm, annot=True, fmt='d', cbar=False, ax=ax,
-            mask=~positive_mask, cmap=cmap_pos, linewidths=1, linecolor='black', 
-            annot_kws={"size": 30, "ha": "left"})
-
-# Plot confusion matrix with seaborn heatmap for negatives
-sns.heatmap(cm, annot=True, fmt='d', cbar=False, ax=ax,
-            mask=~negative_mask, cmap=cmap_neg, linewidths=1, linecolor='black', 
-            annot_kws={"size": 30, "ha": "left"})
-
-# Set the size for the x and y tick labels
-ax.tick_params(axis='both', which='major', labelsize=25)
-
-# Centering the title
-plt.title('Confusion Matrix for Naive Bayes Classifier', fontsize=30, x=0.5, y=1.1)
-
-# Adjust the metrics text and its position below the plot
-metrics_text = (f"True Positives (TP): {TP}\n"
-                f"True Negatives (TN): {TN}\n"
-                f"False Positives (FP): {FP}\n"
-                f"False Negatives (FN): {FN}\n\n"
-                f"Accuracy: {accuracy:.4f}\n"
-                f"Precision: {precision:.4f}\n"
-                f"Recall: {recall:.4f}\n"
-                f"F1 Score: {f1:.4f}")
-
-# Adding the metrics below the plot
-plt.figtext(0.5, -0.08, metrics_text, ha='center', va='center', fontsize=25, bbox=dict(facecolor='white', alpha=0.8))
-
-plt.tight_layout(rect=[0, 0.1, 1, 0.9])  # Adjust layout to make space for text below
-
-# Save the figure in the same directory as the script
-output_file = os.path.join(os.getcwd(), 'Confusion_Matrix_with_bayes.png')
-plt.savefig(output_file, bbox_inches='tight')
-
-plt.show()
-
-print(f"Confusion matrix plot saved as {output_file}")
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import dataio, instrument, scenarios
+from netsim_pipeline.classifiers import MODEL_TITLES, SAVED_MODELS, prediction_file_name
+from netsim_pipeline.evaluation import run_evaluation
+
+# Prediction workbook each classifier wrote before the classifiers handed over Parquet files
+legacy_prediction_files = {
+    'knn': 'K-NearestNeighbour.xlsx',
+    'lr': 'LogisticRegression.xlsx',
+    'nb': 'NaiveBayes.xlsx',
+    'svm': 'SupportVectorMachine.xlsx',
+}
+
+
+def parse_prediction(text):
+    # NAME=PATH, e.g. nb=NaiveBayes.xlsx
+    name, path = text.split('=', 1)
+    return name, path
+
+
+parser = argparse.ArgumentParser(description='Confusion matrices and metrics of every classifier against one load of the labelled test data.')
+parser.add_argument('--truth', default=None,
+                    help='labelled test data, Parquet, CSV or Excel (default: Test-Data-With-Label.xlsx)')
+parser.add_argument('--predictions', nargs='+', type=parse_prediction, default=None, metavar='NAME=PATH',
+                    help='prediction files to score (default: the Test_with_Predictions_* files in --format that '
+                         'exist, else the legacy workbooks)')
+parser.add_argument('--format', choices=list(dataio.FORMATS), default=dataio.DEFAULT_FORMAT,
+                    help='format of the default prediction files, as written by Classify-All.py (default: %(default)s)')
+parser.add_argument('--output-dir', default=os.getcwd(),
+                    help='folder for Evaluation_Report.xlsx and the figures (default: current directory)')
+parser.add_argument('--no-figures', dest='figures', action='store_false',
+                    help='only write the report')
+scenarios.add_arguments(parser, selection=False)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+instrumentation = instrument.from_args(args, 'confusion_matrix')
+
+# Folder holding the labelled test data and the prediction workbooks of the classifiers, from the scenario manifest
+base_path = scenarios.from_args(args).confusion_path
+
+# Labelled test data (ground truth)
+actual_file_path = args.truth or os.path.join(base_path, 'Test-Data-With-Label.xlsx')
+
+if args.predictions:
+    prediction_paths = dict(args.predictions)
+else:
+    # The classifiers' own prediction files, else the workbooks of older runs
+    prediction_paths = {}
+    for name in SAVED_MODELS:
+        for file_name in filter(None, [prediction_file_name(name, args.format), legacy_prediction_files.get(name)]):
+            if os.path.exists(os.path.join(base_path, file_name)):
+                prediction_paths[name] = os.path.join(base_path, file_name)
+                break
+if not prediction_paths:
+    sys.exit(f"No prediction files found in {base_path}")
+
+# One load of the ground truth, one pass over all models
+with instrumentation.activate(), instrumentation.stage('evaluate'):
+    metrics, report_path, figure_paths = run_evaluation(actual_file_path, prediction_paths, args.output_dir,
+                                                        MODEL_TITLES, args.figures)
+
+print(metrics.round(4).to_string())
+print(f"Evaluation report saved as {report_path}")
+for figure_path in figure_paths:
+    print(f"Confusion matrix plot saved as {figure_path}")
+instrument.finish(instrumentation, args)
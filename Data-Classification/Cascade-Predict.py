@@ -0,0 +1,110 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import dataio, instrument, scenarios
+from netsim_pipeline.artifacts import select_features
+from netsim_pipeline.cascade import (CHEAP_MODELS, DEFAULT_CHEAP, DEFAULT_EXPENSIVE, DEFAULT_HIGH, DEFAULT_LOW,
+                                     cascade_predictions, cascade_report, check_cascade)
+from netsim_pipeline.classifiers import LABEL_COLUMN, MODELS, SAVED_MODELS, load_datasets, load_models, train_models
+from netsim_pipeline.dataio import read_table, write_exports, write_table
+
+parser = argparse.ArgumentParser(description='Cheap-first cascade: the expensive classifiers only score the rows '
+                                             'the cheap one is unsure of, optionally compared with every model.')
+parser.add_argument('--cheap', choices=CHEAP_MODELS, default=DEFAULT_CHEAP,
+                    help='classifier that scores every row; the incremental ones need --saved (default: %(default)s)')
+parser.add_argument('--expensive', nargs='+', choices=SAVED_MODELS, default=DEFAULT_EXPENSIVE,
+                    help='classifiers voting on the uncertain rows; incremental ones need --saved (default: knn svm)')
+parser.add_argument('--low', type=float, default=DEFAULT_LOW,
+                    help='cheap-model malicious probability at or below which a row is benign (default: %(default)s)')
+parser.add_argument('--high', type=float, default=DEFAULT_HIGH,
+                    help='cheap-model malicious probability at or above which it is malicious (default: %(default)s)')
+parser.add_argument('--train-data', default=None,
+                    help="training features with the Label column: Parquet, CSV or Excel (default: the manifest's Training-Data.xlsx)")
+parser.add_argument('--test-data', default=None,
+                    help="test features to predict: Parquet, CSV or Excel (default: the manifest's Test-Data.xlsx)")
+parser.add_argument('--truth', default=None,
+                    help='labelled test data to compare the cascade with every model on '
+                         '(default: the Label column of the test data, if any)')
+parser.add_argument('--compare', action='store_true',
+                    help="also run every model on every row and compare accuracy and latency, against --truth, "
+                         "the test data's Label column or the manifest's Test-Data-With-Label.xlsx")
+parser.add_argument('--saved', action='store_true',
+                    help='use the models saved in --model-dir instead of training them')
+parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                    help='folder holding the saved model artifacts (default: ./models)')
+parser.add_argument('--version', type=int, default=None,
+                    help='artifact version to load with --saved (default: latest)')
+parser.add_argument('--output-dir', default=os.getcwd(),
+                    help='folder for the cascade predictions and report (default: current directory)')
+dataio.add_arguments(parser)
+scenarios.add_arguments(parser, selection=False)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+try:
+    check_cascade(args.cheap, args.expensive, args.low, args.high)
+except ValueError as error:
+    parser.error(str(error))
+untrainable = [name for name in [args.cheap] + args.expensive if name not in MODELS]
+if untrainable and not args.saved:
+    parser.error(f"{' '.join(untrainable)} can only be loaded from saved artifacts; pass --saved")
+instrumentation = instrument.from_args(args, 'cascade', cheap=args.cheap, expensive=' '.join(args.expensive),
+                                       low=args.low, high=args.high)
+
+# Training, test and labelled test data, from the scenario manifest unless given
+scenario_manifest = scenarios.from_args(args)
+train_data_path = args.train_data or scenario_manifest.train_data_path
+test_data_path = args.test_data or scenario_manifest.test_data_path
+names = [args.cheap] + args.expensive
+
+with instrumentation.activate(), instrumentation.stage('cascade'):
+    if args.saved:
+        test_df = read_table(test_data_path)
+        loaded = load_models(names, args.model_dir, args.version)
+        models = {name: clf for name, (clf, _) in loaded.items()}
+        features = select_features(test_df, loaded[args.cheap][1])
+    else:
+        X_train, y_train, test_df = load_datasets(train_data_path, test_data_path)
+        models = {name: clf for name, (clf, _) in train_models(names, X_train, y_train).items()}
+        features = test_df[X_train.columns]
+
+    # True labels for the comparison with every model; unlabelled data is only run through the cascade
+    actual = None
+    if LABEL_COLUMN in test_df.columns and args.truth is None:
+        actual = test_df[LABEL_COLUMN]
+    elif args.truth or args.compare:
+        truth_path = args.truth or os.path.join(scenario_manifest.confusion_path, 'Test-Data-With-Label.xlsx')
+        if not os.path.exists(truth_path):
+            sys.exit(f"No labelled test data at {truth_path} to compare with; pass --truth or drop --compare")
+        actual = read_table(truth_path)[LABEL_COLUMN]
+        if len(actual) != len(test_df):
+            sys.exit(f"{truth_path} has {len(actual)} rows but the test data has {len(test_df)}")
+
+    labels, escalated, stages, comparison = cascade_report(models, features, actual, args.cheap, args.expensive,
+                                                           args.low, args.high)
+
+    os.makedirs(args.output_dir, exist_ok=True)
+    extension = dataio.FORMATS[args.format]
+    predictions = cascade_predictions(test_df, labels, escalated)
+    predictions_path = write_table(predictions,
+                                   os.path.join(args.output_dir, f'Test_with_Predictions_cascade{extension}'))
+    stages_path = write_table(stages, os.path.join(args.output_dir, f'Cascade_Stages{extension}'))
+    outputs = [(predictions, predictions_path), (stages, stages_path)]
+    if comparison is not None:
+        comparison_path = write_table(comparison, os.path.join(args.output_dir, f'Cascade_Comparison{extension}'))
+        outputs.append((comparison, comparison_path))
+    for table, path in outputs:
+        write_exports(table, path, args.export)
+
+print(stages.round(4).to_string(index=False))
+if comparison is not None:
+    print()
+    print(comparison.round(4).to_string())
+print(f"Cascade predictions have been saved to {predictions_path}")
+print(f"Stage report saved as {stages_path}")
+if comparison is not None:
+    print(f"Comparison with every model saved as {comparison_path}")
+instrument.finish(instrumentation, args)
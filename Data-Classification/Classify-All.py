@@ -0,0 +1,47 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import dataio, instrument, knn_index, scenarios
+from netsim_pipeline.classifiers import MODELS, run_classifiers
+
+parser = argparse.ArgumentParser(description='Train any subset of the classifiers on one load of the data and predict the test set.')
+parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=list(MODELS),
+                    help='classifiers to run (default: all)')
+parser.add_argument('--workers', type=int, default=None,
+                    help='threads used to train the models concurrently (default: one per model)')
+parser.add_argument('--train-data', default=None,
+                    help="training features with the Label column: Parquet, CSV or Excel (default: the manifest's Training-Data.xlsx)")
+parser.add_argument('--test-data', default=None,
+                    help="test features to predict: Parquet, CSV or Excel (default: the manifest's Test-Data.xlsx)")
+parser.add_argument('--output-dir', default=os.getcwd(),
+                    help='folder for the Test_with_Predictions_* files (default: current directory)')
+parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                    help='folder where the fitted models are saved as versioned artifacts (default: ./models)')
+parser.add_argument('--no-save', dest='save', action='store_false',
+                    help='do not save the fitted models')
+knn_index.add_arguments(parser)
+dataio.add_arguments(parser)
+scenarios.add_arguments(parser, selection=False)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+instrumentation = instrument.from_args(args, 'classify', models=' '.join(args.models), workers=args.workers)
+knn_params = knn_index.from_args(args)
+
+# Training and test data shared by all classifiers, from the scenario manifest unless given
+scenario_manifest = scenarios.from_args(args)
+train_data_path = args.train_data or scenario_manifest.train_data_path
+test_data_path = args.test_data or scenario_manifest.test_data_path
+
+with instrumentation.activate(), instrumentation.stage('classify'):
+    results = run_classifiers(args.models, train_data_path, test_data_path, args.output_dir, args.workers,
+                              args.model_dir if args.save else None, {'knn': knn_params} if knn_params else None,
+                              args.format, args.export)
+
+for name, (output_file_path, fit_seconds) in results.items():
+    print(f"{name}: trained in {fit_seconds:.2f}s, predictions have been saved to {output_file_path}")
+
+instrument.finish(instrumentation, args)
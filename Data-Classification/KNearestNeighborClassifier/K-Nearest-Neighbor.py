@@ -1,36 +1,36 @@
-import pandas as pd
-from sklearn.neighbors import KNeighborsClassifier
+import argparse
 import os
-
-# Load the training data
-train_data_path = 'G:\\Test-Scenarios\\Data-Classification-of-4-Classifiers\\Training-Data.xlsx'
-train_df = pd.read_excel(train_data_path)
-
-# Split the data into features and labels
-X_train = train_df.drop('Label', axis=1)
-y_train = train_df['Label']
-
-# Train a k-NN classifier
-clf = KNeighborsClassifier(n_neighbors=5)  # You can adjust the number of neighbors
-clf.fit(X_train, y_train)
-
-# Load the test data
-test_data_path = 'G:\\Test-Scenarios\\Data-Classification-of-4-Classifiers\\Test-Data.xlsx'
-test_df = pd.read_excel(test_data_path)
-
-# Predict the labels for the test data
-predictions = clf.predict(test_df)
-
-# Add the predictions as a new column in the test data DataFrame
-test_df['Label'] = predictions
-
-# Get the current working directory
-current_directory = os.getcwd()
-
-# Define the output file path within the current working directory
-output_file_path = os.path.join(current_directory, 'Test_with_Predictions_knn.xlsx')
-
-# Save the updated DataFrame to a new Excel file
-test_df.to_excel(output_file_path, index=False)
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+from netsim_pipeline import dataio, instrument, knn_index, scenarios
+from netsim_pipeline.classifiers import run_classifiers
+
+parser = argparse.ArgumentParser(description='Train the k-NN classifier and predict the test set.')
+parser.add_argument('--model-dir', default=None,
+                    help='save the fitted model and its neighbor index as a versioned artifact in this folder')
+knn_index.add_arguments(parser)
+dataio.add_arguments(parser)
+scenarios.add_arguments(parser, selection=False)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+instrumentation = instrument.from_args(args, 'knn', knn_index=args.knn_index or 'auto')
+
+# Training and test data, from the scenario manifest
+scenario_manifest = scenarios.from_args(args)
+train_data_path = scenario_manifest.train_data_path
+test_data_path = scenario_manifest.test_data_path
+knn_params = knn_index.from_args(args)
+
+# Train a k-NN classifier and save its predictions in the current working directory
+# (see ../Classify-All.py to train several classifiers on a single load of the data)
+with instrumentation.activate(), instrumentation.stage('classify'):
+    results = run_classifiers(['knn'], train_data_path, test_data_path, os.getcwd(), model_dir=args.model_dir,
+                              model_params={'knn': knn_params} if knn_params else None,
+                              fmt=args.format, exports=args.export)
+output_file_path, _ = results['knn']
 
 print(f"Predictions have been saved to {output_file_path}")
+instrument.finish(instrumentation, args)
@@ -1,36 +1,31 @@
-import pandas as pd
-from sklearn.linear_model import LogisticRegression
+import argparse
 import os
+import sys
 
-# Load the training data
-train_data_path = 'G:\\Test-Scenarios\Data-Classification-of-4-Classifiers\\Training-Data.xlsx'
-train_df = pd.read_excel(train_data_path)
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
 
-# Split the data into features and labels
-X_train = train_df.drop('Label', axis=1)
-y_train = train_df['Label']
+from netsim_pipeline import dataio, instrument, scenarios
+from netsim_pipeline.classifiers import run_classifiers
 
-# Train a Logistic Regression classifier
-clf = LogisticRegression(random_state=42, max_iter=1000)
-clf.fit(X_train, y_train)
+parser = argparse.ArgumentParser(description='Train the logistic regression classifier and predict the test set.')
+dataio.add_arguments(parser)
+scenarios.add_arguments(parser, selection=False)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+instrumentation = instrument.from_args(args, 'lr')
 
-# Load the test data
-test_data_path = 'G:\\Test-Scenarios\\Data-Classification-of-4-Classifiers\\Test-Data.xlsx'
-test_df = pd.read_excel(test_data_path)
+# Training and test data, from the scenario manifest
+scenario_manifest = scenarios.from_args(args)
+train_data_path = scenario_manifest.train_data_path
+test_data_path = scenario_manifest.test_data_path
 
-# Predict the labels for the test data
-predictions = clf.predict(test_df)
-
-# Add the predictions as a new column in the test data DataFrame
-test_df['Label'] = predictions
-
-# Get the current working directory
-current_directory = os.getcwd()
-
-# Define the output file path within the current working directory
-output_file_path = os.path.join(current_directory, 'Test_with_Predictions_LR.xlsx')
-
-# Save the updated DataFrame to a new Excel file
-test_df.to_excel(output_file_path, index=False)
+# Train a Logistic Regression classifier and save its predictions in the current working directory
+# (see ../Classify-All.py to train several classifiers on a single load of the data)
+with instrumentation.activate(), instrumentation.stage('classify'):
+    results = run_classifiers(['lr'], train_data_path, test_data_path, os.getcwd(), fmt=args.format,
+                              exports=args.export)
+output_file_path, _ = results['lr']
 
 print(f"Predictions have been saved to {output_file_path}")
+instrument.finish(instrumentation, args)
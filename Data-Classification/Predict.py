@@ -0,0 +1,39 @@
+import argparse
+import os
+import sys
+import time
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import dataio, scenarios
+from netsim_pipeline.classifiers import MODELS, SAVED_MODELS, predict_saved
+
+parser = argparse.ArgumentParser(description='Score data with previously saved classifiers, without refitting them.')
+parser.add_argument('--models', nargs='+', choices=SAVED_MODELS, default=list(MODELS),
+                    help='saved classifiers to use, including the incremental sgd_lr, sgd_svm and incremental_nb '
+                         '(default: the four batch classifiers)')
+parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                    help='folder holding the saved model artifacts (default: ./models)')
+parser.add_argument('--version', type=int, default=None,
+                    help='artifact version to load (default: latest)')
+parser.add_argument('--input', default=None,
+                    help="features to score: Parquet, CSV or Excel (default: the manifest's Test-Data workbook)")
+parser.add_argument('--output-dir', default=os.getcwd(),
+                    help='folder for the Test_with_Predictions_* files (default: current directory)')
+parser.add_argument('--n-probe', type=int, default=None,
+                    help='cells scanned per query by a saved ivf k-NN index (default: the value it was saved with)')
+dataio.add_arguments(parser)
+scenarios.add_arguments(parser, selection=False)
+args = parser.parse_args()
+
+# Test data to score
+test_data_path = args.input or scenarios.from_args(args).test_data_path
+
+start = time.perf_counter()
+paths = predict_saved(args.models, test_data_path, args.output_dir, args.model_dir, args.version,
+                      {'knn': {'n_probe': args.n_probe}} if args.n_probe else None, args.format, args.export)
+
+for name, output_file_path in paths.items():
+    print(f"{name}: predictions have been saved to {output_file_path}")
+print(f"Scored with {len(paths)} saved models in {time.perf_counter() - start:.2f}s")
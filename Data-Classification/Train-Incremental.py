@@ -0,0 +1,65 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import instrument, scenarios
+from netsim_pipeline.incremental import (ARTIFACT_NAMES, CHECKPOINT_FILE_NAME, INCREMENTAL_MODELS, checkpoint_epochs,
+                                         save_incremental, seed_batches, train_incremental)
+
+parser = argparse.ArgumentParser(description='Train the classifiers incrementally on every seed of the sweep, with bounded memory.')
+parser.add_argument('--models', nargs='+', choices=sorted(INCREMENTAL_MODELS), default=list(INCREMENTAL_MODELS),
+                    help='classifiers to train with partial_fit (default: all)')
+parser.add_argument('--batch-seeds', type=int, default=8,
+                    help='seeds loaded per training batch (default: 8)')
+parser.add_argument('--epochs', type=int, default=1,
+                    help='passes over all batches (default: 1)')
+parser.add_argument('--checkpoint', default=os.path.join(os.getcwd(), CHECKPOINT_FILE_NAME),
+                    help=f'checkpoint file to resume from and write to (default: ./{CHECKPOINT_FILE_NAME})')
+parser.add_argument('--checkpoint-every', type=int, default=1,
+                    help='batches between checkpoints (default: 1)')
+parser.add_argument('--restart', action='store_true',
+                    help='ignore an existing checkpoint and train from scratch')
+parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                    help='folder where the trained models are saved as versioned artifacts (default: ./models)')
+parser.add_argument('--no-save', dest='save', action='store_false',
+                    help='do not save the trained models')
+scenarios.add_arguments(parser)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+instrumentation = instrument.from_args(args, 'train_incremental', models=' '.join(args.models),
+                                       batch_seeds=args.batch_seeds, epochs=args.epochs)
+
+# Scenario folders whose seeds are trained on (the merged ones) and their ground truth, from the scenario manifest
+scenario_manifest = scenarios.from_args(args)
+base_path = scenario_manifest.base_path
+
+if args.restart and os.path.exists(args.checkpoint):
+    os.remove(args.checkpoint)
+
+# A checkpoint that already finished the requested epochs leaves nothing to train or save
+epochs_done = checkpoint_epochs(args.checkpoint)
+if epochs_done >= args.epochs:
+    print(f"{args.checkpoint} already finished {epochs_done} epochs; nothing to train. "
+          f"Pass --epochs above {epochs_done} to continue or --restart to train from scratch")
+    sys.exit(0)
+
+batches = seed_batches(base_path, scenario_manifest.merge_scenarios, args.batch_seeds)
+if not batches:
+    sys.exit(f"No Sensor_Message_Counts.csv found under {base_path}")
+
+with instrumentation.activate(), instrumentation.stage('train'):
+    try:
+        models, state = train_incremental(args.models, batches, args.checkpoint, args.epochs,
+                                          args.checkpoint_every, scenario_manifest.malicious_map())
+    except ValueError as error:
+        sys.exit(str(error))
+
+print(f"Trained on {state['rows_seen']} sensor rows in {state['batches_seen']} batches "
+      f"({state['epoch']} epochs, {state['seconds']:.2f}s)")
+if args.save:
+    for name, path in save_incremental(models, state, args.model_dir).items():
+        print(f"{name}: incrementally trained model saved to {path} (use it with --models {ARTIFACT_NAMES[name]})")
+instrument.finish(instrumentation, args)
@@ -0,0 +1,63 @@
+import argparse
+import os
+import sys
+import time
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import instrument, scenarios
+from netsim_pipeline.classifiers import MODELS, load_training_data
+from netsim_pipeline.tuning import save_best, tune_models
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Cross-validated hyperparameter search over the classifiers, in parallel.')
+    parser.add_argument('--models', nargs='+', choices=sorted(MODELS), default=list(MODELS),
+                        help='classifiers to tune (default: all)')
+    parser.add_argument('--train-data', default=None,
+                        help="training features with the Label column: Parquet, CSV or Excel "
+                             "(default: the manifest's Training-Data.xlsx)")
+    parser.add_argument('--search', choices=['grid', 'random'], default='grid',
+                        help='try the full grid or a random sample of it (default: grid)')
+    parser.add_argument('--n-iter', type=int, default=20,
+                        help='candidates per model for the random search (default: 20)')
+    parser.add_argument('--folds', type=int, default=5,
+                        help='cross-validation folds (default: 5)')
+    parser.add_argument('--scoring', default='f1',
+                        help='sklearn scorer to maximize (default: f1 of the malicious class)')
+    parser.add_argument('--eta', type=float, default=2,
+                        help='keep the best 1/eta of the candidates after each fold (default: 2)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='worker processes (default: one per CPU)')
+    parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                        help='folder where the tuned models are saved as versioned artifacts (default: ./models)')
+    parser.add_argument('--no-save', dest='save', action='store_false',
+                        help='do not save the tuned models')
+    parser.add_argument('--results', default=os.path.join(os.getcwd(), 'Tuning_Results.csv'),
+                        help='timing/score table of every candidate (default: ./Tuning_Results.csv)')
+    scenarios.add_arguments(parser, selection=False)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation = instrument.from_args(args, 'tune', models=' '.join(args.models), search=args.search)
+
+    # Training data the hyperparameters are cross-validated on, from the scenario manifest unless given
+    train_data_path = args.train_data or scenarios.from_args(args).train_data_path
+
+    start = time.perf_counter()
+    with instrumentation.activate(), instrumentation.stage('tune'):
+        X_train, y_train = load_training_data(train_data_path)
+        try:
+            table, best = tune_models(args.models, X_train, y_train, args.search, args.n_iter, args.folds,
+                                      args.scoring, args.eta, args.workers)
+        except ValueError as error:
+            sys.exit(f"{train_data_path}: {error}")
+    table.to_csv(args.results, index=False)
+
+    for name, (_, params, score, seconds) in best.items():
+        print(f"{name}: best {args.scoring} {score:.4f} with {params} ({seconds:.1f}s)")
+    if args.save:
+        for name, path in save_best(best, X_train.columns, args.model_dir, args.scoring).items():
+            print(f"{name}: tuned model saved to {path}")
+    print(f"Scores and timings of every candidate saved to {args.results} "
+          f"({len(table)} candidates in {time.perf_counter() - start:.1f}s)")
+    instrument.finish(instrumentation, args)
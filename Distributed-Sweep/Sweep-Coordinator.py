@@ -0,0 +1,110 @@
+import argparse
+import os
+import sys
+import time
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import dataio, instrument, scenarios
+from netsim_pipeline.graph_features import graph_inputs
+from netsim_pipeline.manifest import Manifest, record_results, stale_tasks
+from netsim_pipeline.merge import counts_inputs, merge_tables, merged_table_paths, write_merged_tables
+from netsim_pipeline.plots import CHARTS
+from netsim_pipeline.runner import summarize
+from netsim_pipeline.trace_features import CSV_ENGINES, DEFAULT_CSV_ENGINE
+from netsim_pipeline.workqueue import (DEFAULT_LEASE_SECONDS, DEFAULT_MAX_ATTEMPTS, QUEUE_FILE_NAME, TASK_KINDS,
+                                       WorkQueue, start_workers, task_outputs, wait_for)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Queue the sweep for workers on any machine, wait for them and merge the results.')
+    parser.add_argument('--tasks', nargs='+', choices=list(TASK_KINDS), default=['count'],
+                        help='kinds of per-seed task to queue (default: count); count_graph also writes the graph features')
+    parser.add_argument('--queue', default=None,
+                        help=f'SQLite queue file shared with the workers (default: {QUEUE_FILE_NAME} in the base path)')
+    parser.add_argument('--charts', nargs='+', choices=list(CHARTS), default=list(CHARTS),
+                        help='charts the plot tasks render (default: all three)')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream each Packet Trace in chunks of this many rows instead of loading it whole')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help='parse the CSV every time instead of using the Parquet cache next to each trace')
+    parser.add_argument('--csv-engine', choices=CSV_ENGINES, default=DEFAULT_CSV_ENGINE,
+                        help='CSV parser for traces read without the cache; pyarrow is multithreaded (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=0,
+                        help='worker processes to run on this machine as well (default: 0, only remote workers)')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help='seconds a silent worker keeps a task before it is handed out again (default: %(default)s)')
+    parser.add_argument('--max-attempts', type=int, default=DEFAULT_MAX_ATTEMPTS,
+                        help='attempts per task before it is marked failed (default: %(default)s)')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='seconds between queue progress checks (default: %(default)s)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only queue seeds whose outputs are out of date with their Packet Trace')
+    parser.add_argument('--resume', action='store_true',
+                        help='keep the state of tasks already in the queue instead of running them again')
+    parser.add_argument('--no-merge', dest='merge', action='store_false',
+                        help='do not merge the counts into the normalized dataset at the end')
+    dataio.add_arguments(parser)
+    scenarios.add_arguments(parser)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+
+    # Test-Scenarios folder, scenarios to process and to merge, from the scenario manifest
+    scenario_manifest = scenarios.from_args(args)
+    base_path = scenario_manifest.base_path
+    queue_path = args.queue or os.path.join(base_path, QUEUE_FILE_NAME)
+    instrumentation = instrument.from_args(args, 'sweep_coordinator', tasks=' '.join(args.tasks), workers=args.workers)
+
+    # Keyword arguments of each kind's task function, stored with the tasks
+    task_params = {kind: {'chunksize': args.chunksize, 'cache': args.cache, 'engine': args.csv_engine}
+                   for kind in args.tasks}
+    if 'plot' in task_params:
+        task_params['plot'] = {'malicious_map': scenario_manifest.malicious_map(), 'charts': args.charts,
+                               'cache': args.cache}
+
+    # Queue every (scenario, seed) task of every kind; the largest traces are leased first
+    tasks = scenario_manifest.seed_tasks()
+    manifest = Manifest(base_path)
+    queue = WorkQueue(queue_path)
+    for kind in args.tasks:
+        kind_tasks = tasks
+        if args.incremental:
+            stale = {task.seed_path for name in task_outputs(kind, task_params[kind])
+                     for task in stale_tasks(manifest, tasks, name)}
+            kind_tasks = [task for task in tasks if task.seed_path in stale]
+        queued = queue.submit(kind, kind_tasks, task_params[kind], args.max_attempts, base_path, args.resume)
+        print(f'{kind}: {queued} of {len(tasks)} seeds queued')
+    print(f'Start workers with: Sweep-Worker.py --queue "{queue_path}" [--base-path <their mount of {base_path}>]')
+
+    start = time.perf_counter()
+    with instrumentation.activate():
+        processes = start_workers(queue_path, args.workers, lease_seconds=args.lease_seconds,
+                                  poll_interval=args.poll_interval)
+        with instrumentation.stage('wait'):
+            wait_for(queue, args.tasks, args.poll_interval)
+        for process in processes:
+            process.join()
+
+        # Record the outputs for incremental runs and report the failures
+        for kind in args.tasks:
+            results = queue.results(kind, base_path)
+            for name in task_outputs(kind, task_params[kind]):
+                record_results(manifest, results, name)
+            print(f'{kind}: ' + summarize(results, time.perf_counter() - start))
+
+        # Merge the per-seed counts (and graph features) of the merged scenarios into the normalized dataset
+        if args.merge:
+            with instrumentation.stage('merge') as info:
+                inputs = counts_inputs(base_path, scenario_manifest.merge_scenarios)
+                graph_files = (graph_inputs(base_path, scenario_manifest.merge_scenarios)
+                               if {'count_graph', 'graph'} & set(args.tasks) else None)
+                tables = merge_tables(inputs, graph_files)
+                paths = write_merged_tables(tables, base_path, args.format, args.export)
+                info['rows'] = len(tables['features'])
+            input_paths = [file_path for _, _, file_path in inputs + (graph_files or [])]
+            for output_paths in merged_table_paths(base_path, args.format, args.export).values():
+                for path in output_paths:
+                    manifest.record(path, input_paths)
+            manifest.save()
+            print(f"Normalized data for {len(tables['features'])} sensors saved to {paths['features']}")
+    instrument.finish(instrumentation, args)
@@ -0,0 +1,43 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import instrument
+from netsim_pipeline.workqueue import DEFAULT_LEASE_SECONDS, run_worker, start_workers
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run sweep tasks from a coordinator\'s queue until it is drained.')
+    parser.add_argument('--queue', required=True,
+                        help='SQLite queue file written by Sweep-Coordinator.py')
+    parser.add_argument('--base-path', default=None,
+                        help="this machine's path of the Test-Scenarios folder (default: the coordinator's)")
+    parser.add_argument('--processes', type=int, default=1,
+                        help='worker processes to run on this machine (default: 1)')
+    parser.add_argument('--worker-id', default=None,
+                        help='name recorded with the leases, suffixed -0, -1, ... with several --processes '
+                             '(default: host name and process ID)')
+    parser.add_argument('--lease-seconds', type=float, default=DEFAULT_LEASE_SECONDS,
+                        help='lease length, renewed while a task runs (default: %(default)s)')
+    parser.add_argument('--poll-interval', type=float, default=2.0,
+                        help='seconds between polls while other workers hold the remaining tasks (default: %(default)s)')
+    parser.add_argument('--idle-timeout', type=float, default=None,
+                        help='stop after this many seconds without a task (default: wait until the queue is drained)')
+    parser.add_argument('--max-tasks', type=int, default=None,
+                        help='stop after this many tasks per process')
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    instrumentation = instrument.from_args(args, 'sweep_worker', processes=args.processes)
+
+    options = {'lease_seconds': args.lease_seconds, 'poll_interval': args.poll_interval,
+               'idle_timeout': args.idle_timeout, 'max_tasks': args.max_tasks}
+    with instrumentation.activate(), instrumentation.stage('work'):
+        if args.processes == 1:
+            ran = run_worker(args.queue, args.base_path, args.worker_id, **options)
+            print(f'Ran {ran} tasks')
+        else:
+            for process in start_workers(args.queue, args.processes, args.base_path, args.worker_id, **options):
+                process.join()
+    instrument.finish(instrumentation, args)
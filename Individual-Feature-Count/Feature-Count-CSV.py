@@ -1,97 +1,83 @@
-import pandas as pd
+import argparse
 import os
-
-# Define the base path for test scenarios
-base_path = 'G:\\Test-Scenarios'
-
-# Function to count sent and received messages for a given packet type
-def count_messages(df, packet_type, control_packet_name):
-    # Filter for the specified packet type and status
-    control_packets = df[(df['PACKET_TYPE'] == packet_type) & (df['PACKET_STATUS'] == 'Successful')]
-
-    # Filter specific control packet messages
-    specific_packets = control_packets[control_packets['CONTROL_PACKET_TYPE/APP_NAME'] == control_packet_name]
-
-    # Count messages sent by each sensor
-    sent_count = specific_packets[~specific_packets['SOURCE_ID'].str.contains('SINKNODE|ROUTER', case=False)]['SOURCE_ID'].str.replace('SENSOR-', 'S-').value_counts()
-
-    # Count messages received by each sensor
-    received_count = specific_packets[~specific_packets['RECEIVER_ID'].str.contains('SINKNODE|ROUTER', case=False)]['RECEIVER_ID'].str.replace('SENSOR-', 'S-').value_counts()
-
-    # Combine the data
-    combined_counts = pd.DataFrame({
-        f'{control_packet_name}_Sent': sent_count,
-        f'{control_packet_name}_Received': received_count
-    }).fillna(0).astype(int)  # Fill NaNs with 0 and ensure the counts are integers
-
-    return combined_counts
-
-# Iterate over each main folder (e.g., '2', '3', ...)
-for folder in range(2, 16):
-    folder_name = str(folder)
-    folder_path = os.path.join(base_path, folder_name)
-    
-    # Check if the folder exists
-    if not os.path.isdir(folder_path):
-        continue
-    
-    # Iterate over each subfolder (e.g., 'seed1', 'seed2', ...)
-    for subfolder in os.listdir(folder_path):
-        subfolder_path = os.path.join(folder_path, subfolder)
-        file_path = os.path.join(subfolder_path, 'Packet Trace.csv')
-        
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            continue
-        
-        # Load the packet trace CSV file
-        df = pd.read_csv(file_path, encoding='latin1')
-
-        # Verify the required columns exist
-        if not {'PACKET_TYPE', 'CONTROL_PACKET_TYPE/APP_NAME', 'SOURCE_ID', 'RECEIVER_ID', 'PACKET_STATUS'}.issubset(df.columns):
-            print(f"Required columns are missing from the DataFrame in folder {folder_name}, subfolder {subfolder}.")
-            continue
-
-        # Count DAO and DIO messages
-        dao_counts = count_messages(df, 'Control_Packet', 'DAO')
-        dio_counts = count_messages(df, 'Control_Packet', 'DIO')
-
-        # Merge both counts
-        all_counts = pd.concat([dao_counts, dio_counts], axis=1).fillna(0).astype(int)
-
-        # Filter Sensing packets
-        sensing_packets = df[(df['PACKET_TYPE'] == 'Sensing') & (df['PACKET_STATUS'] == 'Successful')]
-
-        # Abbreviate the sensor names
-        sensing_packets['SOURCE_ID'] = sensing_packets['SOURCE_ID'].str.replace('SENSOR-', 'S-')
-        sensing_packets['RECEIVER_ID'] = sensing_packets['RECEIVER_ID'].str.replace('SENSOR-', 'S-')
-
-        # Count the packets received by each sensor
-        sensor_receive_counts = sensing_packets[sensing_packets['RECEIVER_ID'].str.contains('S-', na=False)]['RECEIVER_ID'].value_counts()
-
-        # Add a total packets received column
-        all_counts['Packet_Received'] = sensor_receive_counts.reindex(all_counts.index, fill_value=0).astype(int)
-
-        # Sort by sensor IDs
-        def extract_sensor_number(name):
-            # If 'Sensor' is found in the column name, extract the number
-            if 'Sensor' in name:
-                return int(name.split('Sensor')[1])
-            return float('inf')
-
-        # Reindex based on sensor numbers
-        all_counts = all_counts.reindex(sorted(all_counts.columns, key=extract_sensor_number), axis=1)
-
-        # Add a prefix 'Sensor' to each index
-        all_counts.index = ['Sensor' + idx.split('-')[1] for idx in all_counts.index]
-
-        # Transpose the DataFrame
-        all_counts = all_counts.T
-
-        # Generate output file path in the same directory as input file
-        output_file_path = os.path.join(subfolder_path, 'Sensor_Message_Counts.csv')
-
-        # Save the transposed data to a CSV file
-        all_counts.to_csv(output_file_path)
-
-        print(f'Successfully saved the transposed counts to {output_file_path}')
+import sys
+import time
+from functools import partial
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import instrument, scenarios
+from netsim_pipeline.graph_features import GRAPH_FILE_NAME, count_graph_frames, count_graph_seed
+from netsim_pipeline.manifest import Manifest, record_results, stale_tasks
+from netsim_pipeline.runner import run_pipelined, run_tasks, summarize
+from netsim_pipeline.trace_features import (COUNTS_FILE_NAME, CSV_ENGINES, DEFAULT_CSV_ENGINE, count_seed,
+                                            count_seed_frames, read_seed_frames)
+
+if __name__ == '__main__':
+    # Optional streaming mode (fixed-size chunks, flat memory), the columnar trace cache and the worker count
+    parser = argparse.ArgumentParser(description='Count DAO/DIO/sensing packets per sensor for every seed.')
+    parser.add_argument('--chunksize', type=int, default=None,
+                        help='stream each Packet Trace in chunks of this many rows instead of loading it whole')
+    parser.add_argument('--no-cache', dest='cache', action='store_false',
+                        help='parse the CSV every time instead of using the Parquet cache next to each trace')
+    parser.add_argument('--csv-engine', choices=CSV_ENGINES, default=DEFAULT_CSV_ENGINE,
+                        help='CSV parser for traces read without the cache; pyarrow is multithreaded (default: %(default)s)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per CPU, 1 runs in-process)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only recount seeds whose Packet Trace changed since their counts were written')
+    parser.add_argument('--prefetch', type=int, default=None, metavar='DEPTH',
+                        help='read up to DEPTH frames (traces, or chunks with --chunksize) ahead on a background '
+                             'thread while the current seed is counted; useful on network storage')
+    parser.add_argument('--graph', action='store_true',
+                        help='also write Sensor_Graph_Features.csv (degrees, fan-in concentration, PageRank) '
+                             'from the same read of each trace')
+    scenarios.add_arguments(parser)
+    instrument.add_arguments(parser)
+    args = parser.parse_args()
+    # Test-Scenarios folder and scenarios to process, from the scenario manifest
+    scenario_manifest = scenarios.from_args(args)
+    base_path = scenario_manifest.base_path
+    instrumentation = instrument.from_args(args, 'feature_count', chunksize=args.chunksize, cache=args.cache,
+                                           engine=args.csv_engine, workers=args.workers, graph=args.graph,
+                                           prefetch=args.prefetch)
+    # Per-seed outputs and the runner task that writes them
+    output_names = [COUNTS_FILE_NAME, GRAPH_FILE_NAME] if args.graph else [COUNTS_FILE_NAME]
+    count_task = count_graph_seed if args.graph else count_seed
+
+    # Every (scenario, seed) folder holding a Packet Trace is an independent task; the largest run first
+    tasks = scenario_manifest.seed_tasks()
+
+    # In incremental mode, skip seeds whose counts are up to date according to the manifest
+    manifest = Manifest(base_path)
+    if args.incremental:
+        all_tasks = len(tasks)
+        stale = {task.seed_path for name in output_names for task in stale_tasks(manifest, tasks, name)}
+        tasks = [task for task in tasks if task.seed_path in stale]
+        print(f'{all_tasks - len(tasks)} of {all_tasks} seeds are up to date')
+
+    # Count DAO, DIO and sensing packets per sensor for all seeds across the process pool
+    start = time.perf_counter()
+    with instrumentation.activate(), instrumentation.stage('count'):
+        if args.prefetch:
+            # Overlap reading the next seeds with counting the current one, in every worker process
+            read = partial(read_seed_frames, chunksize=args.chunksize, cache=args.cache, engine=args.csv_engine)
+            results = run_pipelined(read, count_graph_frames if args.graph else count_seed_frames, tasks,
+                                    args.workers, args.prefetch)
+        else:
+            results = run_tasks(count_task, tasks, args.workers, chunksize=args.chunksize, cache=args.cache,
+                                engine=args.csv_engine)
+
+    for name in output_names:
+        record_results(manifest, results, name)
+
+    for result in results:
+        if result.ok:
+            counts_path, graph_path = result.value if args.graph else (result.value, None)
+            print(f'Successfully saved the transposed counts to {counts_path}')
+            if graph_path:
+                print(f'Successfully saved the graph features to {graph_path}')
+
+    print(summarize(results, time.perf_counter() - start))
+    instrument.finish(instrumentation, args)
@@ -1,84 +1,62 @@
-import pandas as pd
+import argparse
 import os
-
-# Define the base path where the folders are located
-base_path = 'G:\\Test-Scenarios'
-
-# List of specific folders you want to process
-folders_to_process = ['2', '4', '5', '6','8', '10', '12', '14']  # Add folder names as strings
-
-# Initialize the start row for writing in Excel
-start_row = 0
-
-# Define the path for the output Excel file
-excel_file_path = os.path.join(base_path, 'Merged_Sensor_Message_Counts.xlsx')
-
-# Create an Excel writer object
-with pd.ExcelWriter(excel_file_path, engine='xlsxwriter') as writer:
-    # Iterate over each specified folder
-    for folder in folders_to_process:
-        folder_path = os.path.join(base_path, folder)
-
-        # Check if the folder exists
-        if not os.path.isdir(folder_path):
-            print(f"Folder {folder} does not exist. Skipping...")
-            continue
-
-        # Iterate over each subfolder (e.g., 'seed1', 'seed2', ...)
-        for subfolder in os.listdir(folder_path):
-            subfolder_path = os.path.join(folder_path, subfolder)
-            file_path = os.path.join(subfolder_path, 'Sensor_Message_Counts.csv')
-
-            # Check if the file exists
-            if not os.path.exists(file_path):
-                print(f"File {file_path} does not exist. Skipping...")
-                continue
-
-            # Load the CSV file into a DataFrame with header
-            try:
-                df = pd.read_csv(file_path)
-
-                # Add a 'Sensor' column with the sensor (subfolder) name repeated for all rows
-                df.insert(0, 'Sensor', subfolder)
-                
-                # Write the DataFrame to the Excel file starting from the start_row
-                df.to_excel(writer, index=False, startrow=start_row, sheet_name='All_Data')
-
-                # Update the start_row for the next DataFrame to be written
-                start_row += len(df) + 2  # Add 2 to create a space between each sensor's data
-
-            except Exception as e:
-                print(f"Error processing file {file_path}: {e}")
-
-# Now process the merged Excel file to normalize data
-merged_df = pd.read_excel(excel_file_path, sheet_name='All_Data')
-
-# Convert non-numeric columns to numeric and handle errors
-def to_numeric(df):
-    for col in df.columns:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    return df
-
-# Drop non-numeric columns and convert remaining data to numeric
-numeric_df = merged_df.drop(columns=['Sensor'])
-numeric_df = to_numeric(numeric_df)
-
-# Normalize each row
-try:
-    max_values = numeric_df.max(axis=1)
-    normalized_df = numeric_df.div(max_values, axis=0)
-except Exception as e:
-    print(f"Error during normalization: {e}")
-    normalized_df = numeric_df  # Fallback to original data if normalization fails
-
-# Add the 'Sensor' column back to the normalized DataFrame
-normalized_df.insert(0, 'Sensor', merged_df['Sensor'])
-
-# Define the path for the output Excel file
-normalized_excel_file_path = os.path.join(base_path, 'Normalized_Sensor_Message_Counts.xlsx')
-
-# Save the normalized DataFrame to a new Excel file
-with pd.ExcelWriter(normalized_excel_file_path, engine='xlsxwriter') as writer:
-    normalized_df.to_excel(writer, index=False, sheet_name='Normalized_Data')
-
-print(f"Normalized data saved to {normalized_excel_file_path}")
\ No newline at end of file
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import dataio, instrument, scenarios
+from netsim_pipeline.graph_features import graph_inputs
+from netsim_pipeline.manifest import Manifest
+from netsim_pipeline.merge import counts_inputs, merge_tables, merged_table_paths, write_merged_tables
+
+parser = argparse.ArgumentParser(description='Merge and normalize the per-seed Sensor_Message_Counts.csv files.')
+parser.add_argument('--incremental', action='store_true',
+                    help='skip the merge when no Sensor_Message_Counts.csv changed since the outputs were written')
+parser.add_argument('--graph', action='store_true',
+                    help='append the per-seed Sensor_Graph_Features.csv columns (Feature-Count-CSV.py --graph) '
+                         'to the classifier features')
+dataio.add_arguments(parser)
+scenarios.add_arguments(parser)
+instrument.add_arguments(parser)
+args = parser.parse_args()
+
+# Test-Scenarios folder and the scenario folders to merge, from the scenario manifest
+scenario_manifest = scenarios.from_args(args)
+base_path = scenario_manifest.base_path
+folders_to_process = scenario_manifest.merge_scenarios
+instrumentation = instrument.from_args(args, 'merge_normalize', format=args.format, export=' '.join(args.export),
+                                       graph=args.graph)
+
+# Define the paths for the outputs, in the chosen format; exports go next to them
+output_paths = [path for paths in merged_table_paths(base_path, args.format, args.export).values() for path in paths]
+
+# Collect the (scenario, seed, counts file) inputs to merge
+inputs = counts_inputs(base_path, folders_to_process)
+graph_files = graph_inputs(base_path, folders_to_process) if args.graph else None
+
+# The outputs only need rebuilding when one of their inputs changed
+manifest = Manifest(base_path)
+input_paths = [file_path for _, _, file_path in inputs + (graph_files or [])]
+if args.incremental and not any(manifest.is_stale(path, input_paths) for path in output_paths):
+    print(f"Merged and normalized data are up to date with {len(input_paths)} input files")
+    sys.exit(0)
+
+with instrumentation.activate():
+    # Concatenate every seed's counts in memory, normalize each metric row by its maximum over the
+    # sensors and reshape to one row per (scenario, seed, sensor) with the classifier feature columns
+    with instrumentation.stage('merge', len(inputs)) as info:
+        tables = merge_tables(inputs, graph_files)
+        info['rows'] = len(tables['features'])
+
+    # Save the tables for the next stages, with their index levels and dtypes, plus optional Excel/CSV copies
+    with instrumentation.stage('save', sum(len(table) for table in tables.values())):
+        paths = write_merged_tables(tables, base_path, args.format, args.export)
+
+# Remember which inputs the outputs were built from
+for path in output_paths:
+    manifest.record(path, input_paths)
+manifest.save()
+
+print(f"Normalized data for {len(tables['features'])} sensors saved to {paths['features']}")
+instrument.finish(instrumentation, args)
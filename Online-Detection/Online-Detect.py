@@ -0,0 +1,44 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline.classifiers import MODELS, SAVED_MODELS, load_models
+from netsim_pipeline.online import TIME_COLUMN, detect_online
+
+parser = argparse.ArgumentParser(description='Flag malicious sensors in a Packet Trace while the simulation is still writing it.')
+parser.add_argument('trace', help='Packet Trace.csv to follow')
+parser.add_argument('--window', type=float, default=60,
+                    help='length of the sliding window in simulated seconds (default: 60)')
+parser.add_argument('--step', type=float, default=10,
+                    help='re-score the sensors every this many simulated seconds (default: 10)')
+parser.add_argument('--models', nargs='+', choices=SAVED_MODELS, default=list(MODELS),
+                    help='saved classifiers to use, including the incremental sgd_lr, sgd_svm and incremental_nb '
+                         '(default: the four batch classifiers)')
+parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                    help='folder holding the saved model artifacts (default: ./models)')
+parser.add_argument('--min-votes', type=int, default=None,
+                    help='models that must vote malicious to flag a sensor (default: a majority)')
+parser.add_argument('--time-column', default=TIME_COLUMN,
+                    help=f'packet timestamp column in microseconds (default: {TIME_COLUMN})')
+parser.add_argument('--poll', type=float, default=1.0,
+                    help='seconds between checks for new rows')
+parser.add_argument('--idle-timeout', type=float, default=None,
+                    help='stop once the trace has not grown for this many seconds (default: follow forever)')
+args = parser.parse_args()
+
+models = load_models(args.models, args.model_dir)
+min_votes = args.min_votes or len(models) // 2 + 1
+
+flagged_so_far = set()
+for window_end, labels in detect_online(args.trace, models, args.window, args.step,
+                                        args.poll, args.idle_timeout, args.time_column):
+    if labels.empty:
+        continue
+    flagged = labels.index[labels['votes_malicious'] >= min_votes].tolist()
+    new = [sensor for sensor in flagged if sensor not in flagged_so_far]
+    flagged_so_far.update(flagged)
+    print(f"[t={window_end:.0f}s] {len(labels)} sensors, flagged: {', '.join(flagged) or 'none'}"
+          + (f" (new: {', '.join(new)})" if new else ''), flush=True)
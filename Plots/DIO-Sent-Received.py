@@ -1,108 +1,57 @@
-import pandas as pd
-import matplotlib.pyplot as plt
+import argparse
 import os
-
-# Define the path to the "test scenarios" folder
-base_folder = 'G:\\Test-Scenarios'
-
-# Define the malicious sensors for each scenario based on the main folder name
-malicious_sensors_map = {
-    '2': ['S-5', 'S-9'],
-    '3': ['S-5', 'S-9', 'S-10'],
-    '4': ['S-5', 'S-9', 'S-10', 'S-16'],
-    '5': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18'],
-    '6': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19'],
-    '7': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22'],
-    '8': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24'],
-    '9': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27'],
-    '10': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30'],
-    '11': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33'],
-    '12': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36'],
-    '13': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36', 'S-38'],
-    '14': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36', 'S-38', 'S-41'],
-    '15': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36', 'S-38', 'S-41', 'S-43']
-}
-
-# Iterate over each main folder (e.g., '2', '3', ...)
-for folder in range(2, 16):
-    folder_name = str(folder)
-    folder_path = os.path.join(base_folder, folder_name)
-    
-    # Iterate over each subfolder (e.g., 'seed1', 'seed2', ...)
-    for subfolder in os.listdir(folder_path):
-        subfolder_path = os.path.join(folder_path, subfolder)
-        file_path = os.path.join(subfolder_path, 'Packet Trace.csv')
-        
-        # Check if the file exists
-        if not os.path.exists(file_path):
-            continue
-        
-        # Load the packet trace CSV file
-        df = pd.read_csv(file_path, encoding='ISO-8859-1')
-
-        # Verify the required columns exist
-        if not {'PACKET_TYPE', 'CONTROL_PACKET_TYPE/APP_NAME', 'SOURCE_ID', 'RECEIVER_ID', 'PACKET_STATUS'}.issubset(df.columns):
-            raise ValueError(f"Required columns are missing from the DataFrame in folder {folder_name}, subfolder {subfolder}.")
-
-        # Filter for DIO messages
-        dio_packets = df[(df['CONTROL_PACKET_TYPE/APP_NAME'] == 'DIO') & (df['PACKET_STATUS'] == 'Successful')]
-
-        # Count DIO messages sent by each sensor
-        sent_dio = dio_packets[~dio_packets['SOURCE_ID'].str.contains('SINKNODE|ROUTER', case=False)]['SOURCE_ID'].value_counts()
-
-        # Count DIO messages received by each sensor
-        received_dio = dio_packets[~dio_packets['RECEIVER_ID'].str.contains('SINKNODE|ROUTER', case=False)]['RECEIVER_ID'].value_counts()
-
-        # Abbreviate sensor names
-        sent_dio.index = sent_dio.index.str.replace('SENSOR-', 'S-')
-        received_dio.index = received_dio.index.str.replace('SENSOR-', 'S-')
-
-        # Combine the data for plotting
-        combined_counts = pd.DataFrame({
-            'Sent': sent_dio,
-            'Received': received_dio.reindex(sent_dio.index, fill_value=0)
-        }).fillna(0)
-
-        # Plotting
-        fig, ax = plt.subplots(figsize=(15, 8))
-        bar_width = 0.3
-        index = range(len(combined_counts))
-
-        # Increase spacing between bars to avoid overlap
-        bar_spacing = bar_width * 1.5
-        
-        # Plot bars for sent (Sent) and received (Received) messages
-        bars_sent = ax.bar(index, combined_counts['Sent'], bar_width, label='DIO Sent', color='skyblue', edgecolor='none')
-        bars_received = ax.bar([i + bar_spacing for i in index], combined_counts['Received'], bar_width, label='DIO Received', color='lightgreen', edgecolor='none')
-
-        # Add count labels on top of the bars with vertical orientation and slight offset
-        for bar in bars_sent + bars_received:
-            height = bar.get_height()
-            ax.annotate(f'{int(height)}', 
-                        (bar.get_x() + bar.get_width() / 2., height),
-                        ha='center', va='bottom', fontsize=12, rotation=90, xytext=(0, 5), textcoords='offset points')
-
-        # Customize the plot
-        ax.set_title('Number of DIO Messages Sent and Received', fontsize=32)
-        ax.set_xlabel('Sensor ID', fontsize=32)
-        ax.set_ylabel('DIO Messages', fontsize=32)
-        ax.set_xticks([i + bar_spacing / 2 for i in index])
-        ax.set_xticklabels(combined_counts.index, rotation=45, ha='center', va='top', fontsize=14)
-
-        # Highlight specific sensor IDs in red based on malicious nodes
-        malicious_sensors = malicious_sensors_map.get(folder_name, [])
-        for label in ax.get_xticklabels():
-            if label.get_text() in malicious_sensors:
-                label.set_color('red')
-        
-        # Add legend
-        ax.legend(title="Message Type", title_fontsize='20', fontsize='16')
-        
-        plt.tight_layout()
-
-        # Save the plot as an image file in the same directory as the packet trace
-        output_path = os.path.join(subfolder_path, 'DIO.png')
-        plt.savefig(output_path)
-
-        # Display the plot
-        plt.show()
+import sys
+import time
+from functools import partial
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import scenarios
+from netsim_pipeline.manifest import Manifest, record_results, stale_tasks
+from netsim_pipeline.plots import read_seed_counts, render_chart, render_seed_counts
+from netsim_pipeline.runner import run_pipelined, run_tasks, summarize
+from netsim_pipeline.trace_features import seed_counts
+
+
+def plot_seed(task, malicious_map, show=False):
+    """Render DIO.png for one (scenario, seed) task and return its path."""
+    # Per-sensor counts from the shared single-pass extractor (raises ValueError on missing columns)
+    counts = seed_counts(task.seed_path, cache=True)
+
+    # Save the plot as an image file in the same directory as the packet trace
+    output_path = os.path.join(task.seed_path, 'DIO.png')
+    return render_chart('DIO', counts, malicious_map.get(task.scenario, []), output_path, show)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Plot DIO messages sent and received per sensor for every seed.')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per CPU, 1 runs in-process and shows each plot)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only redraw seeds whose Packet Trace changed since DIO.png was saved')
+    parser.add_argument('--prefetch', type=int, default=None, metavar='DEPTH',
+                        help="load up to DEPTH seeds' counts ahead on a background thread while plotting")
+    scenarios.add_arguments(parser)
+    args = parser.parse_args()
+    scenario_manifest = scenarios.from_args(args)
+    base_folder = scenario_manifest.base_path
+
+    # Every (scenario, seed) folder holding a Packet Trace, for the scenarios of the manifest
+    tasks = scenario_manifest.seed_tasks()
+
+    # In incremental mode, skip seeds whose plot is up to date according to the manifest
+    manifest = Manifest(base_folder)
+    if args.incremental:
+        tasks = stale_tasks(manifest, tasks, 'DIO.png')
+
+    start = time.perf_counter()
+    if args.prefetch:
+        plot = partial(render_seed_counts, malicious_map=scenario_manifest.malicious_map(), charts=['DIO'],
+                       show=args.workers == 1)
+        results = run_pipelined(read_seed_counts, plot, tasks, args.workers, args.prefetch)
+    else:
+        results = run_tasks(plot_seed, tasks, args.workers, malicious_map=scenario_manifest.malicious_map(),
+                            show=args.workers == 1)
+    record_results(manifest, results, 'DIO.png')
+    print(summarize(results, time.perf_counter() - start))
@@ -0,0 +1,51 @@
+import argparse
+import os
+import sys
+import time
+from functools import partial
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import scenarios
+from netsim_pipeline.manifest import Manifest, record_results, stale_tasks
+from netsim_pipeline.plots import CHARTS, read_seed_counts, render_seed, render_seed_counts
+from netsim_pipeline.runner import run_pipelined, run_tasks, summarize
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Render the DAO, DIO and data-received charts of every seed, headless and in parallel.')
+    parser.add_argument('--charts', nargs='+', choices=list(CHARTS), default=list(CHARTS),
+                        help='charts to render (default: all three)')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='number of worker processes (default: one per CPU)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='only render seeds whose Packet Trace changed since their charts were saved')
+    parser.add_argument('--prefetch', type=int, default=None, metavar='DEPTH',
+                        help="load up to DEPTH seeds' counts ahead on a background thread while charts are rendered")
+    scenarios.add_arguments(parser)
+    args = parser.parse_args()
+    scenario_manifest = scenarios.from_args(args)
+    base_folder = scenario_manifest.base_path
+
+    # Every (scenario, seed) folder holding a Packet Trace
+    tasks = scenario_manifest.seed_tasks()
+
+    # In incremental mode, skip seeds whose charts are all up to date
+    manifest = Manifest(base_folder)
+    if args.incremental:
+        stale = set()
+        for chart in args.charts:
+            stale.update(stale_tasks(manifest, tasks, CHARTS[chart][0]))
+        tasks = [task for task in tasks if task in stale]
+
+    # Each seed's counts are loaded once and shared by all of its charts
+    start = time.perf_counter()
+    if args.prefetch:
+        render = partial(render_seed_counts, malicious_map=scenario_manifest.malicious_map(), charts=args.charts)
+        results = run_pipelined(read_seed_counts, render, tasks, args.workers, args.prefetch)
+    else:
+        results = run_tasks(render_seed, tasks, args.workers, malicious_map=scenario_manifest.malicious_map(),
+                            charts=args.charts)
+    for chart in args.charts:
+        record_results(manifest, results, CHARTS[chart][0])
+    print(summarize(results, time.perf_counter() - start))
@@ -0,0 +1,29 @@
+import argparse
+import os
+import sys
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline import scenarios
+from netsim_pipeline.runner import largest_first
+
+parser = argparse.ArgumentParser(description='Write a scenario manifest with every seed and its Packet Trace size, and show the largest-first schedule.')
+parser.add_argument('--output', default=os.path.join(os.getcwd(), 'scenarios.json'),
+                    help='manifest file to write, .json or .yaml (default: ./scenarios.json)')
+parser.add_argument('--show', type=int, default=10,
+                    help='number of scheduled seeds to list (default: 10)')
+scenarios.add_arguments(parser)
+args = parser.parse_args()
+
+# Start from the given manifest (or the built-in scenarios) and record the seeds found on disk
+scenario_manifest = scenarios.from_args(args).scanned()
+scenarios.save_manifest(scenario_manifest, args.output)
+
+tasks = scenario_manifest.seed_tasks()
+total = sum(task.size or 0 for task in tasks)
+print(f"{len(tasks)} seeds in {len(scenario_manifest.names())} scenarios, {total / 1e6:,.1f} MB of Packet Traces")
+for i in largest_first(tasks)[:args.show]:
+    task = tasks[i]
+    print(f"  scenario {task.scenario:>4} {task.seed:<10} {(task.size or 0) / 1e6:10,.1f} MB")
+print(f"Scenario manifest saved to {args.output}")
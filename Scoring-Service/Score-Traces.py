@@ -0,0 +1,62 @@
+import argparse
+import json
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+# Make the shared netsim_pipeline package importable when run as a script
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from netsim_pipeline.classifiers import MODELS, SAVED_MODELS
+from netsim_pipeline.scoring import Scorer, labels_to_json, read_trace_text, serve_http
+
+parser = argparse.ArgumentParser(description='Label the sensors of Packet Traces as benign or malicious with warm, saved classifiers.')
+parser.add_argument('traces', nargs='*',
+                    help='Packet Trace.csv files to score (omit with --stdin or --port)')
+parser.add_argument('--models', nargs='+', choices=SAVED_MODELS, default=list(MODELS),
+                    help='saved classifiers to use, including the incremental sgd_lr, sgd_svm and incremental_nb '
+                         '(default: the four batch classifiers)')
+parser.add_argument('--model-dir', default=os.path.join(os.getcwd(), 'models'),
+                    help='folder holding the saved model artifacts (default: ./models)')
+parser.add_argument('--version', type=int, default=None,
+                    help='artifact version to load (default: latest)')
+parser.add_argument('--port', type=int, default=None,
+                    help='serve POST /score, GET /stats and GET /health on this localhost port')
+parser.add_argument('--stdin', action='store_true',
+                    help='read trace paths (one per line) or the rows of one Packet Trace CSV from stdin')
+parser.add_argument('--max-batch', type=int, default=32,
+                    help='most requests scored together in one micro-batch')
+parser.add_argument('--max-wait-ms', type=float, default=10,
+                    help='how long a micro-batch waits for more requests')
+args = parser.parse_args()
+
+# Load the models once; they stay warm for every request
+scorer = Scorer(args.model_dir, args.models, args.version,
+                max_batch=args.max_batch, max_wait=args.max_wait_ms / 1000)
+
+if args.port is not None:
+    print(f"Scoring service listening on http://127.0.0.1:{args.port}", file=sys.stderr)
+    serve_http(scorer, port=args.port)
+else:
+    if args.stdin:
+        first_line = sys.stdin.readline()
+        if 'PACKET_TYPE' in first_line:
+            # The rows of a single Packet Trace were piped in
+            items = [read_trace_text(first_line + sys.stdin.read())]
+        else:
+            items = [line.strip() for line in [first_line] + sys.stdin.readlines() if line.strip()]
+    else:
+        items = args.traces
+
+    # Submit every trace at once so the micro-batcher can group them
+    def score(item):
+        try:
+            return {'trace': item if isinstance(item, str) else '<stdin>', 'sensors': labels_to_json(scorer.score(item))}
+        except Exception as e:
+            return {'trace': item if isinstance(item, str) else '<stdin>', 'error': f'{type(e).__name__}: {e}'}
+
+    with ThreadPoolExecutor(max_workers=args.max_batch) as pool:
+        for result in pool.map(score, items):
+            print(json.dumps(result))
+
+    print(json.dumps(scorer.stats.snapshot()), file=sys.stderr)
@@ -0,0 +1,5 @@
+"""Shared engine for the NetSim IoT attack-detection scripts.
+
+The stage scripts (feature count, merge, classifiers, plots, confusion
+matrix) live in their own folders and import the reusable pieces from here.
+"""
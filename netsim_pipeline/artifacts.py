@@ -0,0 +1,94 @@
+"""Versioned, fast-loading artifacts for fitted classifiers.
+
+Every save creates a new version folder ``<model_dir>/<name>/v<N>/`` holding
+the estimator (``model.joblib``) and a ``meta.json`` with the feature column
+order, the feature normalization, the classes and the library versions.
+
+The estimator is dumped uncompressed so load_model can memory-map its numpy
+arrays. Predicting then costs an unpickle and a page-in, with no refit.
+"""
+import json
+import os
+import time
+
+import joblib
+import sklearn
+
+from netsim_pipeline.merge import NORMALIZATION
+
+MODEL_FILE_NAME = 'model.joblib'
+META_FILE_NAME = 'meta.json'
+
+
+def list_versions(model_dir, name):
+    """Saved version numbers of a model, oldest first."""
+    model_path = os.path.join(model_dir, name)
+    if not os.path.isdir(model_path):
+        return []
+    return sorted(int(entry[1:]) for entry in os.listdir(model_path)
+                  if entry.startswith('v') and entry[1:].isdigit())
+
+
+def version_path(model_dir, name, version=None):
+    """Folder of a saved model version (the latest when version is None)."""
+    if version is None:
+        versions = list_versions(model_dir, name)
+        if not versions:
+            raise FileNotFoundError(f"No saved versions of model {name!r} in {model_dir}")
+        version = versions[-1]
+    return os.path.join(model_dir, name, f'v{version}')
+
+
+def save_model(clf, name, feature_columns, model_dir, **extra):
+    """Save a fitted estimator as the next version of name; returns the version folder.
+
+    extra keyword arguments (e.g. fit_seconds) are stored in meta.json.
+    """
+    versions = list_versions(model_dir, name)
+    version = versions[-1] + 1 if versions else 1
+    path = os.path.join(model_dir, name, f'v{version}')
+    os.makedirs(path)
+
+    # No compression, so the arrays can be memory-mapped on load
+    joblib.dump(clf, os.path.join(path, MODEL_FILE_NAME))
+
+    meta = {
+        'name': name,
+        'version': version,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'estimator': type(clf).__name__,
+        'params': {key: repr(value) for key, value in clf.get_params().items()},
+        'feature_columns': list(feature_columns),
+        'classes': [value.item() if hasattr(value, 'item') else value for value in getattr(clf, 'classes_', [])],
+        'normalization': NORMALIZATION,
+        'sklearn_version': sklearn.__version__,
+    }
+    meta.update(extra)
+    with open(os.path.join(path, META_FILE_NAME), 'w') as f:
+        json.dump(meta, f, indent=2)
+    return path
+
+
+def load_model(model_dir, name, version=None, mmap=True):
+    """Load a saved model version (latest by default): (estimator, meta).
+
+    With mmap the estimator's numpy arrays are memory-mapped read-only.
+    """
+    path = version_path(model_dir, name, version)
+    with open(os.path.join(path, META_FILE_NAME)) as f:
+        meta = json.load(f)
+    clf = joblib.load(os.path.join(path, MODEL_FILE_NAME), mmap_mode='r' if mmap else None)
+    return clf, meta
+
+
+def select_features(df, meta):
+    """The model's feature columns of df, in the order it was trained with."""
+    missing = [column for column in meta['feature_columns'] if column not in df.columns]
+    if missing:
+        raise ValueError(f"Input is missing feature columns required by model {meta['name']!r}: {missing}")
+    return df[meta['feature_columns']]
+
+
+def predict_with_model(clf, meta, df):
+    """Predict df with a loaded model, aligning its columns to the training order."""
+    return clf.predict(select_features(df, meta))
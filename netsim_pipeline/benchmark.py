@@ -0,0 +1,250 @@
+"""End-to-end pipeline benchmark on synthetic traces.
+
+run_benchmark generates a synthetic Test-Scenarios tree of a given size and
+runs every pipeline stage on it: feature count, merge/normalize, train,
+predict, confusion matrix and plots. The stages are timed with an
+instrument.Instrumentation, so besides wall time, rows per second and peak
+RSS every run also records the library hooks inside each stage (read_csv,
+aggregation, fitting, rendering). With trace_memory it also records the peak
+of Python-tracked allocations; tracing slows pandas-heavy stages down several
+times, so it is off for timing runs. The records are appended to a CSV so
+numbers from different commits and machines can be compared over time.
+
+benchmark_knn_indexes compares the k-NN index backends (see knn_index) on a
+feature set enlarged to a given number of rows: index build time, query
+latency and throughput against accuracy and agreement with the exact
+brute-force predictions.
+
+benchmark_csv_engines times every CSV engine of trace_features on the same
+Packet Trace, loaded whole or streamed, in rows and megabytes per second.
+"""
+import csv
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from netsim_pipeline.classifiers import LABEL_COLUMN, predict_models, train_models
+from netsim_pipeline.evaluation import evaluate
+from netsim_pipeline.instrument import STAGE_FIELDS, Instrumentation
+from netsim_pipeline.knn_index import make_knn
+from netsim_pipeline.merge import FEATURE_COLUMNS, add_labels, counts_inputs, merge_seed_counts, normalize, to_feature_dataset
+from netsim_pipeline.plots import CHARTS, render_seed
+from netsim_pipeline.runner import discover_seeds, run_tasks
+from netsim_pipeline.scenarios import MALICIOUS_SENSORS
+from netsim_pipeline.synthetic import generate_sweep
+from netsim_pipeline.trace_features import CSV_ENGINES, count_seed, csv_engine, fold_chunk_counts, iter_trace_frames
+
+# Columns of the benchmark results CSV: run fields, then the instrument stage fields
+RESULT_FIELDS = [
+    'timestamp', 'commit', 'host', 'python', 'sensors', 'packets', 'scenarios', 'seeds', 'workers',
+] + STAGE_FIELDS
+
+# Columns of the k-NN index benchmark CSV
+KNN_RESULT_FIELDS = [
+    'timestamp', 'commit', 'host', 'python', 'train_rows', 'test_rows', 'index', 'params',
+    'build_seconds', 'query_seconds', 'latency_us', 'rows_per_s', 'accuracy', 'agreement',
+]
+
+# Columns of the CSV engine benchmark CSV
+CSV_RESULT_FIELDS = [
+    'timestamp', 'commit', 'host', 'python', 'cpus', 'trace', 'rows', 'megabytes', 'engine', 'chunksize',
+    'seconds', 'rows_per_s', 'mb_per_s', 'speedup', 'same_counts',
+]
+
+# Index configurations compared by default: the exact searches, then ivf at increasing recall
+KNN_CONFIGS = [
+    ('brute', {}), ('kd_tree', {}), ('ball_tree', {}),
+    ('ivf', {'n_probe': 1}), ('ivf', {'n_probe': 2}), ('ivf', {'n_probe': 4}),
+    ('ivf', {'n_probe': 8}), ('ivf', {'n_probe': 16}),
+]
+
+
+def git_commit(path):
+    """Short commit hash of the checkout holding path, or '' outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=path, capture_output=True,
+                              text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        return ''
+
+
+def _check_tasks(results, stage):
+    failed = [result for result in results if not result.ok]
+    if failed:
+        raise RuntimeError(f"{stage} failed for {len(failed)} seeds, e.g.:\n{failed[0].error}")
+
+
+def run_benchmark(base_path, sensors, packets, scenarios=('2', '4'), seeds=2, workers=None,
+                  models=('knn', 'lr', 'nb', 'svm'), charts=tuple(CHARTS), malicious_map=MALICIOUS_SENSORS,
+                  trace_memory=False):
+    """Generate a synthetic sweep of the given size under base_path and time every stage on it.
+
+    The last seed of every scenario is held out as the test set. Returns the
+    stage records (dicts with RESULT_FIELDS keys).
+    """
+    scenarios = [str(scenario) for scenario in scenarios]
+    fields = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(os.path.dirname(os.path.abspath(__file__))),
+        'host': platform.node(), 'python': platform.python_version(),
+        'sensors': sensors, 'packets': packets, 'scenarios': ' '.join(scenarios), 'seeds': seeds, 'workers': workers or '',
+    }
+    recorder = Instrumentation('benchmark', trace_memory=trace_memory)
+    with recorder.activate():
+        _run_stages(recorder, base_path, sensors, packets, scenarios, seeds, workers, models, charts, malicious_map)
+    print(recorder.summary())
+    return [{**fields, **record} for record in recorder.stage_records()]
+
+
+def _run_stages(recorder, base_path, sensors, packets, scenarios, seeds, workers, models, charts, malicious_map):
+    total_rows = packets * seeds * len(scenarios)
+    print(f"{sensors} sensors, {packets:,} packets per trace, {len(scenarios)} scenarios x {seeds} seeds")
+
+    with recorder.stage('generate', total_rows):
+        generate_sweep(base_path, scenarios, seeds, sensors, packets, malicious_map)
+    tasks = discover_seeds(base_path, scenarios)
+
+    with recorder.stage('feature_count', total_rows):
+        results = run_tasks(count_seed, tasks, workers)
+        _check_tasks(results, 'Feature count')
+
+    with recorder.stage('merge_normalize') as record:
+        features = add_labels(to_feature_dataset(normalize(merge_seed_counts(counts_inputs(base_path, scenarios)))),
+                              malicious_map)
+        record['rows'] = len(features)
+
+    # Hold out the last seed of every scenario as the test set
+    test_seed = f'seed{seeds}'
+    is_test = features.index.get_level_values('seed') == test_seed
+    train_df, test_df = features[~is_test], features[is_test]
+    if seeds < 2 or train_df[LABEL_COLUMN].nunique() < 2:
+        raise ValueError("Need at least 2 seeds and both labels in the training seeds")
+
+    with recorder.stage('train', len(train_df)) as record:
+        fitted = train_models(models, train_df[FEATURE_COLUMNS], train_df[LABEL_COLUMN])
+        record['note'] = ' '.join(f'{name}={seconds:.3f}s' for name, (_, seconds) in fitted.items())
+
+    with recorder.stage('predict', len(test_df) * len(fitted)):
+        predictions = predict_models({name: clf for name, (clf, _) in fitted.items()}, test_df[FEATURE_COLUMNS])
+
+    with recorder.stage('confusion_matrix', len(test_df) * len(predictions)) as record:
+        metrics, _, _ = evaluate(test_df[LABEL_COLUMN], predictions)
+        record['note'] = ' '.join(f"{name}:acc={row['accuracy']:.3f},f1={row['f1']:.3f}" for name, row in metrics.iterrows())
+
+    with recorder.stage('plots', len(tasks) * len(charts)):
+        results = run_tasks(render_seed, tasks, workers, malicious_map=malicious_map, charts=charts)
+        _check_tasks(results, 'Plots')
+
+
+def enlarge_features(X, y, rows, noise=0.02, seed=0):
+    """Bootstrap rows of a normalized feature set with Gaussian jitter: (X, y) of the given size.
+
+    The jitter keeps the resampled rows distinct, so neighbor searches on the
+    enlarged set do as much work as on real data of that size.
+    """
+    rng = np.random.default_rng(seed)
+    X = np.asarray(X, dtype=float)
+    picks = rng.integers(0, len(X), rows)
+    return np.clip(X[picks] + rng.normal(0, noise, (rows, X.shape[1])), 0, 1), np.asarray(y)[picks]
+
+
+def benchmark_knn_indexes(X, y, rows, configs=KNN_CONFIGS, test_fraction=0.2, n_neighbors=5, seed=0):
+    """Time every k-NN index configuration on the feature set enlarged to rows rows.
+
+    configs is a list of (index, params). The original rows are split into
+    train and test before enlarging, so no query is a jittered copy of an
+    indexed row; test_fraction of the enlarged rows is queried. Accuracy is
+    against the labels and agreement against the exact brute-force
+    predictions. Returns records with KNN_RESULT_FIELDS keys.
+    """
+    X, y = np.asarray(X, dtype=float), np.asarray(y)
+    order = np.random.default_rng(seed).permutation(len(X))
+    split = int(len(X) * (1 - test_fraction))
+    train, test = order[:split], order[split:]
+    X_train, y_train = enlarge_features(X[train], y[train], int(rows * (1 - test_fraction)), seed=seed)
+    X_test, y_test = enlarge_features(X[test], y[test], rows - len(X_train), seed=seed + 1)
+    fields = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(os.path.dirname(os.path.abspath(__file__))),
+        'host': platform.node(), 'python': platform.python_version(),
+        'train_rows': len(X_train), 'test_rows': len(X_test),
+    }
+
+    records, exact = [], None
+    for index, params in configs:
+        start = time.perf_counter()
+        clf = make_knn(index, n_neighbors, **params).fit(X_train, y_train)
+        build_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        predicted = clf.predict(X_test)
+        query_seconds = time.perf_counter() - start
+        if exact is None:
+            exact = make_knn('brute', n_neighbors).fit(X_train, y_train).predict(X_test) if index != 'brute' else predicted
+
+        record = {**fields, 'index': index, 'params': ' '.join(f'{key}={value}' for key, value in params.items()),
+                  'build_seconds': round(build_seconds, 4), 'query_seconds': round(query_seconds, 4),
+                  'latency_us': round(query_seconds / len(X_test) * 1e6, 2),
+                  'rows_per_s': round(len(X_test) / query_seconds, 1),
+                  'accuracy': round(float(np.mean(predicted == y_test)), 4),
+                  'agreement': round(float(np.mean(predicted == exact)), 4)}
+        print(f"{index:<10} {record['params']:<22} build {build_seconds:8.3f}s  "
+              f"{record['latency_us']:10.2f} us/row  acc {record['accuracy']:.4f}  agree {record['agreement']:.4f}")
+        records.append(record)
+    return records
+
+
+def append_results(records, results_path, fields=RESULT_FIELDS):
+    """Append benchmark records to a CSV, writing the header when the file is new."""
+    new_file = not os.path.exists(results_path)
+    os.makedirs(os.path.dirname(os.path.abspath(results_path)), exist_ok=True)
+    with open(results_path, 'a', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=fields, extrasaction='ignore')
+        if new_file:
+            writer.writeheader()
+        writer.writerows(records)
+    return results_path
+
+
+def benchmark_csv_engines(trace_path, engines=CSV_ENGINES, chunksize=None, repeats=3):
+    """Time every CSV engine reading the same Packet Trace, best of repeats runs.
+
+    With chunksize the trace is streamed in chunks of that many rows. The
+    speedup is against the first engine, and same_counts checks that every
+    engine yields the first engine's per-sensor counts. Returns records with
+    CSV_RESULT_FIELDS keys.
+    """
+    fields = {
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': git_commit(os.path.dirname(os.path.abspath(__file__))),
+        'host': platform.node(), 'python': platform.python_version(), 'cpus': os.cpu_count(),
+        'trace': os.path.abspath(trace_path), 'megabytes': round(os.path.getsize(trace_path) / 1e6, 2),
+        'chunksize': chunksize or '',
+    }
+
+    records, baseline, reference = [], None, None
+    for engine in engines:
+        if csv_engine(engine) != engine:
+            print(f"{engine:<8} not installed, skipped")
+            continue
+        best = None
+        for _ in range(repeats):
+            start = time.perf_counter()
+            frames = list(iter_trace_frames(trace_path, chunksize, engine=engine))
+            seconds = time.perf_counter() - start
+            best = seconds if best is None else min(best, seconds)
+        rows = sum(len(frame) for frame in frames)
+        counts = fold_chunk_counts(frames)
+        baseline = baseline or best
+        reference = counts if reference is None else reference
+
+        record = {**fields, 'rows': rows, 'engine': engine, 'seconds': round(best, 4),
+                  'rows_per_s': round(rows / best, 1), 'mb_per_s': round(fields['megabytes'] / best, 2),
+                  'speedup': round(baseline / best, 2), 'same_counts': bool(counts.equals(reference))}
+        print(f"{engine:<8} {best:8.3f}s  {record['rows_per_s']:14,.0f} rows/s  {record['mb_per_s']:8.2f} MB/s  "
+              f"x{record['speedup']:.2f}  same counts: {record['same_counts']}")
+        records.append(record)
+    return records
@@ -0,0 +1,170 @@
+"""Cascaded inference: a cheap classifier first, the expensive ones only where it is unsure.
+
+Naive Bayes and logistic regression score a row with a few multiplications;
+k-NN needs a neighbor search and the SVM a kernel evaluation per row. The
+cascade lets the cheap model score every row and decide it outright when its
+malicious probability is at or below low or at or above high. Only the rows
+inside the (low, high) uncertainty band are passed to the expensive models.
+Their votes are combined by majority, and a tie goes to the cheap model.
+
+cascade_report reports the share of rows each stage decided and the
+seconds it took. Given the true labels, it also compares the cascade with
+running every model on every row: the end-to-end seconds of both ways and
+their accuracy metrics.
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+from netsim_pipeline.classifiers import LABEL_COLUMN
+from netsim_pipeline.evaluation import METRIC_COLUMNS, evaluate
+from netsim_pipeline.instrument import stage
+
+# Classifiers cheap enough to score every row, and with calibrated enough probabilities to gate on;
+# sgd_lr and incremental_nb are the saved incremental counterparts of lr and nb
+CHEAP_MODELS = ['lr', 'nb', 'sgd_lr', 'incremental_nb']
+
+# Default cascade: naive Bayes first, k-NN and the SVM for the uncertain rows
+DEFAULT_CHEAP = 'nb'
+DEFAULT_EXPENSIVE = ['knn', 'svm']
+
+# Malicious probabilities the cheap model decides on its own: <= low is benign, >= high is malicious
+DEFAULT_LOW = 0.1
+DEFAULT_HIGH = 0.9
+
+# Columns of the per-stage table
+STAGE_COLUMNS = ['stage', 'models', 'rows_scored', 'rows_decided', 'fraction_decided', 'seconds']
+
+
+def check_cascade(cheap, expensive, low, high):
+    """Raise ValueError for a cascade that cannot run."""
+    if cheap not in CHEAP_MODELS:
+        raise ValueError(f"Unknown cheap classifier {cheap!r}; expected one of {CHEAP_MODELS}")
+    if not expensive:
+        raise ValueError("The cascade needs at least one expensive classifier")
+    if cheap in expensive:
+        raise ValueError(f"Classifier {cheap!r} cannot be both the cheap and an expensive stage")
+    if not 0.0 <= low <= high <= 1.0:
+        raise ValueError(f"Uncertainty band ({low}, {high}) must satisfy 0 <= low <= high <= 1")
+
+
+def malicious_probability(clf, features):
+    """Probability of the malicious class (1) for every row; 0 when the model never saw that class."""
+    classes = list(clf.classes_)
+    if 1 not in classes:
+        return np.zeros(len(features))
+    return clf.predict_proba(features)[:, classes.index(1)]
+
+
+def combine_votes(votes, tie_break):
+    """Majority label of the rows of votes (models x rows); tie_break labels the tied rows."""
+    share = np.asarray(votes, dtype=float).mean(axis=0)
+    return np.where(share > 0.5, 1, np.where(share < 0.5, 0, tie_break)).astype(int)
+
+
+def cascade_predict(models, features, cheap=DEFAULT_CHEAP, expensive=DEFAULT_EXPENSIVE,
+                    low=DEFAULT_LOW, high=DEFAULT_HIGH):
+    """Label every row with the cascade.
+
+    models is {name: fitted estimator} holding the cheap and expensive
+    models. Returns (labels, escalated, seconds): the labels, a boolean mask of
+    the rows the expensive models decided, and {'cheap'|'expensive': seconds}.
+    """
+    expensive = list(expensive)
+    check_cascade(cheap, expensive, low, high)
+
+    start = time.perf_counter()
+    with stage(f'cascade_{cheap}', len(features)):
+        probability = malicious_probability(models[cheap], features)
+    cheap_labels = (probability >= 0.5).astype(int)
+    escalated = (probability > low) & (probability < high)
+    seconds = {'cheap': time.perf_counter() - start}
+
+    start = time.perf_counter()
+    labels = cheap_labels.copy()
+    if escalated.any():
+        uncertain = features[escalated]
+        votes = []
+        for name in expensive:
+            with stage(f'cascade_{name}', len(uncertain)):
+                votes.append(models[name].predict(uncertain))
+        labels[escalated] = combine_votes(votes, cheap_labels[escalated])
+    seconds['expensive'] = time.perf_counter() - start
+    return labels, escalated, seconds
+
+
+def predict_everything(models, features, cheap=DEFAULT_CHEAP):
+    """Every model on every row, the baseline the cascade saves on.
+
+    Returns ({name: labels}, {name: seconds}, voted labels). The vote is the
+    majority of all models, with ties going to the cheap model.
+    """
+    predictions, seconds = {}, {}
+    for name, clf in models.items():
+        with stage(f'predict_{name}', len(features)):
+            start = time.perf_counter()
+            predictions[name] = np.asarray(clf.predict(features)).astype(int)
+            seconds[name] = time.perf_counter() - start
+    voted = combine_votes(list(predictions.values()), predictions[cheap])
+    return predictions, seconds, voted
+
+
+def stage_table(escalated, seconds, cheap=DEFAULT_CHEAP, expensive=DEFAULT_EXPENSIVE):
+    """Rows scored and decided, share of rows and seconds of every cascade stage, plus the end-to-end total."""
+    rows = len(escalated)
+    n_escalated = int(np.sum(escalated))
+    return pd.DataFrame([
+        ['cheap', cheap, rows, rows - n_escalated, (rows - n_escalated) / rows if rows else 0.0, seconds['cheap']],
+        ['expensive', ' '.join(expensive), n_escalated, n_escalated, n_escalated / rows if rows else 0.0,
+         seconds['expensive']],
+        ['total', ' '.join([cheap] + list(expensive)), rows, rows, 1.0 if rows else 0.0, sum(seconds.values())],
+    ], columns=STAGE_COLUMNS)
+
+
+def compare_with_everything(models, features, actual, labels, cascade_seconds, cheap=DEFAULT_CHEAP,
+                            expensive=DEFAULT_EXPENSIVE):
+    """Score the cascade's labels against every model on every row.
+
+    Runs the all-models baseline, so it costs more than the cascade itself.
+    Returns one row per way of labelling: the cascade, every model on every
+    row ('all_models', their majority vote) and each model alone. Its
+    columns are the seconds taken, the microseconds per row, the speedup over
+    all_models and the evaluation metrics against actual.
+    """
+    used = {name: models[name] for name in [cheap] + list(expensive)}
+    predictions, model_seconds, voted = predict_everything(used, features, cheap)
+    seconds = {'cascade': sum(cascade_seconds.values()), 'all_models': sum(model_seconds.values()), **model_seconds}
+    metrics, _, _ = evaluate(np.asarray(actual), {'cascade': labels, 'all_models': voted, **predictions})
+
+    comparison = pd.DataFrame({'seconds': pd.Series(seconds)})
+    comparison['us_per_row'] = comparison['seconds'] / max(len(features), 1) * 1e6
+    comparison['speedup'] = seconds['all_models'] / comparison['seconds'].where(comparison['seconds'] > 0)
+    comparison = comparison.join(metrics[METRIC_COLUMNS])
+    comparison.index.name = 'model'
+    return comparison
+
+
+def cascade_report(models, features, actual=None, cheap=DEFAULT_CHEAP, expensive=DEFAULT_EXPENSIVE,
+                   low=DEFAULT_LOW, high=DEFAULT_HIGH):
+    """Run the cascade and report its stages; with actual, also compare it with running every model.
+
+    Returns (labels, escalated, stages, comparison). stages is the
+    stage_table; comparison is compare_with_everything's table, or None when
+    actual is None, so unlabelled data is labelled at the cascade's cost only.
+    """
+    expensive = list(expensive)
+    labels, escalated, seconds = cascade_predict(models, features, cheap, expensive, low, high)
+    stages = stage_table(escalated, seconds, cheap, expensive)
+    comparison = None
+    if actual is not None:
+        comparison = compare_with_everything(models, features, actual, labels, seconds, cheap, expensive)
+    return labels, escalated, stages, comparison
+
+
+def cascade_predictions(test_df, labels, escalated):
+    """The test rows with the cascade's Label and the stage that decided each one."""
+    output_df = test_df.drop(columns=[LABEL_COLUMN], errors='ignore').copy()
+    output_df[LABEL_COLUMN] = labels
+    output_df['Decided_By'] = np.where(escalated, 'expensive', 'cheap')
+    return output_df
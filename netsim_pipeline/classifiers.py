@@ -0,0 +1,189 @@
+"""Shared training and inference for the four attack classifiers.
+
+The KNN, logistic regression, naive Bayes and SVM scripts only differed in
+their estimator line. Here the estimators are registered once in MODELS, the
+training and test data are loaded once, and any subset of the models is
+trained (optionally concurrently) and used to predict the same test set.
+Tables are read and written through dataio, so inputs may be Parquet, CSV
+or Excel and predictions default to Parquet.
+"""
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from sklearn.linear_model import LogisticRegression
+from sklearn.naive_bayes import GaussianNB
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.svm import SVC
+
+from netsim_pipeline.artifacts import load_model, predict_with_model, save_model
+from netsim_pipeline.dataio import DEFAULT_FORMAT, FORMATS, read_table, write_exports, write_table
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.knn_index import make_knn
+
+# Name of the label column in the training data and prediction outputs
+LABEL_COLUMN = 'Label'
+
+# Meaning of the label values
+LABEL_NAMES = {0: 'benign', 1: 'malicious'}
+
+# Estimator factory and prediction-file suffix for each classifier
+MODELS = {
+    'knn': (lambda: KNeighborsClassifier(n_neighbors=5), 'knn'),
+    'lr': (lambda: LogisticRegression(random_state=42, max_iter=1000), 'LR'),
+    'nb': (lambda: GaussianNB(), 'bayees'),
+    'svm': (lambda: SVC(kernel='linear', random_state=42), 'SVM'),
+}
+
+# Artifact name of each incrementally trained model (incremental.save_incremental) and the classifier it stands in for
+INCREMENTAL_ARTIFACTS = {'sgd_lr': 'lr', 'sgd_svm': 'svm', 'incremental_nb': 'nb'}
+
+# Every name a saved model can be loaded by: the batch classifiers and the incremental artifacts
+SAVED_MODELS = sorted(MODELS) + sorted(INCREMENTAL_ARTIFACTS)
+
+# Display name of each classifier for figures and reports
+MODEL_TITLES = {
+    'knn': 'K-Nearest Neighbor',
+    'lr': 'Logistic Regression',
+    'nb': 'Naive Bayes',
+    'svm': 'Support Vector Machine',
+    'sgd_lr': 'Logistic Regression (incremental SGD)',
+    'sgd_svm': 'Linear SVM (incremental SGD)',
+    'incremental_nb': 'Naive Bayes (incremental)',
+}
+
+
+def make_model(name, **params):
+    """Fresh, unfitted estimator for a MODELS name.
+
+    params override the default estimator parameters. For knn, index selects
+    the neighbor index backend (see knn_index.make_knn), e.g.
+    make_model('knn', index='ivf', n_probe=8).
+    """
+    if name not in MODELS:
+        raise ValueError(f"Unknown classifier {name!r}; expected one of {sorted(MODELS)}")
+    if name == 'knn' and 'index' in params:
+        return make_knn(**{'n_neighbors': 5, **params})
+    return MODELS[name][0]().set_params(**params)
+
+
+def prediction_file_name(name, fmt=DEFAULT_FORMAT):
+    """Output file name the original per-classifier script used, with the extension of fmt.
+
+    Models without an original script (the incremental artifacts) use their own name.
+    """
+    return f'Test_with_Predictions_{MODELS[name][1] if name in MODELS else name}{FORMATS[fmt]}'
+
+
+def load_training_data(train_data_path):
+    """Load the training data alone: (X_train, y_train)."""
+    train_df = read_table(train_data_path)
+    return train_df.drop(LABEL_COLUMN, axis=1), train_df[LABEL_COLUMN]
+
+
+def load_datasets(train_data_path, test_data_path):
+    """Load the training and test data once: (X_train, y_train, test_df)."""
+    X_train, y_train = load_training_data(train_data_path)
+    test_df = read_table(test_data_path)
+    return X_train, y_train, test_df
+
+
+def fit_model(name, X_train, y_train, params=None):
+    """Train one classifier (with make_model params) and return (fitted estimator, seconds)."""
+    with stage(f'fit_{name}', len(X_train)):
+        start = time.perf_counter()
+        clf = make_model(name, **(params or {}))
+        clf.fit(X_train, y_train)
+        return clf, time.perf_counter() - start
+
+
+def train_models(names, X_train, y_train, workers=None, model_params=None):
+    """Train several classifiers on the same data, concurrently on a thread pool.
+
+    Threads share the already loaded training frame instead of copying it to
+    worker processes; the sklearn fit loops release the GIL for most of their
+    work. model_params is {name: make_model params} for the models that do not
+    use their defaults. Returns {name: (fitted estimator, seconds)}.
+    """
+    names = list(names)
+    model_params = model_params or {}
+    if workers == 1 or len(names) <= 1:
+        return {name: fit_model(name, X_train, y_train, model_params.get(name)) for name in names}
+    with ThreadPoolExecutor(max_workers=workers or len(names)) as pool:
+        futures = {name: pool.submit(fit_model, name, X_train, y_train, model_params.get(name)) for name in names}
+        return {name: future.result() for name, future in futures.items()}
+
+
+def predict_models(models, test_df):
+    """Predict the test set with every fitted model: {name: predictions}."""
+    features = test_df.drop(columns=[LABEL_COLUMN], errors='ignore')
+    predictions = {}
+    for name, clf in models.items():
+        with stage(f'predict_{name}', len(features)):
+            predictions[name] = clf.predict(features)
+    return predictions
+
+
+def write_predictions(test_df, predictions, output_dir, fmt=DEFAULT_FORMAT, exports=()):
+    """Save one Test_with_Predictions_* file per model and return {name: path}.
+
+    exports lists extra human-readable formats (e.g. 'xlsx') written next to
+    each file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {}
+    for name, labels in predictions.items():
+        output_df = test_df.copy()
+        output_df[LABEL_COLUMN] = labels
+        paths[name] = write_table(output_df, os.path.join(output_dir, prediction_file_name(name, fmt)))
+        write_exports(output_df, paths[name], exports)
+    return paths
+
+
+def save_models(fitted, feature_columns, model_dir):
+    """Save {name: (estimator, fit seconds)} as new artifact versions: {name: version folder}."""
+    return {name: save_model(clf, name, feature_columns, model_dir, fit_seconds=round(fit_seconds, 4))
+            for name, (clf, fit_seconds) in fitted.items()}
+
+
+def load_models(names, model_dir, version=None, mmap=True):
+    """Load saved models without refitting: {name: (estimator, meta)}."""
+    return {name: load_model(model_dir, name, version, mmap) for name in names}
+
+
+def run_classifiers(names, train_data_path, test_data_path, output_dir, workers=None, model_dir=None,
+                    model_params=None, fmt=DEFAULT_FORMAT, exports=()):
+    """Load the data once, train the named classifiers and write all their predictions.
+
+    With model_dir set the fitted models are also saved as versioned artifacts
+    (see artifacts.save_model); a k-NN index is saved with its model and
+    reused by every later prediction run. The predictions are written in fmt
+    plus the exports formats. Returns {name: (output path, fit seconds)}.
+    """
+    # Fail on an unusable output folder before any model is trained or saved
+    os.makedirs(output_dir, exist_ok=True)
+    X_train, y_train, test_df = load_datasets(train_data_path, test_data_path)
+    fitted = train_models(names, X_train, y_train, workers, model_params)
+    if model_dir:
+        save_models(fitted, X_train.columns, model_dir)
+    predictions = predict_models({name: clf for name, (clf, _) in fitted.items()}, test_df)
+    paths = write_predictions(test_df, predictions, output_dir, fmt, exports)
+    return {name: (paths[name], fitted[name][1]) for name in fitted}
+
+
+def predict_saved(names, test_data_path, output_dir, model_dir, version=None, model_params=None,
+                  fmt=DEFAULT_FORMAT, exports=()):
+    """Predict-only path: score the test data with saved models and write their predictions.
+
+    model_params ({name: params}) sets query-time parameters of the loaded
+    estimators, such as n_probe of an ivf k-NN index; parameters an estimator
+    does not have are ignored. Returns {name: output path}.
+    """
+    test_df = read_table(test_data_path)
+    models = load_models(names, model_dir, version)
+    for name, params in (model_params or {}).items():
+        if name in models:
+            clf = models[name][0]
+            clf.set_params(**{key: value for key, value in params.items() if key in clf.get_params()})
+    predictions = {name: predict_with_model(clf, meta, test_df) for name, (clf, meta) in models.items()}
+    return write_predictions(test_df, predictions, output_dir, fmt, exports)
@@ -0,0 +1,128 @@
+"""Dataset I/O between pipeline stages.
+
+The stages used to hand their tables to each other as Excel workbooks,
+which are slow to write and parse and lose dtypes and index levels. Every
+stage now loads and saves its tables through read_table and write_table.
+The format follows the file extension:
+
+- ``parquet`` (the default): columnar and binary; the dtypes and the index,
+  including the (scenario, seed, sensor) levels, round-trip exactly
+- ``csv`` and ``xlsx``: for humans, written only as explicit exports
+
+CSV and Excel files are written flat: a named index becomes ordinary
+leading columns, so they open as plain tables.
+
+Every file is written under a temporary name and moved into place when
+complete (atomic_path), so a reader or a second writer of the same output,
+such as a retried task on another machine, never sees a partial file.
+"""
+import os
+import socket
+from contextlib import contextmanager
+
+import pandas as pd
+
+from netsim_pipeline.instrument import stage
+
+# File extension of every supported format
+FORMATS = {'parquet': '.parquet', 'csv': '.csv', 'xlsx': '.xlsx'}
+
+
+def have_pyarrow():
+    """True when pyarrow (the Parquet engine and the multithreaded CSV reader) is installed."""
+    try:
+        import pyarrow  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+# Format of the intermediate tables; CSV when no Parquet engine is installed
+DEFAULT_FORMAT = 'parquet' if have_pyarrow() else 'csv'
+
+
+def table_format(path):
+    """Format of a table file, from its extension."""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.xls':
+        return 'xlsx'
+    for fmt, fmt_extension in FORMATS.items():
+        if extension == fmt_extension:
+            return fmt
+    raise ValueError(f"Unknown table format {extension!r} of {path}; expected one of {list(FORMATS.values())}")
+
+
+def with_format(path, fmt):
+    """path with the extension of fmt."""
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown table format {fmt!r}; expected one of {list(FORMATS)}")
+    return os.path.splitext(path)[0] + FORMATS[fmt]
+
+
+@contextmanager
+def atomic_path(path):
+    """Temporary path to write path's content to; it replaces path when the block succeeds.
+
+    The temporary name is unique per host and process and keeps path's
+    extension, so pandas and matplotlib still pick the format from it.
+    """
+    root, extension = os.path.splitext(path)
+    temp_path = f'{root}.{socket.gethostname()}-{os.getpid()}.tmp{extension}'
+    try:
+        yield temp_path
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def read_table(path, index_col=None, columns=None):
+    """Load a table in any supported format.
+
+    Parquet files restore their own index; for CSV and Excel, index_col
+    names the leading columns to use as the index.
+    """
+    fmt = table_format(path)
+    with stage(f'read_{fmt}') as info:
+        if fmt == 'parquet':
+            df = pd.read_parquet(path, columns=columns)
+        elif fmt == 'csv':
+            df = pd.read_csv(path, index_col=index_col, usecols=columns)
+        else:
+            df = pd.read_excel(path, index_col=index_col, usecols=columns)
+        info['rows'] = len(df)
+    return df
+
+
+def write_table(df, path, sheet_name='Sheet1'):
+    """Save a table in the format of path's extension and return path.
+
+    A meaningful index (named or multi-level) is kept: natively in Parquet,
+    as leading columns in CSV and Excel.
+    """
+    fmt = table_format(path)
+    with stage(f'write_{fmt}', len(df)), atomic_path(path) as temp_path:
+        if fmt == 'parquet':
+            df.to_parquet(temp_path)
+            return path
+        flat = df.reset_index() if any(name is not None for name in df.index.names) else df
+        if fmt == 'csv':
+            flat.to_csv(temp_path, index=False)
+        else:
+            with pd.ExcelWriter(temp_path, engine='xlsxwriter') as writer:
+                flat.to_excel(writer, index=False, sheet_name=sheet_name)
+    return path
+
+
+def write_exports(df, path, exports, sheet_name='Sheet1'):
+    """Human-readable copies of a saved table next to it, one per format in exports: [paths]."""
+    return [write_table(df, with_format(path, fmt), sheet_name) for fmt in exports
+            if with_format(path, fmt) != path]
+
+
+def add_arguments(parser):
+    """Add the --format and --export options to a script's argparse parser."""
+    parser.add_argument('--format', choices=list(FORMATS), default=DEFAULT_FORMAT,
+                        help='format of the tables handed to the next stage (default: %(default)s)')
+    parser.add_argument('--export', nargs='+', choices=list(FORMATS), default=[],
+                        help='also write human-readable copies in these formats, e.g. xlsx csv')
@@ -0,0 +1,225 @@
+"""Vectorized evaluation of several classifiers against one labelled test set.
+
+The ground truth is loaded once. The predictions of every model are stacked
+into one integer-coded array, and all confusion matrices come out of a single
+bincount. Accuracy, precision, recall and F1 are derived from those matrices
+instead of one sklearn call per metric. The matrices are multi-class safe: a
+class that is missing from the truth or from a model's predictions is
+simply a zero row or column, never an unpacking error.
+
+For binary 0/1 labels the summary metrics are those of the malicious class
+(1), as sklearn's defaults; for other label sets they are macro averages.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+from matplotlib.patches import Rectangle
+
+from netsim_pipeline.classifiers import LABEL_COLUMN
+from netsim_pipeline.dataio import read_table
+from netsim_pipeline.instrument import stage
+
+# Summary metric columns of the report, in order
+METRIC_COLUMNS = ['accuracy', 'precision', 'recall', 'f1']
+
+# Colors of the correct (diagonal) and wrong (off-diagonal) cells
+CORRECT_COLOR = '#9ecae1'  # Light sky blue
+WRONG_COLOR = '#a1d99b'  # Light green
+
+
+def confusion_matrices(actual, predictions):
+    """Confusion matrix of every model from one bincount.
+
+    actual is the true label per row and predictions is {name: predicted
+    labels}. Returns (labels, {name: counts}) where counts[i, j] is the number
+    of rows of true class labels[i] predicted as labels[j].
+    """
+    actual = np.asarray(actual)
+    names = list(predictions)
+    predicted = np.vstack([np.asarray(predictions[name]) for name in names]) if names else np.empty((0, len(actual)))
+    if predicted.shape[1] != len(actual):
+        raise ValueError(f"Predictions have {predicted.shape[1]} rows but the ground truth has {len(actual)}")
+
+    # Code every label once against the union of all classes
+    labels = np.unique(np.concatenate([actual, predicted.ravel()]))
+    n = len(labels)
+    actual_codes = np.searchsorted(labels, actual)
+    predicted_codes = np.searchsorted(labels, predicted)
+
+    model_codes = np.arange(len(names))[:, None]
+    flat = (model_codes * n + actual_codes[None, :]) * n + predicted_codes
+    counts = np.bincount(flat.ravel(), minlength=len(names) * n * n).reshape(len(names), n, n)
+    return labels, {name: counts[i] for i, name in enumerate(names)}
+
+
+def per_class_metrics(counts):
+    """Precision, recall and F1 of every class of one confusion matrix (0 where undefined)."""
+    tp = np.diag(counts).astype(float)
+    predicted = counts.sum(axis=0)
+    actual = counts.sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        precision = np.where(predicted > 0, tp / predicted, 0.0)
+        recall = np.where(actual > 0, tp / actual, 0.0)
+        f1 = np.where(precision + recall > 0, 2 * precision * recall / (precision + recall), 0.0)
+    return precision, recall, f1
+
+
+def summarize_confusion(labels, counts):
+    """Summary metrics of one confusion matrix as a dict.
+
+    Binary 0/1 labels also get TP/TN/FP/FN of the malicious class.
+    """
+    precision, recall, f1 = per_class_metrics(counts)
+    total = counts.sum()
+    summary = {'accuracy': np.trace(counts) / total if total else 0.0}
+    if set(labels.tolist()) <= {0, 1}:
+        # Pad to the full 2x2 matrix so a class missing from this test set still counts as zero
+        full = np.zeros((2, 2), dtype=int)
+        full[np.ix_(labels.astype(int), labels.astype(int))] = counts
+        positive = list(labels).index(1) if 1 in labels else None
+        summary.update({
+            'precision': precision[positive] if positive is not None else 0.0,
+            'recall': recall[positive] if positive is not None else 0.0,
+            'f1': f1[positive] if positive is not None else 0.0,
+            'TP': full[1, 1], 'TN': full[0, 0], 'FP': full[0, 1], 'FN': full[1, 0],
+        })
+    else:
+        summary.update({'precision': precision.mean(), 'recall': recall.mean(), 'f1': f1.mean()})
+    return summary
+
+
+def evaluate(actual, predictions):
+    """Score every model in one pass.
+
+    Returns (metrics, confusions, per_class): one summary row per model,
+    {name: labelled confusion DataFrame}, and per-class precision, recall and
+    F1 indexed by (model, class).
+    """
+    with stage('confusion', len(actual) * len(predictions)):
+        labels, matrices = confusion_matrices(actual, predictions)
+
+    rows, confusions, per_class = {}, {}, {}
+    for name, counts in matrices.items():
+        rows[name] = summarize_confusion(labels, counts)
+        confusions[name] = pd.DataFrame(counts, index=pd.Index(labels, name='actual'),
+                                        columns=pd.Index(labels, name='predicted'))
+        precision, recall, f1 = per_class_metrics(counts)
+        per_class[name] = pd.DataFrame({'precision': precision, 'recall': recall, 'f1': f1,
+                                        'support': counts.sum(axis=1)}, index=pd.Index(labels, name='class'))
+
+    metrics = pd.DataFrame.from_dict(rows, orient='index')
+    metrics = metrics[METRIC_COLUMNS + [column for column in metrics.columns if column not in METRIC_COLUMNS]]
+    metrics.index.name = 'model'
+    per_class = pd.concat(per_class, names=['model']) if per_class else pd.DataFrame()
+    return metrics, confusions, per_class
+
+
+def load_ground_truth(path, label_column=LABEL_COLUMN):
+    """True labels of the test set, read once."""
+    return read_table(path)[label_column]
+
+
+def load_predictions(paths, label_column=LABEL_COLUMN):
+    """{name: predicted labels} from {name: prediction file (Parquet, CSV or Excel)}."""
+    return {name: read_table(path)[label_column] for name, path in paths.items()}
+
+
+def write_report(metrics, confusions, per_class, report_path):
+    """One workbook: a Metrics sheet, a Per_Class sheet and one confusion-matrix sheet per model."""
+    with stage('to_excel'):
+        with pd.ExcelWriter(report_path, engine='xlsxwriter') as writer:
+            metrics.to_excel(writer, sheet_name='Metrics')
+            per_class.to_excel(writer, sheet_name='Per_Class')
+            for name, confusion in confusions.items():
+                confusion.to_excel(writer, sheet_name=f'CM_{name}'[:31])
+    return report_path
+
+
+def metrics_text(summary):
+    """Metric block printed under a confusion-matrix figure."""
+    lines = []
+    if 'TP' in summary:
+        lines += [f"True Positives (TP): {int(summary['TP'])}",
+                  f"True Negatives (TN): {int(summary['TN'])}",
+                  f"False Positives (FP): {int(summary['FP'])}",
+                  f"False Negatives (FN): {int(summary['FN'])}", '']
+    lines += [f"Accuracy: {summary['accuracy']:.4f}",
+              f"Precision: {summary['precision']:.4f}",
+              f"Recall: {summary['recall']:.4f}",
+              f"F1 Score: {summary['f1']:.4f}"]
+    return '\n'.join(lines)
+
+
+def draw_confusion(ax, confusion, title, fontsize=30):
+    """Annotated confusion matrix: correct cells in blue, wrong cells in green."""
+    counts = confusion.to_numpy()
+    correct = np.eye(len(counts), dtype=bool)
+    colors = np.where(correct, CORRECT_COLOR, WRONG_COLOR)
+    for i in range(len(counts)):
+        for j in range(len(counts)):
+            ax.add_patch(Rectangle((j, i), 1, 1, facecolor=colors[i, j], edgecolor='black', linewidth=1))
+            ax.text(j + 0.5, i + 0.5, f'{counts[i, j]}', ha='center', va='center', fontsize=fontsize)
+    ax.set_xlim(0, len(counts))
+    ax.set_ylim(len(counts), 0)
+    ax.set_xticks(np.arange(len(counts)) + 0.5)
+    ax.set_yticks(np.arange(len(counts)) + 0.5)
+    ax.set_xticklabels(confusion.columns)
+    ax.set_yticklabels(confusion.index)
+    ax.set_xlabel('Predicted', fontsize=fontsize * 0.7)
+    ax.set_ylabel('Actual', fontsize=fontsize * 0.7)
+    ax.tick_params(axis='both', which='major', labelsize=fontsize * 0.8)
+    ax.set_title(title, fontsize=fontsize)
+
+
+def render_confusion(confusion, summary, title, output_path):
+    """Save one model's confusion matrix with its metrics below it (headless)."""
+    with stage('render'):
+        fig = Figure(figsize=(12, 8))
+        FigureCanvasAgg(fig)
+        ax = fig.add_subplot()
+        draw_confusion(ax, confusion, title)
+        fig.text(0.5, -0.08, metrics_text(summary), ha='center', va='top', fontsize=25,
+                 bbox=dict(facecolor='white', alpha=0.8))
+        fig.tight_layout(rect=[0, 0.1, 1, 0.9])
+        fig.savefig(output_path, bbox_inches='tight')
+    return output_path
+
+
+def render_overview(confusions, metrics, titles, output_path):
+    """Save all models' confusion matrices side by side, each titled with its accuracy and F1."""
+    with stage('render'):
+        fig = Figure(figsize=(7 * max(1, len(confusions)), 7))
+        FigureCanvasAgg(fig)
+        for i, (name, confusion) in enumerate(confusions.items(), start=1):
+            ax = fig.add_subplot(1, len(confusions), i)
+            summary = metrics.loc[name]
+            draw_confusion(ax, confusion, f"{titles.get(name, name)}\nacc {summary['accuracy']:.3f}, "
+                                          f"F1 {summary['f1']:.3f}", fontsize=20)
+        fig.tight_layout()
+        fig.savefig(output_path, bbox_inches='tight')
+    return output_path
+
+
+def run_evaluation(truth_path, prediction_paths, output_dir, titles=None, figures=True):
+    """Load the ground truth once, score every prediction file and write the report and figures.
+
+    Returns (metrics, report path, figure paths).
+    """
+    titles = titles or {}
+    os.makedirs(output_dir, exist_ok=True)
+    actual = load_ground_truth(truth_path)
+    metrics, confusions, per_class = evaluate(actual, load_predictions(prediction_paths))
+    report_path = write_report(metrics, confusions, per_class, os.path.join(output_dir, 'Evaluation_Report.xlsx'))
+
+    figure_paths = []
+    if figures:
+        for name, confusion in confusions.items():
+            title = f'Confusion Matrix for {titles.get(name, name)} Classifier'
+            figure_paths.append(render_confusion(confusion, metrics.loc[name], title,
+                                                 os.path.join(output_dir, f'Confusion_Matrix_{name}.png')))
+        figure_paths.append(render_overview(confusions, metrics, titles,
+                                            os.path.join(output_dir, 'Confusion_Matrix_All.png')))
+    return metrics, report_path, figure_paths
@@ -0,0 +1,267 @@
+"""Per-sensor communication-graph features from the SOURCE_ID/RECEIVER_ID pairs of a trace.
+
+The counters of trace_features only say how many packets a sensor sent or
+received. Here every successful packet of a counter family (DAO, DIO,
+sensing) is an edge source -> receiver. One vectorized pass over the trace
+builds a sparse node x node adjacency matrix per family whose entries are
+packet counts (scipy.sparse sums the duplicate edges), and the per-node
+metrics are computed from the matrices with sparse row/column reductions:
+
+- ``In_Degree`` / ``Out_Degree``: distinct nodes a node received from / sent to
+- ``Fan_In_Concentration``: Herfindahl index of the senders' shares of a
+  node's incoming packets (1 = everything from one sender, near 0 = spread
+  evenly over many)
+- ``PageRank``: stationary share of a random walk along the packet-weighted
+  edges, found by sparse power iteration
+
+Nothing loops over nodes or edges in Python and no dense node x node matrix
+is ever built, so memory and time grow with the number of distinct edges.
+Like aggregate_trace, aggregate_edges returns a partial result that can be
+added up over the chunks of a streamed trace.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from netsim_pipeline.dataio import read_table, write_table
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.nodes import intern, node_kinds, node_numbers, sensor_labels
+from netsim_pipeline.trace_features import (FAMILIES, NON_SENSOR_KINDS, aggregate_trace, check_columns, finalize_counts,
+                                             iter_trace_frames, packet_families, read_seed_frames, write_seed_counts)
+
+# Graph metrics computed for every counter family
+GRAPH_METRICS = ['In_Degree', 'Out_Degree', 'Fan_In_Concentration', 'PageRank']
+
+# Per-sensor graph columns, in the order they are written to Sensor_Graph_Features.csv
+GRAPH_COLUMNS = [f'{family}_{metric}' for family in FAMILIES for metric in GRAPH_METRICS]
+
+# Classifier feature names of the graph columns, in the style of merge.FEATURE_NAMES
+GRAPH_FEATURE_NAMES = {column: column.replace('_', ' ') for column in GRAPH_COLUMNS}
+
+# Graph feature columns in classifier order
+GRAPH_FEATURE_COLUMNS = [GRAPH_FEATURE_NAMES[column] for column in GRAPH_COLUMNS]
+
+# Name of the per-seed graph features file written next to each Packet Trace
+GRAPH_FILE_NAME = 'Sensor_Graph_Features.csv'
+
+# Power iteration settings of the PageRank centrality
+DAMPING = 0.85
+PAGERANK_TOL = 1e-10
+PAGERANK_MAX_ITER = 100
+
+
+def aggregate_edges(df):
+    """Count packets per (family, source, receiver) edge.
+
+    Returns a Series indexed by (family, source ID, receiver ID), e.g.
+    ('DAO', 'SENSOR-5', 'SINKNODE-46'). Partial results from several frames
+    can simply be added together before calling finalize_graph.
+    """
+    with stage('aggregate_edges', len(df)):
+        return _aggregate_edges(df)
+
+
+def _aggregate_edges(df):
+    family = packet_families(df)
+    source_codes, sources = intern(df['SOURCE_ID'])
+    receiver_codes, receivers = intern(df['RECEIVER_ID'])
+
+    # One node table for both columns; only the distinct IDs are mapped
+    nodes = pd.Index(np.asarray(sources, dtype=object)).union(pd.Index(np.asarray(receivers, dtype=object)))
+    keep = (family >= 0) & (source_codes >= 0) & (receiver_codes >= 0)
+    source = nodes.get_indexer(np.asarray(sources, dtype=object))[source_codes[keep]]
+    receiver = nodes.get_indexer(np.asarray(receivers, dtype=object))[receiver_codes[keep]]
+
+    # Row family * n + source of a stacked (families * n) x n matrix; converting to CSR sums the duplicate edges
+    n = len(nodes)
+    rows = family[keep].astype(np.int64) * n + source
+    adjacency = sparse.coo_matrix((np.ones(len(rows), dtype=np.int64), (rows, receiver)),
+                                  shape=(len(FAMILIES) * n, n)).tocsr().tocoo()
+
+    # The index keeps the integer codes; node names are stored once, in its levels
+    index = pd.MultiIndex(levels=[FAMILIES, nodes, nodes], codes=[adjacency.row // n, adjacency.row % n, adjacency.col],
+                          names=['family', 'source', 'receiver'], verify_integrity=False)
+    return pd.Series(adjacency.data, index=index.remove_unused_levels())
+
+
+def adjacency_matrices(edges):
+    """({family: n x n CSR matrix of packet counts}, node IDs) of an aggregate_edges result.
+
+    Works on the index codes, so summed partials with repeated edges need no
+    groupby: building the CSR matrices adds them up.
+    """
+    index = edges.index
+    families, sources, receivers = index.levels
+    nodes = sources.union(receivers)
+    family = np.array([FAMILIES.index(name) for name in families])[index.codes[0]]
+    source = nodes.get_indexer(sources)[index.codes[1]]
+    receiver = nodes.get_indexer(receivers)[index.codes[2]]
+    weights = edges.to_numpy(dtype=float)
+
+    matrices = {}
+    for code, name in enumerate(FAMILIES):
+        mask = family == code
+        matrices[name] = sparse.csr_matrix((weights[mask], (source[mask], receiver[mask])),
+                                           shape=(len(nodes), len(nodes)))
+    return matrices, nodes
+
+
+def pagerank(adjacency, damping=DAMPING, tol=PAGERANK_TOL, max_iter=PAGERANK_MAX_ITER):
+    """PageRank of every node of a weighted sparse adjacency matrix (rows send to columns).
+
+    Each node passes its rank on in proportion to the packets it sent on
+    each edge; nodes that sent nothing spread theirs over all nodes.
+    """
+    n = adjacency.shape[0]
+    if n == 0:
+        return np.zeros(0)
+    out_weight = np.asarray(adjacency.sum(axis=1)).ravel()
+    dangling = out_weight == 0
+    # Row-stochastic transition matrix, transposed once so each step is one sparse mat-vec
+    transition = (sparse.diags(np.divide(1.0, out_weight, out=np.zeros(n), where=~dangling)) @ adjacency).T.tocsr()
+
+    rank = np.full(n, 1.0 / n)
+    for _ in range(max_iter):
+        updated = damping * (transition @ rank) + (damping * rank[dangling].sum() + 1 - damping) / n
+        converged = np.abs(updated - rank).sum() < tol
+        rank = updated
+        if converged:
+            break
+    return rank
+
+
+def graph_metrics(adjacency):
+    """Frame of GRAPH_METRICS columns for the nodes of one family's adjacency matrix."""
+    csc = adjacency.tocsc()
+    in_weight = np.asarray(csc.sum(axis=0)).ravel()
+    in_squares = np.asarray(csc.multiply(csc).sum(axis=0)).ravel()
+    return pd.DataFrame({
+        # Stored entries per column / row are the distinct senders / receivers
+        'In_Degree': np.diff(csc.indptr),
+        'Out_Degree': np.diff(adjacency.indptr),
+        'Fan_In_Concentration': np.divide(in_squares, in_weight ** 2, out=np.zeros(len(in_weight)),
+                                          where=in_weight > 0),
+        'PageRank': pagerank(adjacency),
+    })
+
+
+def finalize_graph(edges):
+    """Turn aggregate_edges output into the per-sensor graph features table.
+
+    The result is indexed by abbreviated sensor name ('S-5'), sorted by
+    sensor number, with one column per entry of GRAPH_COLUMNS. Sink nodes
+    and routers take part in the graph (PageRank flows through them) but
+    get no row.
+    """
+    if edges.empty:
+        return pd.DataFrame(columns=GRAPH_COLUMNS, dtype=float)
+    with stage('graph_metrics'):
+        matrices, nodes = adjacency_matrices(edges)
+        graph = pd.concat({name: graph_metrics(matrices[name]) for name in FAMILIES}, axis=1)
+        graph.columns = [f'{family}_{metric}' for family, metric in graph.columns]
+        graph.index = nodes
+
+    kinds = node_kinds(graph.index)
+    graph = graph[~np.isin(kinds, NON_SENSOR_KINDS)]
+    graph = graph.iloc[np.argsort(node_numbers(graph.index), kind='stable')]
+    graph.index = sensor_labels(graph.index)
+    graph.index.name = None
+    return graph[GRAPH_COLUMNS]
+
+
+def fold_chunk_graph(chunks):
+    """Per-sensor graph features folded over an iterable of trace frames."""
+    edges = None
+    for chunk in chunks:
+        chunk_edges = aggregate_edges(chunk)
+        edges = chunk_edges if edges is None else edges.add(chunk_edges, fill_value=0)
+    return finalize_graph(edges if edges is not None else pd.Series(dtype=float))
+
+
+def extract_graph(df):
+    """Per-sensor graph features table for an in-memory Packet Trace frame."""
+    check_columns(df.columns)
+    return finalize_graph(aggregate_edges(df))
+
+
+def extract_trace_graph(file_path, chunksize=None, cache=False, engine=None):
+    """Read a Packet Trace CSV (whole, streamed or cached, as extract_trace_counts) and return its graph features."""
+    return fold_chunk_graph(iter_trace_frames(file_path, chunksize, cache, engine))
+
+
+def write_seed_graph(graph, seed_path):
+    """Save a graph features table as the seed's Sensor_Graph_Features.csv and return its path."""
+    graph = graph.rename_axis('sensor')
+    return write_table(graph, os.path.join(seed_path, GRAPH_FILE_NAME))
+
+
+def graph_seed(task, chunksize=None, cache=False, engine=None):
+    """Runner task: write Sensor_Graph_Features.csv for one seed and return its path."""
+    return write_seed_graph(fold_chunk_graph(read_seed_frames(task, chunksize, cache, engine)), task.seed_path)
+
+
+def count_graph_frames(task, frames):
+    """Pipeline process step: write Sensor_Message_Counts.csv and Sensor_Graph_Features.csv from a seed's frames.
+
+    Returns (counts path, graph path).
+    """
+    counts = edges = None
+    for chunk in frames:
+        chunk_counts, chunk_edges = aggregate_trace(chunk), aggregate_edges(chunk)
+        counts = chunk_counts if counts is None else counts.add(chunk_counts, fill_value=0)
+        edges = chunk_edges if edges is None else edges.add(chunk_edges, fill_value=0)
+    counts_path = write_seed_counts(finalize_counts(counts if counts is not None else pd.Series(dtype=int)),
+                                    task.seed_path)
+    graph_path = write_seed_graph(finalize_graph(edges if edges is not None else pd.Series(dtype=float)),
+                                  task.seed_path)
+    return counts_path, graph_path
+
+
+def count_graph_seed(task, chunksize=None, cache=False, engine=None):
+    """Runner task: write both per-seed files from one read of the seed's trace; returns (counts path, graph path)."""
+    return count_graph_frames(task, read_seed_frames(task, chunksize, cache, engine))
+
+
+def graph_inputs(base_path, scenarios):
+    """(scenario, seed, Sensor_Graph_Features.csv path) for every seed that has one."""
+    inputs = []
+    for scenario in scenarios:
+        scenario_path = os.path.join(base_path, str(scenario))
+        if not os.path.isdir(scenario_path):
+            continue
+        for seed in sorted(os.listdir(scenario_path)):
+            file_path = os.path.join(scenario_path, seed, GRAPH_FILE_NAME)
+            if os.path.exists(file_path):
+                inputs.append((str(scenario), seed, file_path))
+    return inputs
+
+
+def merge_seed_graphs(inputs):
+    """Normalized graph features of every seed, indexed by (scenario, seed, sensor) like to_feature_dataset.
+
+    Each column is divided by its maximum over the sensors of the same seed,
+    as merge.normalize does with the counters, so network size does not
+    shift the scale of degrees and PageRank.
+    """
+    frames = {}
+    for scenario, seed, table in inputs:
+        if isinstance(table, str):
+            table = read_table(table, index_col=0)
+        table = table.reindex(columns=GRAPH_COLUMNS, fill_value=0).astype(float)
+        table.index = ['Sensor' + str(label).split('-')[1] for label in table.index]
+        frames[(str(scenario), str(seed))] = table.div(table.max().replace(0, 1), axis=1)
+
+    if not frames:
+        return pd.DataFrame(columns=GRAPH_FEATURE_COLUMNS,
+                            index=pd.MultiIndex.from_tuples([], names=['scenario', 'seed', 'sensor']))
+    with stage('concat_graph', len(frames)):
+        graphs = pd.concat(frames, names=['scenario', 'seed', 'sensor'])
+    return graphs.rename(columns=GRAPH_FEATURE_NAMES)
+
+
+def add_graph_features(features, graphs):
+    """Feature dataset with the graph feature columns appended (0 for sensors without a graph row)."""
+    joined = features.join(graphs.reindex(columns=GRAPH_FEATURE_COLUMNS))
+    return joined.fillna(dict.fromkeys(GRAPH_FEATURE_COLUMNS, 0.0))
@@ -0,0 +1,169 @@
+"""Out-of-core incremental training on the features of a whole scenario sweep.
+
+The batch scripts load one feature workbook and call fit. Here the features
+are never merged into one frame: the per-seed Sensor_Message_Counts.csv
+files are read a few seeds at a time, normalized and labelled exactly as
+merge does (normalization is per seed, so a batch needs no other seeds), and
+fed to estimators that learn with partial_fit:
+
+- ``lr``: logistic regression fitted by SGD (log loss)
+- ``svm``: linear SVM fitted by SGD (hinge loss)
+- ``nb``: Gaussian naive Bayes, whose running means and variances are exact
+
+Memory is bounded by one batch. After every checkpoint_every batches the
+models and the list of consumed batches are written atomically to a
+checkpoint file, so an interrupted run resumes where it stopped.
+"""
+import os
+import time
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.naive_bayes import GaussianNB
+
+from netsim_pipeline.artifacts import save_model
+from netsim_pipeline.classifiers import INCREMENTAL_ARTIFACTS, LABEL_COLUMN, LABEL_NAMES
+from netsim_pipeline.dataio import atomic_path
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.merge import FEATURE_COLUMNS, add_labels, counts_inputs, merge_seed_counts, normalize, to_feature_dataset
+from netsim_pipeline.scenarios import MALICIOUS_SENSORS
+
+# partial_fit counterparts of the batch classifiers (knn has none)
+INCREMENTAL_MODELS = {
+    'lr': lambda: SGDClassifier(loss='log_loss', random_state=42),
+    'svm': lambda: SGDClassifier(loss='hinge', random_state=42),
+    'nb': lambda: GaussianNB(),
+}
+
+# Artifact name of each incremental model, so saving one never adds a version to a batch-trained classifier
+ARTIFACT_NAMES = {model: artifact for artifact, model in INCREMENTAL_ARTIFACTS.items()}
+
+CHECKPOINT_FILE_NAME = 'incremental_checkpoint.joblib'
+
+
+def make_incremental_model(name):
+    """Fresh, unfitted partial_fit estimator for an INCREMENTAL_MODELS name."""
+    if name not in INCREMENTAL_MODELS:
+        raise ValueError(f"Unknown incremental classifier {name!r}; expected one of {sorted(INCREMENTAL_MODELS)}")
+    return INCREMENTAL_MODELS[name]()
+
+
+def seed_batches(base_path, scenarios, batch_seeds=8):
+    """Split the sweep's counts files into batches of batch_seeds seeds: [(key, inputs)].
+
+    The key ('2/seed1..2/seed8') names the batch in the checkpoint; nothing
+    is read until load_batch.
+    """
+    inputs = counts_inputs(base_path, scenarios)
+    batches = []
+    for start in range(0, len(inputs), batch_seeds):
+        chunk = inputs[start:start + batch_seeds]
+        key = f'{chunk[0][0]}/{chunk[0][1]}..{chunk[-1][0]}/{chunk[-1][1]}'
+        batches.append((key, chunk))
+    return batches
+
+
+def load_batch(inputs, malicious_map=MALICIOUS_SENSORS):
+    """Labelled feature rows of a batch of seeds, built as the merged dataset builds them."""
+    with stage('load_batch', len(inputs)) as info:
+        features = add_labels(to_feature_dataset(normalize(merge_seed_counts(inputs))), malicious_map)
+        info['rows'] = len(features)
+    return features
+
+
+def load_checkpoint(checkpoint_path):
+    """Saved training state, or None when there is no checkpoint."""
+    if not os.path.exists(checkpoint_path):
+        return None
+    return joblib.load(checkpoint_path)
+
+
+def checkpoint_epochs(checkpoint_path):
+    """Epochs a checkpoint has completed; 0 when there is none."""
+    state = load_checkpoint(checkpoint_path)
+    return state['epoch'] if state is not None else 0
+
+
+def save_checkpoint(state, checkpoint_path):
+    """Write the training state atomically: a crash mid-write keeps the previous checkpoint."""
+    with stage('checkpoint'):
+        os.makedirs(os.path.dirname(os.path.abspath(checkpoint_path)), exist_ok=True)
+        with atomic_path(checkpoint_path) as temp_path:
+            joblib.dump(state, temp_path)
+
+
+def train_incremental(names, batches, checkpoint_path=None, epochs=1, checkpoint_every=1,
+                      malicious_map=MALICIOUS_SENSORS, seed=42):
+    """partial_fit the named models over the batches, checkpointing as it goes.
+
+    batches is a seed_batches list. Every epoch visits the batches in a
+    seeded random order, so SGD does not see the scenarios in folder order
+    and a resumed run repeats the same order. With checkpoint_path set, a
+    matching checkpoint is resumed and its consumed batches are skipped.
+    Returns (models, state) where state holds the epoch, consumed batch keys,
+    rows and batches seen. A checkpoint that already completed epochs raises
+    ValueError instead of returning the same models again (check
+    checkpoint_epochs first to skip such a run).
+    """
+    names = list(names)
+    keys = [key for key, _ in batches]
+    classes = np.array(sorted(LABEL_NAMES))
+
+    state = load_checkpoint(checkpoint_path) if checkpoint_path else None
+    if state is not None:
+        if sorted(state['models']) != sorted(names) or state['batches'] != keys:
+            raise ValueError(f"Checkpoint {checkpoint_path} was written for other models or inputs; "
+                             "remove it or pass a different checkpoint path")
+        if state['epoch'] >= epochs:
+            raise ValueError(f"Checkpoint {checkpoint_path} already finished {state['epoch']} epochs; "
+                             f"train for more than {state['epoch']} epochs or remove it to start over")
+        print(f"Resuming from epoch {state['epoch'] + 1}, {len(state['done'])} of {len(keys)} batches done")
+    else:
+        state = {'models': {name: make_incremental_model(name) for name in names}, 'batches': keys,
+                 'epoch': 0, 'done': [], 'rows_seen': 0, 'batches_seen': 0, 'seconds': 0.0}
+
+    models = state['models']
+    since_checkpoint = 0
+    while state['epoch'] < epochs:
+        order = np.random.default_rng(seed + state['epoch']).permutation(len(batches))
+        done = set(state['done'])
+        for i in order:
+            key, inputs = batches[i]
+            if key in done:
+                continue
+            start = time.perf_counter()
+            features = load_batch(inputs, malicious_map)
+            X = features[FEATURE_COLUMNS].astype(float)
+            y = features[LABEL_COLUMN].to_numpy()
+            for name, clf in models.items():
+                with stage(f'partial_fit_{name}', len(X)):
+                    clf.partial_fit(X, y, classes=classes)
+
+            state['done'].append(key)
+            state['rows_seen'] += len(X)
+            state['batches_seen'] += 1
+            state['seconds'] += time.perf_counter() - start
+            since_checkpoint += 1
+            if checkpoint_path and since_checkpoint >= checkpoint_every:
+                save_checkpoint(state, checkpoint_path)
+                since_checkpoint = 0
+
+        state['epoch'] += 1
+        state['done'] = []
+        if checkpoint_path:
+            save_checkpoint(state, checkpoint_path)
+            since_checkpoint = 0
+    return models, state
+
+
+def save_incremental(models, state, model_dir):
+    """Save the incrementally trained models as new artifact versions: {name: version folder}.
+
+    They are saved under their ARTIFACT_NAMES, next to and never in place of
+    the batch-trained classifiers of the same model_dir.
+    """
+    return {name: save_model(clf, ARTIFACT_NAMES[name], FEATURE_COLUMNS, model_dir, training='incremental',
+                             epochs=state['epoch'], rows_seen=state['rows_seen'],
+                             batches_seen=state['batches_seen'], fit_seconds=round(state['seconds'], 4))
+            for name, clf in models.items()}
@@ -0,0 +1,420 @@
+"""Stage timers, throughput, memory and profiler hooks for the pipeline.
+
+A script creates an Instrumentation for its run and wraps its stages in
+``instrumentation.stage(name)``. Each top-level stage records its wall time,
+rows per second and the peak RSS of the process, sampled in the background
+(with psutil installed, its worker processes are included). On request it
+also records the peak of Python-tracked allocations and a cProfile or
+pyinstrument capture.
+
+The library functions call the module-level ``stage`` hook around their hot
+spots (read_csv, the aggregation, to_excel, model fitting, figure rendering).
+The hook is a no-op unless an Instrumentation is active in the process. Under
+a top-level stage, hook timings are accumulated as ``<stage>/<hook>`` with a
+call count. Every thread keeps its own stage stack. A helper thread without
+a stage of its own counts its hooks under the stage it was handed with
+nest_under (the prefetch reader), else under the oldest top-level stage open
+in the process (a thread pool). Hooks that run in
+runner worker processes are collected there under one stage per task and
+merged back into the parent's report.
+
+write_report saves the run as JSON or CSV (picked by the file extension).
+"""
+import cProfile
+import csv
+import io
+import json
+import os
+import platform
+import pstats
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager, nullcontext
+from datetime import datetime, timezone
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Profilers a top-level stage can be captured with
+PROFILERS = ['cprofile', 'pyinstrument']
+
+# Columns of a stage record, in report order
+STAGE_FIELDS = ['stage', 'calls', 'seconds', 'rows', 'rows_per_s', 'rss_peak_mb', 'py_peak_mb', 'profile', 'note']
+
+# Instrumentation collecting the hooks of this process, if any
+_active = None
+
+
+def current_rss_mb():
+    """Resident set size in MB of this process plus its live child processes.
+
+    Uses psutil when it is installed. Otherwise falls back to /proc (this
+    process only) or to the process's lifetime peak from getrusage.
+    """
+    if psutil is not None:
+        process = psutil.Process()
+        rss = process.memory_info().rss
+        for child in process.children(recursive=True):
+            try:
+                rss += child.memory_info().rss
+            except psutil.Error:
+                pass
+        return round(rss / (1 << 20), 1)
+    try:
+        with open('/proc/self/statm') as f:
+            return round(int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE') / (1 << 20), 1)
+    except (OSError, ValueError, AttributeError):
+        pass
+    if resource is not None:
+        # Linux reports kilobytes, macOS bytes
+        maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return round(maxrss / (1 << 20 if platform.system() == 'Darwin' else 1 << 10), 1)
+    return None
+
+
+class _RssSampler(threading.Thread):
+    """Background thread tracking the peak of current_rss_mb while a stage runs."""
+
+    def __init__(self, interval):
+        super().__init__(name='rss-sampler', daemon=True)
+        self.interval = interval
+        self.peak = current_rss_mb()
+        self.stopped = threading.Event()
+
+    def run(self):
+        while not self.stopped.wait(self.interval):
+            self._sample()
+
+    def _sample(self):
+        rss = current_rss_mb()
+        if rss is not None and (self.peak is None or rss > self.peak):
+            self.peak = rss
+
+    def stop(self):
+        self.stopped.set()
+        self.join()
+        self._sample()
+        return self.peak
+
+
+class _Profile:
+    """cProfile or pyinstrument capture of one top-level stage."""
+
+    def __init__(self, kind):
+        if kind == 'pyinstrument':
+            try:
+                from pyinstrument import Profiler
+            except ImportError:
+                raise ImportError("--profile pyinstrument needs the pyinstrument package (pip install pyinstrument)") from None
+            self.profiler = Profiler()
+        elif kind == 'cprofile':
+            self.profiler = cProfile.Profile()
+        else:
+            raise ValueError(f"Unknown profiler {kind!r}; expected one of {PROFILERS}")
+        self.kind = kind
+
+    def start(self):
+        if self.kind == 'pyinstrument':
+            self.profiler.start()
+        else:
+            self.profiler.enable()
+
+    def stop(self, path_stem):
+        """Save the capture next to path_stem and return the main file's path."""
+        os.makedirs(os.path.dirname(os.path.abspath(path_stem)), exist_ok=True)
+        if self.kind == 'pyinstrument':
+            self.profiler.stop()
+            path = path_stem + '.html'
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(self.profiler.output_html())
+            return path
+
+        self.profiler.disable()
+        path = path_stem + '.prof'
+        self.profiler.dump_stats(path)
+        # Human-readable top functions next to the binary dump (open the .prof in snakeviz for more)
+        text = io.StringIO()
+        pstats.Stats(self.profiler, stream=text).sort_stats('cumulative').print_stats(30)
+        with open(path_stem + '.txt', 'w', encoding='utf-8') as f:
+            f.write(text.getvalue())
+        return path
+
+
+class Instrumentation:
+    """Stage records of one run; stage() times a block and collects the hooks called inside it.
+
+    With enabled=False every stage is a no-op, so scripts can wrap their
+    stages unconditionally. Extra keyword fields (sizes, options) are stored
+    with the run and repeated on every CSV row.
+    """
+
+    def __init__(self, run_name, enabled=True, profiler=None, profile_dir=None, trace_memory=False,
+                 sample_interval=0.05, **fields):
+        self.run_name = run_name
+        self.enabled = enabled
+        self.profiler = profiler
+        self.profile_dir = profile_dir or os.getcwd()
+        self.trace_memory = trace_memory
+        self.sample_interval = sample_interval
+        self.fields = fields
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.records = {}
+        self.lock = threading.Lock()
+        self._local = threading.local()
+        self._open = []  # top-level stages open in any thread, oldest first
+
+    def _stack(self):
+        # Top-level stage opened by the calling thread, if any (at most one)
+        if not hasattr(self._local, 'stack'):
+            self._local.stack = []
+        return self._local.stack
+
+    def _parent(self, stack):
+        # Stage the calling thread's hooks nest under, or None when a new one would be top-level
+        if stack:
+            return stack[0]
+        return getattr(self._local, 'parent', None) or (self._open[0] if self._open else None)
+
+    def current_stage(self):
+        """Name of the stage the calling thread's hooks are counted under, or None."""
+        with self.lock:
+            return self._parent(self._stack())
+
+    @contextmanager
+    def nest_under(self, name):
+        """Count the calling thread's hooks under stage name (for a helper thread started inside it)."""
+        previous = getattr(self._local, 'parent', None)
+        self._local.parent = name
+        try:
+            yield
+        finally:
+            self._local.parent = previous
+
+    def _record(self, key):
+        record = self.records.get(key)
+        if record is None:
+            record = self.records[key] = dict.fromkeys(STAGE_FIELDS)
+            record.update(stage=key, calls=0, seconds=0.0, note='')
+        return record
+
+    def _accumulate(self, key, seconds, rows):
+        with self.lock:
+            record = self._record(key)
+            record['calls'] += 1
+            record['seconds'] += seconds
+            if rows is not None:
+                record['rows'] = (record['rows'] or 0) + rows
+
+    @contextmanager
+    def stage(self, name, rows=None):
+        """Time the enclosed block. Set ``info['rows']`` or ``info['note']`` on the yielded dict to report them."""
+        info = {'rows': rows, 'note': ''}
+        if not self.enabled:
+            yield info
+            return
+
+        stack = self._stack()
+        with self.lock:
+            parent = self._parent(stack)
+            top = parent is None
+            if top:
+                stack.append(name)
+                self._open.append(name)
+                # Create the record up front so a stage is listed before its hooks
+                self._record(name)
+            key = name if top else f'{parent}/{name}'
+        if not top:
+            start = time.perf_counter()
+            try:
+                yield info
+            finally:
+                self._accumulate(key, time.perf_counter() - start, info['rows'])
+            return
+
+        # A top-level stage also tracks memory and may be profiled
+        sampler = _RssSampler(self.sample_interval)
+        sampler.start()
+        if self.trace_memory:
+            tracemalloc.start()
+        profile = _Profile(self.profiler) if self.profiler else None
+        if profile:
+            profile.start()
+        start = time.perf_counter()
+        try:
+            yield info
+        finally:
+            seconds = time.perf_counter() - start
+            profile_path = profile.stop(os.path.join(self.profile_dir, f'{self.run_name}-{name}')) if profile else None
+            py_peak = None
+            if self.trace_memory:
+                py_peak = round(tracemalloc.get_traced_memory()[1] / (1 << 20), 1)
+                tracemalloc.stop()
+            rss_peak = sampler.stop()
+            stack.remove(name)
+            with self.lock:
+                self._open.remove(name)
+            self._accumulate(key, seconds, info['rows'])
+            with self.lock:
+                record = self.records[key]
+                record['rss_peak_mb'] = max(filter(None, [record['rss_peak_mb'], rss_peak]), default=None)
+                record['py_peak_mb'] = max(filter(None, [record['py_peak_mb'], py_peak]), default=None)
+                record['profile'] = profile_path
+                record['note'] = info['note']
+
+    def merge(self, stages):
+        """Add hook records collected in a worker process (see export) under the open top-level stage."""
+        stack = self._stack()
+        with self.lock:
+            parent = self._parent(stack)
+            prefix = f'{parent}/' if parent else ''
+            for name, (calls, seconds, rows) in stages.items():
+                record = self._record(prefix + name)
+                record['calls'] += calls
+                record['seconds'] += seconds
+                if rows is not None:
+                    record['rows'] = (record['rows'] or 0) + rows
+
+    def export(self):
+        """{hook: (calls, seconds, rows)} of the hooks under the top-level stages, small enough to send back.
+
+        The top-level stage (a worker's per-task stage) is left out of the
+        keys, so merge files the hooks under the parent's own stage.
+        """
+        stages = {}
+        with self.lock:
+            for key, record in self.records.items():
+                if '/' not in key:
+                    continue
+                hook = key.split('/', 1)[1]
+                calls, seconds, rows = stages.get(hook, (0, 0.0, None))
+                if record['rows'] is not None:
+                    rows = (rows or 0) + record['rows']
+                stages[hook] = (calls + record['calls'], seconds + record['seconds'], rows)
+        return stages
+
+    @contextmanager
+    def activate(self):
+        """Route the module-level stage hooks of this process to this Instrumentation."""
+        global _active
+        previous, _active = _active, (self if self.enabled else None)
+        try:
+            yield self
+        finally:
+            _active = previous
+
+    def stage_records(self):
+        """Stage records in first-seen order, with seconds rounded and rows per second filled in."""
+        records = []
+        with self.lock:
+            for record in self.records.values():
+                record = dict(record, seconds=round(record['seconds'], 4))
+                if record['rows'] and record['seconds']:
+                    record['rows_per_s'] = round(record['rows'] / record['seconds'], 1)
+                records.append(record)
+        return records
+
+    def report(self):
+        """The whole run as a JSON-serializable dict."""
+        return {
+            'run': self.run_name,
+            'started': self.started,
+            'total_seconds': round(time.perf_counter() - self.start, 4),
+            'host': platform.node(),
+            'python': platform.python_version(),
+            'fields': self.fields,
+            'stages': self.stage_records(),
+        }
+
+    def summary(self):
+        """Human-readable table of the stage records."""
+        lines = [f"{'stage':<40} {'calls':>6} {'seconds':>10} {'rows/s':>14} {'peak RSS MB':>12}"]
+        for record in self.stage_records():
+            lines.append(f"{record['stage']:<40} {record['calls']:>6} {record['seconds']:>10.3f} "
+                         f"{record['rows_per_s'] or '':>14} {record['rss_peak_mb'] or '':>12}")
+        return '\n'.join(lines)
+
+
+def stage(name, rows=None):
+    """Hook for library code: a stage of the active Instrumentation, or a no-op when there is none."""
+    if _active is None:
+        return _noop_stage(rows)
+    return _active.stage(name, rows)
+
+
+@contextmanager
+def _noop_stage(rows):
+    yield {'rows': rows, 'note': ''}
+
+
+def active():
+    """The Instrumentation active in this process, or None."""
+    return _active
+
+
+def current_stage():
+    """Stage the calling thread's hooks are counted under in the active Instrumentation, or None."""
+    return _active.current_stage() if _active is not None else None
+
+
+def nest_under(name):
+    """Hook for helper threads: count this thread's hooks under stage name (a no-op without one)."""
+    if _active is None or name is None:
+        return nullcontext()
+    return _active.nest_under(name)
+
+
+def write_report(instrumentation, path):
+    """Save the run report as JSON (.json) or as one CSV row per stage (any other extension)."""
+    report = instrumentation.report()
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    if path.lower().endswith('.json'):
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2)
+        return path
+
+    run_fields = {key: report[key] for key in ['run', 'started', 'total_seconds', 'host', 'python']}
+    run_fields.update(report['fields'])
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=list(run_fields) + STAGE_FIELDS)
+        writer.writeheader()
+        for record in report['stages']:
+            writer.writerow({**run_fields, **record})
+    return path
+
+
+def add_arguments(parser):
+    """Add the --report, --profile, --profile-dir and --trace-memory options to a script's parser."""
+    parser.add_argument('--report', default=None,
+                        help='write per-stage timings, rows/s and peak memory to this .json or .csv file')
+    parser.add_argument('--profile', choices=PROFILERS, default=None,
+                        help='also capture each stage with this profiler')
+    parser.add_argument('--profile-dir', default=None,
+                        help='folder for the profiler captures (default: current directory)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='also record peak Python allocations with tracemalloc (slows the stages down)')
+    return parser
+
+
+def from_args(args, run_name, **fields):
+    """Instrumentation configured by add_arguments' options; disabled unless a report or profile was requested."""
+    return Instrumentation(run_name, enabled=bool(args.report or args.profile), profiler=args.profile,
+                           profile_dir=args.profile_dir, trace_memory=args.trace_memory, **fields)
+
+
+def finish(instrumentation, args):
+    """Print the stage summary and write the --report file of an enabled Instrumentation."""
+    if not instrumentation.enabled:
+        return None
+    print(instrumentation.summary())
+    if args.report:
+        print(f"Stage report saved to {write_report(instrumentation, args.report)}")
+    return args.report
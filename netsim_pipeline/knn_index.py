@@ -0,0 +1,145 @@
+"""Index backends for the k-NN classifier.
+
+The default KNeighborsClassifier picks its neighbor search automatically,
+which on our data often means a brute-force scan of the whole training set
+for every test row. make_knn builds a k-NN classifier on an explicit index:
+
+- ``brute``, ``kd_tree``, ``ball_tree``: sklearn's exact searches (the trees
+  are built once in fit)
+- ``ivf``: IVFKNeighborsClassifier, an approximate inverted-file index. The
+  training rows are clustered into ``n_lists`` k-means cells, and a query only
+  scans the rows of its ``n_probe`` nearest cells. Raising n_probe trades
+  speed for recall; n_probe = n_lists is an exact search.
+
+Every index is a field of the fitted estimator, so it is built once, saved
+with the model artifact and reused by every prediction run.
+"""
+import numpy as np
+from sklearn.base import BaseEstimator, ClassifierMixin
+from sklearn.cluster import MiniBatchKMeans
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.utils.validation import check_is_fitted, validate_data
+
+# Index backends accepted by make_knn
+KNN_INDEXES = ['auto', 'brute', 'kd_tree', 'ball_tree', 'ivf']
+
+
+class IVFKNeighborsClassifier(ClassifierMixin, BaseEstimator):
+    """Approximate k-NN classifier on an inverted-file (k-means cell) index.
+
+    The training rows are stored sorted by cell, so each cell is one
+    contiguous, memory-mappable slice of ``_X``.
+    """
+
+    def __init__(self, n_neighbors=5, n_lists=None, n_probe=4, random_state=42):
+        self.n_neighbors = n_neighbors
+        self.n_lists = n_lists
+        self.n_probe = n_probe
+        self.random_state = random_state
+
+    def fit(self, X, y):
+        X, y = validate_data(self, X, y)
+        X = np.ascontiguousarray(X, dtype=float)
+        self.classes_, y_codes = np.unique(y, return_inverse=True)
+
+        # About sqrt(n) cells of about sqrt(n) rows each
+        n_lists = self.n_lists or max(1, int(np.sqrt(len(X))))
+        n_lists = min(n_lists, len(X))
+        kmeans = MiniBatchKMeans(n_clusters=n_lists, random_state=self.random_state, n_init=3,
+                                 batch_size=min(len(X), 4096)).fit(X)
+        cells = kmeans.labels_
+
+        order = np.argsort(cells, kind='stable')
+        self.centroids_ = kmeans.cluster_centers_
+        self._X = X[order]
+        self._y = y_codes[order].astype(np.intp)
+        self._offsets = np.concatenate([[0], np.cumsum(np.bincount(cells, minlength=n_lists))])
+        return self
+
+    def kneighbors(self, X, n_neighbors=None):
+        """(distances, indices into the cell-sorted training rows) of the approximate nearest neighbors."""
+        check_is_fitted(self)
+        X = np.ascontiguousarray(validate_data(self, X, reset=False), dtype=float)
+        k = min(n_neighbors or self.n_neighbors, len(self._X))
+        n_probe = min(self.n_probe, len(self.centroids_))
+
+        # Cells each query probes: its n_probe nearest centroids
+        centroid_distances = _squared_distances(X, self.centroids_)
+        probes = np.argpartition(centroid_distances, n_probe - 1, axis=1)[:, :n_probe]
+
+        best_distances = np.full((len(X), k), np.inf)
+        best_indices = np.full((len(X), k), -1, dtype=np.intp)
+        # Group the queries by probed cell, then scan cell by cell against all of its queries
+        probed_cells = probes.ravel()
+        order = np.argsort(probed_cells, kind='stable')
+        probing_queries = np.repeat(np.arange(len(X)), n_probe)[order]
+        bounds = np.searchsorted(probed_cells[order], np.arange(len(self.centroids_) + 1))
+        for cell in np.flatnonzero(np.diff(bounds)):
+            queries = probing_queries[bounds[cell]:bounds[cell + 1]]
+            start, end = self._offsets[cell], self._offsets[cell + 1]
+            if start == end:
+                continue
+            distances = _squared_distances(X[queries], self._X[start:end])
+            indices = np.broadcast_to(np.arange(start, end), distances.shape)
+
+            # Merge with the best neighbors found so far and keep the k nearest
+            merged_distances = np.hstack([best_distances[queries], distances])
+            merged_indices = np.hstack([best_indices[queries], indices])
+            keep = np.argpartition(merged_distances, k - 1, axis=1)[:, :k]
+            best_distances[queries] = np.take_along_axis(merged_distances, keep, axis=1)
+            best_indices[queries] = np.take_along_axis(merged_indices, keep, axis=1)
+
+        order = np.argsort(best_distances, axis=1)
+        return (np.sqrt(np.take_along_axis(best_distances, order, axis=1)),
+                np.take_along_axis(best_indices, order, axis=1))
+
+    def predict_proba(self, X):
+        _, indices = self.kneighbors(X)
+        votes = np.zeros((len(indices), len(self.classes_)))
+        found = indices >= 0
+        rows = np.broadcast_to(np.arange(len(indices))[:, None], indices.shape)
+        np.add.at(votes, (rows[found], self._y[indices[found]]), 1)
+        return votes / np.maximum(votes.sum(axis=1, keepdims=True), 1)
+
+    def predict(self, X):
+        return self.classes_[np.argmax(self.predict_proba(X), axis=1)]
+
+
+def _squared_distances(A, B):
+    # ||a - b||^2 = ||a||^2 - 2ab + ||b||^2, clipped at 0 against rounding
+    distances = (A * A).sum(axis=1)[:, None] - 2 * A @ B.T + (B * B).sum(axis=1)[None, :]
+    return np.maximum(distances, 0)
+
+
+def make_knn(index='auto', n_neighbors=5, **params):
+    """k-NN classifier on the given index backend (see KNN_INDEXES).
+
+    params go to the estimator, e.g. leaf_size for the trees or n_lists and
+    n_probe for ivf.
+    """
+    if index == 'ivf':
+        return IVFKNeighborsClassifier(n_neighbors=n_neighbors, **params)
+    if index not in KNN_INDEXES:
+        raise ValueError(f"Unknown k-NN index {index!r}; expected one of {KNN_INDEXES}")
+    return KNeighborsClassifier(n_neighbors=n_neighbors, algorithm=index, **params)
+
+
+def add_arguments(parser):
+    """Add the --knn-index, --n-lists and --n-probe options to a script's argparse parser."""
+    parser.add_argument('--knn-index', choices=KNN_INDEXES, default=None,
+                        help="neighbor index of the k-NN classifier (default: sklearn's automatic choice)")
+    parser.add_argument('--n-lists', type=int, default=None,
+                        help='ivf index: number of k-means cells (default: about sqrt of the training rows)')
+    parser.add_argument('--n-probe', type=int, default=None,
+                        help='ivf index: cells scanned per query; higher is slower but more exact (default: 4)')
+
+
+def from_args(args):
+    """make_model params of the k-NN classifier from add_arguments options, or None for the defaults."""
+    if args.knn_index is None:
+        return None
+    params = {'index': args.knn_index}
+    if args.knn_index == 'ivf':
+        params.update({key: value for key, value in (('n_lists', args.n_lists), ('n_probe', args.n_probe))
+                       if value is not None})
+    return params
@@ -0,0 +1,93 @@
+"""Input-fingerprint manifest for incremental rebuilds.
+
+The manifest maps every output the pipeline writes (Sensor_Message_Counts.csv,
+DAO.png, the merged workbooks, ...) to the size and mtime of the inputs it
+was built from. A later run only rebuilds outputs whose inputs changed,
+appeared or disappeared, or whose output file is missing or was replaced.
+
+Paths are stored relative to the manifest's folder (the Test-Scenarios base
+path), so the whole tree can be moved or mounted elsewhere.
+"""
+import json
+import os
+
+from netsim_pipeline.dataio import atomic_path
+
+# Manifest file kept in the scenarios base folder
+MANIFEST_FILE_NAME = '.pipeline_manifest.json'
+
+
+def fingerprint(path):
+    """Cheap change fingerprint of a file: [size, mtime_ns], or None if it does not exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_size, stat.st_mtime_ns]
+
+
+class Manifest:
+    """Output -> input fingerprints, persisted as JSON next to the scenario folders."""
+
+    def __init__(self, base_path, file_name=MANIFEST_FILE_NAME):
+        self.base_path = base_path
+        self.path = os.path.join(base_path, file_name)
+        self.entries = self._load()
+        self._updated = {}
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _key(self, path):
+        return os.path.relpath(path, self.base_path).replace(os.sep, '/')
+
+    def _inputs(self, inputs):
+        return {self._key(path): fingerprint(path) for path in inputs}
+
+    def is_stale(self, output, inputs):
+        """True if output must be rebuilt from inputs."""
+        entry = self.entries.get(self._key(output))
+        if entry is None:
+            return True
+        if fingerprint(output) is None or fingerprint(output) != entry['output']:
+            return True
+        return self._inputs(inputs) != entry['inputs']
+
+    def record(self, output, inputs):
+        """Remember that output was just built from inputs."""
+        entry = {'inputs': self._inputs(inputs), 'output': fingerprint(output)}
+        self.entries[self._key(output)] = entry
+        self._updated[self._key(output)] = entry
+
+    def save(self):
+        """Write the manifest, merging with entries other runs saved meanwhile."""
+        entries = self._load()
+        entries.update(self._updated)
+        with atomic_path(self.path) as temp_path, open(temp_path, 'w') as f:
+            json.dump(entries, f, indent=1, sort_keys=True)
+        self.entries = entries
+        self._updated = {}
+
+
+def seed_trace_path(task, trace_name='Packet Trace.csv'):
+    """Path of the Packet Trace a seed task is built from."""
+    return os.path.join(task.seed_path, trace_name)
+
+
+def stale_tasks(manifest, tasks, output_name, trace_name='Packet Trace.csv'):
+    """The tasks whose seed-folder output_name is out of date with their Packet Trace."""
+    return [task for task in tasks
+            if manifest.is_stale(os.path.join(task.seed_path, output_name), [seed_trace_path(task, trace_name)])]
+
+
+def record_results(manifest, results, output_name, trace_name='Packet Trace.csv'):
+    """Record every successful runner result's seed-folder output and save the manifest."""
+    for result in results:
+        if result.ok:
+            manifest.record(os.path.join(result.task.seed_path, output_name),
+                            [seed_trace_path(result.task, trace_name)])
+    manifest.save()
@@ -0,0 +1,172 @@
+"""In-memory merge and normalization of the per-seed counts.
+
+Each seed's Sensor_Message_Counts.csv (metrics as rows, sensors as columns)
+is concatenated into one frame indexed by (scenario, seed, metric), and every
+metric row is divided by its maximum across the seed's sensors in a single
+vectorized operation. The result can be reshaped into the classifier layout
+(one row per sensor, one column per feature) without any Excel round-trip.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from netsim_pipeline import dataio
+from netsim_pipeline.dataio import read_table
+from netsim_pipeline.graph_features import add_graph_features, merge_seed_graphs
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.trace_features import COUNT_COLUMNS, COUNTS_FILE_NAME
+
+# Classifier feature names (as in Training-Data.xlsx) for each counter
+FEATURE_NAMES = {
+    'DAO_Sent': 'DAO Sent',
+    'DAO_Received': 'DAO Received',
+    'DIO_Sent': 'DIO Sent',
+    'DIO_Received': 'DIO Received',
+    'Packet_Received': 'Data Packets Received',
+}
+
+# Feature columns in classifier order
+FEATURE_COLUMNS = [FEATURE_NAMES[column] for column in COUNT_COLUMNS]
+
+# Index levels of the merged counts
+MERGE_INDEX = ['scenario', 'seed', 'metric']
+
+# Tables the merge writes to the Test-Scenarios folder: file name and sheet name of Excel exports
+MERGED_TABLES = {
+    'merged': ('Merged_Sensor_Message_Counts', 'All_Data'),
+    'normalized': ('Normalized_Sensor_Message_Counts', 'Normalized_Data'),
+    'features': ('Normalized_Sensor_Features', 'Features'),
+}
+
+# How the classifier features are normalized, stored with every trained model
+NORMALIZATION = {
+    'method': 'row_max',
+    'description': 'each counter is divided by its maximum over the sensors of the same seed',
+    'counters': {FEATURE_NAMES[column]: column for column in COUNT_COLUMNS},
+}
+
+
+def counts_inputs(base_path, scenarios):
+    """(scenario, seed, Sensor_Message_Counts.csv path) for every seed that has one."""
+    inputs = []
+    for scenario in scenarios:
+        scenario_path = os.path.join(base_path, str(scenario))
+        if not os.path.isdir(scenario_path):
+            print(f"Folder {scenario} does not exist. Skipping...")
+            continue
+        for seed in sorted(os.listdir(scenario_path)):
+            file_path = os.path.join(scenario_path, seed, COUNTS_FILE_NAME)
+            if os.path.exists(file_path):
+                inputs.append((str(scenario), seed, file_path))
+    return inputs
+
+
+def _sensor_order(columns):
+    numbers = pd.to_numeric(pd.Index(columns).str.replace('Sensor', '', regex=False), errors='coerce')
+    return [columns[i] for i in np.argsort(numbers.to_numpy(), kind='stable')]
+
+
+def merge_seed_counts(inputs):
+    """Concatenate per-seed counts tables into one (scenario, seed, metric) x sensor frame.
+
+    inputs yields (scenario, seed, table) where table is either a
+    Sensor_Message_Counts.csv path or an already loaded metrics x sensors frame.
+    Sensors missing from a seed are NaN in that seed's rows.
+    """
+    frames = {}
+    for scenario, seed, table in inputs:
+        if isinstance(table, str):
+            table = read_table(table, index_col=0)
+        frames[(str(scenario), str(seed))] = table
+
+    if not frames:
+        return pd.DataFrame(index=pd.MultiIndex.from_tuples([], names=MERGE_INDEX))
+
+    with stage('concat', len(frames)):
+        merged = pd.concat(frames, names=MERGE_INDEX[:2])
+        merged.index.names = MERGE_INDEX
+        return merged[_sensor_order(list(merged.columns))]
+
+
+def normalize(merged):
+    """Divide every metric row by its maximum over the sensors.
+
+    Rows that are zero for every sensor stay zero instead of becoming NaN.
+    """
+    with stage('normalize', len(merged)):
+        max_values = merged.max(axis=1).replace(0, 1)
+        return merged.div(max_values, axis=0)
+
+
+def counts_to_features(counts):
+    """Normalized classifier features for one trace's per-sensor counts table.
+
+    Same normalization as normalize, applied to a single seed laid out with
+    sensors as rows.
+    """
+    counts = counts.reindex(columns=COUNT_COLUMNS, fill_value=0)
+    features = counts.div(counts.max().replace(0, 1), axis=1).astype(float)
+    return features.rename(columns=FEATURE_NAMES)
+
+
+def to_feature_dataset(normalized):
+    """Reshape normalized counts into one row per (scenario, seed, sensor) with classifier feature columns."""
+    with stage('reshape', len(normalized)):
+        return _reshape(normalized)
+
+
+def _reshape(normalized):
+    long = normalized.stack(future_stack=True).dropna()
+    long.index.names = MERGE_INDEX + ['sensor']
+    # unstack sorts the rows; put them back in scenario/seed/sensor-number order
+    rows = long.index.droplevel('metric').unique()
+    features = long.unstack('metric').reindex(index=rows, columns=COUNT_COLUMNS).fillna(0)
+    features = features.rename(columns=FEATURE_NAMES)
+    features.columns.name = None
+    return features
+
+
+def add_labels(features, malicious_map):
+    """Feature dataset with the Label column (1 = malicious) taken from a scenario's malicious sensors.
+
+    features is indexed by (scenario, seed, sensor) as returned by
+    to_feature_dataset; sensors are named 'Sensor5' and matched against the
+    'S-5' labels of malicious_map.
+    """
+    scenarios = features.index.get_level_values('scenario')
+    sensors = features.index.get_level_values('sensor').str.replace('Sensor', 'S-', regex=False)
+    malicious = {(str(scenario), sensor) for scenario, labels in malicious_map.items() for sensor in labels}
+    labeled = features.copy()
+    labeled['Label'] = [int((scenario, sensor) in malicious) for scenario, sensor in zip(scenarios, sensors)]
+    return labeled
+
+
+def merge_tables(inputs, graph_files=None):
+    """{'merged', 'normalized', 'features'} tables of a sweep's per-seed counts.
+
+    With graph_files (see graph_features.graph_inputs) the communication-graph
+    columns are appended to the features.
+    """
+    merged = merge_seed_counts(inputs)
+    normalized = normalize(merged)
+    features = to_feature_dataset(normalized)
+    if graph_files is not None:
+        features = add_graph_features(features, merge_seed_graphs(graph_files))
+    return {'merged': merged, 'normalized': normalized, 'features': features}
+
+
+def merged_table_paths(base_path, fmt, exports=()):
+    """{table: [path in fmt, export paths]} of the MERGED_TABLES in base_path."""
+    return {table: [os.path.join(base_path, file_name + dataio.FORMATS[f]) for f in dict.fromkeys([fmt, *exports])]
+            for table, (file_name, _) in MERGED_TABLES.items()}
+
+
+def write_merged_tables(tables, base_path, fmt, exports=()):
+    """Save merge_tables output, with optional exports, and return {table: path in fmt}."""
+    paths = {}
+    for table, (file_name, sheet_name) in MERGED_TABLES.items():
+        paths[table] = dataio.write_table(tables[table], os.path.join(base_path, file_name + dataio.FORMATS[fmt]),
+                                          sheet_name)
+        dataio.write_exports(tables[table], paths[table], exports, sheet_name)
+    return paths
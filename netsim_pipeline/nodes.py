@@ -0,0 +1,64 @@
+"""Integer-coded node IDs and trace columns.
+
+NetSim names nodes 'SENSOR-5', 'SINKNODE-46', 'ROUTER-47'. Instead of
+running string operations on every trace row, a column is interned once:
+the row values become compact integer codes into a small table of distinct
+values (a pandas categorical already is one). Only that table is parsed into
+a node kind and node number. Counting works on the integer codes, and names
+are rendered only for the output.
+"""
+from enum import IntEnum
+
+import numpy as np
+import pandas as pd
+
+
+class NodeKind(IntEnum):
+    """Role of a node in the NetSim scenario."""
+
+    SENSOR = 0
+    SINK = 1
+    ROUTER = 2
+    OTHER = 3
+
+
+def intern(values):
+    """(codes, uniques) of a trace column: int32 codes per row (-1 for missing) and the distinct values.
+
+    Categorical columns (read_csv with dtype='category', the Parquet cache)
+    are used as they are; other columns are factorized.
+    """
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        return values.cat.codes.to_numpy().astype(np.int32, copy=False), values.cat.categories
+    codes, uniques = pd.factorize(values)
+    return codes.astype(np.int32, copy=False), uniques
+
+
+def lookup(codes, table, missing):
+    """Per-row values of a per-unique table, with missing where the code is -1."""
+    # Code -1 picks the appended last entry
+    return np.append(np.asarray(table), missing)[codes]
+
+
+def node_kinds(ids):
+    """NodeKind of each node ID, as an int8 array.
+
+    Sink nodes and routers are recognized anywhere in the name (case
+    insensitive), as the original SINKNODE|ROUTER filter did.
+    """
+    upper = pd.Index(ids).astype(str).str.upper()
+    kinds = np.full(len(upper), NodeKind.OTHER, dtype=np.int8)
+    kinds[upper.str.startswith('SENSOR-')] = NodeKind.SENSOR
+    kinds[upper.str.contains('ROUTER', regex=False)] = NodeKind.ROUTER
+    kinds[upper.str.contains('SINKNODE', regex=False)] = NodeKind.SINK
+    return kinds
+
+
+def node_numbers(ids):
+    """Number after the first '-' of each node ID, as floats (NaN when there is none)."""
+    return pd.to_numeric(pd.Index(ids).astype(str).str.split('-').str[1], errors='coerce').to_numpy(dtype=float)
+
+
+def sensor_labels(ids):
+    """Abbreviated labels used in the counts tables ('SENSOR-5' -> 'S-5')."""
+    return pd.Index(ids).astype(str).str.replace('SENSOR-', 'S-', regex=False)
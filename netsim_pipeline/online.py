@@ -0,0 +1,152 @@
+"""Sliding-window detection over a Packet Trace that is still being written.
+
+tail_trace follows a growing ``Packet Trace.csv`` and yields the rows
+appended since the last read. SlidingWindowDetector drops each packet into a
+time bucket of ``step`` seconds. It keeps running per-sensor DAO/DIO/sensing
+totals over the last ``window`` seconds: a bucket is added once and
+subtracted once when it leaves the window, so every packet costs O(1).
+Whenever a bucket closes, the sensors are re-scored with the trained
+classifiers, so a sinkhole can be flagged long before the run finishes.
+"""
+import io
+import os
+import time
+from collections import deque
+
+import pandas as pd
+
+from netsim_pipeline.merge import counts_to_features
+from netsim_pipeline.scoring import predict_labels
+from netsim_pipeline.trace_features import REQUIRED_COLUMNS, aggregate_trace, finalize_counts
+
+# Packet timestamp used to place packets in windows (NetSim writes microseconds)
+TIME_COLUMN = 'PHY_LAYER_END_TIME(US)'
+
+# Microseconds per second, to express windows in seconds
+US_PER_SECOND = 1_000_000
+
+
+def tail_trace(file_path, columns, poll_interval=1.0, idle_timeout=None, block_size=1 << 22):
+    """Yield frames of the rows appended to a growing Packet Trace CSV.
+
+    Only complete lines are parsed; a partially written last line waits for
+    the next read. Stops once the file has not grown for idle_timeout seconds
+    (never when idle_timeout is None).
+    """
+    # Wait for the simulator to create the file and write its header
+    while not os.path.exists(file_path):
+        time.sleep(poll_interval)
+
+    with open(file_path, encoding='latin1', newline='') as f:
+        header = ''
+        while not header.endswith('\n'):
+            header += f.readline()
+            if not header.endswith('\n'):
+                time.sleep(poll_interval)
+        names = pd.read_csv(io.StringIO(header), nrows=0).columns
+        missing = set(columns).difference(names)
+        if missing:
+            raise ValueError(f"Required columns are missing from {file_path}: {sorted(missing)}")
+
+        pending = ''
+        idle = 0.0
+        while True:
+            data = f.read(block_size)
+            if data:
+                idle = 0.0
+                pending += data
+                cut = pending.rfind('\n') + 1
+                if cut:
+                    complete, pending = pending[:cut], pending[cut:]
+                    yield pd.read_csv(io.StringIO(complete), header=None, names=names, usecols=columns)
+                continue
+
+            if idle_timeout is not None and idle >= idle_timeout:
+                break
+            time.sleep(poll_interval)
+            idle += poll_interval
+
+        # The writer is done; parse an unterminated last line, if any
+        if pending.strip():
+            yield pd.read_csv(io.StringIO(pending), header=None, names=names, usecols=columns)
+
+
+class SlidingWindowDetector:
+    """Per-sensor counters over a sliding time window, re-scored at every step boundary."""
+
+    def __init__(self, models, window, step, time_column=TIME_COLUMN):
+        self.models = models
+        self.step_us = step * US_PER_SECOND
+        self.buckets_per_window = max(1, round(window / step))
+        self.time_column = time_column
+        self.buckets = deque()  # (bucket index, (metric, node) counts), oldest first
+        self.totals = None
+        self.current = None
+
+    def _add(self, bucket, partial):
+        # Usually the newest bucket; slightly late packets land in an older one
+        for i in range(len(self.buckets) - 1, -1, -1):
+            if self.buckets[i][0] == bucket:
+                self.buckets[i] = (bucket, self.buckets[i][1].add(partial, fill_value=0))
+                break
+            if self.buckets[i][0] < bucket:
+                self.buckets.insert(i + 1, (bucket, partial))
+                break
+        else:
+            self.buckets.appendleft((bucket, partial))
+        self.totals = partial if self.totals is None else self.totals.add(partial, fill_value=0)
+
+    def _evict(self, newest):
+        # Drop buckets that fell out of the window ending with bucket newest
+        while self.buckets and self.buckets[0][0] <= newest - self.buckets_per_window:
+            _, partial = self.buckets.popleft()
+            self.totals = self.totals.sub(partial, fill_value=0)
+            self.totals = self.totals[self.totals != 0]
+
+    def _close(self, bucket):
+        """Score the window ending with bucket: (window end in seconds, labels per sensor)."""
+        self._evict(bucket)
+        counts = finalize_counts(self.totals) if self.totals is not None else finalize_counts(pd.Series(dtype=int))
+        end = (bucket + 1) * self.step_us / US_PER_SECOND
+        if counts.empty:
+            return end, pd.DataFrame()
+        return end, predict_labels(self.models, counts_to_features(counts))
+
+    def feed(self, rows):
+        """Add newly arrived trace rows; returns the (window end, labels) of every window they closed.
+
+        Windows are closed one step at a time, so a jump in the timestamps
+        also reports the windows that end in the quiet period.
+        """
+        times = pd.to_numeric(rows[self.time_column], errors='coerce')
+        rows = rows[times.notna()]
+        buckets = (times[times.notna()] // self.step_us).astype(int)
+
+        events = []
+        for bucket, part in rows.groupby(buckets.to_numpy(), sort=True):
+            # Close every window passed, including those ending in a gap without packets
+            while self.current is not None and bucket > self.current:
+                events.append(self._close(self.current))
+                self.current += 1
+            if self.current is None:
+                self.current = bucket
+            if bucket > self.current - self.buckets_per_window:
+                self._add(bucket, aggregate_trace(part))
+            # Packets older than the window are too late to count
+        return events
+
+    def flush(self):
+        """Score the last, still open window (at the end of the trace)."""
+        if self.current is None:
+            return []
+        event = self._close(self.current)
+        self.current = None
+        return [event]
+
+
+def detect_online(file_path, models, window, step, poll_interval=1.0, idle_timeout=None, time_column=TIME_COLUMN):
+    """Follow a Packet Trace and yield (window end, labels) at every window boundary."""
+    detector = SlidingWindowDetector(models, window, step, time_column)
+    for rows in tail_trace(file_path, REQUIRED_COLUMNS + [time_column], poll_interval, idle_timeout):
+        yield from detector.feed(rows)
+    yield from detector.flush()
@@ -0,0 +1,146 @@
+"""DAO, DIO and data-received bar charts for a seed.
+
+The drawing code of the three Plots scripts lives here so a batch run can
+render all three charts of a seed from one set of counts. Headless rendering
+uses matplotlib's object-oriented Figure with the Agg canvas and never
+touches pyplot. No interactive backend is involved, and a figure is freed as
+soon as it is saved instead of piling up in pyplot's figure registry.
+"""
+import os
+
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure
+
+from netsim_pipeline.dataio import atomic_path
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.trace_features import seed_counts
+
+# Output file, figure size and savefig options of each chart
+CHARTS = {
+    'DAO': ('DAO.png', (15, 8), {}),
+    'DIO': ('DIO.png', (15, 8), {}),
+    'Data': ('Data.png', (20, 12), {'dpi': 300, 'bbox_inches': 'tight'}),
+}
+
+
+def _highlight_malicious(ax, malicious_sensors):
+    # Highlight specific sensor IDs in red based on malicious nodes
+    for label in ax.get_xticklabels():
+        if label.get_text() in malicious_sensors:
+            label.set_color('red')
+
+
+def draw_sent_received(fig, ax, counts, kind, malicious_sensors):
+    """Bars of kind ('DAO' or 'DIO') messages sent and received by each sensor that sent any."""
+    # Keep the sensors that sent messages of this kind
+    combined_counts = counts[[f'{kind}_Sent', f'{kind}_Received']]
+    combined_counts = combined_counts[combined_counts[f'{kind}_Sent'] > 0]
+
+    bar_width = 0.3
+    index = range(len(combined_counts))
+
+    # Increase spacing between bars to avoid overlap
+    bar_spacing = bar_width * 1.5
+
+    # Plot bars for sent and received messages
+    bars_sent = ax.bar(index, combined_counts[f'{kind}_Sent'], bar_width, label=f'{kind} Sent', color='skyblue', edgecolor='none')
+    bars_received = ax.bar([i + bar_spacing for i in index], combined_counts[f'{kind}_Received'], bar_width, label=f'{kind} Received', color='lightgreen', edgecolor='none')
+
+    # Add count labels on top of the bars with vertical orientation and slight offset
+    for bar in bars_sent + bars_received:
+        height = bar.get_height()
+        ax.annotate(f'{int(height)}',
+                    (bar.get_x() + bar.get_width() / 2., height),
+                    ha='center', va='bottom', fontsize=12, rotation=90, xytext=(0, 5), textcoords='offset points')
+
+    # Customize the plot
+    ax.set_title(f'Number of {kind} Messages Sent and Received', fontsize=32)
+    ax.set_xlabel('Sensor ID', fontsize=32)
+    ax.set_ylabel(f'{kind} Messages', fontsize=32)
+    ax.set_xticks([i + bar_spacing / 2 for i in index])
+    ax.set_xticklabels(combined_counts.index, rotation=45, ha='center', va='top', fontsize=14)
+    _highlight_malicious(ax, malicious_sensors)
+
+    # Add legend to indicate colors
+    ax.legend(title="Message Type", title_fontsize='20', fontsize='16')
+
+    fig.tight_layout()
+
+
+def draw_data_received(fig, ax, counts, malicious_sensors):
+    """Bars of sensing (data) packets received by each sensor."""
+    # Wide bars for readability
+    bars = ax.bar(counts.index, counts['Packet_Received'], color='lightgreen', width=0.8)
+
+    # Rotate x-axis labels to prevent overlap
+    ax.tick_params(axis='x', labelrotation=45)
+    for label in ax.get_xticklabels():
+        label.set_horizontalalignment('right')
+
+    # Add count labels on top of the bars
+    for bar in bars:
+        height = bar.get_height()
+        ax.annotate(f'{int(height)}',
+                    (bar.get_x() + bar.get_width() / 2., height),
+                    ha='center', va='bottom', fontsize=14)
+
+    ax.set_title('Number of Data Packets Received', fontsize=36)
+    ax.set_xlabel('Sensor ID', fontsize=36)
+    ax.set_ylabel('Data Packets', fontsize=36)
+    _highlight_malicious(ax, malicious_sensors)
+    ax.grid(False)
+
+    # Adjust layout to prevent clipping of labels
+    fig.tight_layout()
+    fig.subplots_adjust(top=0.9, bottom=0.2, left=0.1, right=0.9)
+
+
+def render_chart(chart, counts, malicious_sensors, output_path, show=False):
+    """Draw one chart ('DAO', 'DIO' or 'Data') and save it to output_path.
+
+    Headless by default. With show the figure is made through pyplot and
+    displayed before it is closed.
+    """
+    _, figsize, savefig_kwargs = CHARTS[chart]
+    if show:
+        import matplotlib.pyplot as plt
+        fig = plt.figure(figsize=figsize)
+    else:
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+    ax = fig.add_subplot()
+
+    with stage(f'draw_{chart}', len(counts)):
+        if chart == 'Data':
+            draw_data_received(fig, ax, counts, malicious_sensors)
+        else:
+            draw_sent_received(fig, ax, counts, chart, malicious_sensors)
+    with stage(f'savefig_{chart}'):
+        with atomic_path(output_path) as temp_path:
+            fig.savefig(temp_path, **savefig_kwargs)
+
+    if show:
+        plt.show()
+        plt.close(fig)
+    return output_path
+
+
+def read_seed_counts(task, cache=True):
+    """Pipeline read step: a seed's per-sensor counts, as a one-frame list."""
+    return [seed_counts(task.seed_path, cache=cache)]
+
+
+def render_seed_counts(task, frames, malicious_map, charts=tuple(CHARTS), show=False):
+    """Pipeline process step: render the given charts of a seed from its counts frame; returns the image paths."""
+    counts = next(iter(frames))
+    malicious_sensors = malicious_map.get(task.scenario, [])
+    return [render_chart(chart, counts, malicious_sensors, os.path.join(task.seed_path, CHARTS[chart][0]), show)
+            for chart in charts]
+
+
+def render_seed(task, malicious_map, charts=tuple(CHARTS), cache=True):
+    """Runner task: render the given charts of one seed from a single set of counts.
+
+    Returns the paths of the saved images.
+    """
+    return render_seed_counts(task, read_seed_counts(task, cache), malicious_map, charts)
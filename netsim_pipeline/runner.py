@@ -0,0 +1,295 @@
+"""Process-pool execution of independent (scenario, seed) tasks.
+
+Every seed folder under a scenario is processed independently, so the
+feature-count and plot scripts describe their work as a list of SeedTask
+and hand it to run_tasks, which fans the tasks out over a process pool.
+A failing task (e.g. a trace with missing columns) is recorded in its
+TaskResult instead of stopping the sweep. Tasks are submitted largest
+trace first, so a big seed started last does not leave the other workers
+idle at the end of the sweep.
+
+run_pipelined splits each task into a read and a process step. A background
+reader thread reads the frames of the upcoming seeds into a bounded queue
+while the current seed is aggregated and written, so the disk (or network
+share) and the CPU work at the same time. When the queue is full the reader
+blocks, which bounds memory by the queue depth.
+"""
+import os
+import threading
+import time
+import traceback
+from collections import namedtuple
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from queue import Empty, Full, Queue
+
+from netsim_pipeline import instrument
+
+# One unit of work: a seed folder inside a scenario folder, and the size of its
+# trace in bytes (None when unknown) used to schedule the largest seeds first
+SeedTask = namedtuple('SeedTask', ['scenario', 'seed', 'seed_path', 'size'], defaults=[None])
+
+# Outcome of one task; value is the task function's return value when ok, and
+# stages the instrument hook records collected in a worker process (or None)
+TaskResult = namedtuple('TaskResult', ['task', 'ok', 'value', 'error', 'seconds', 'stages'], defaults=[None])
+
+# Top-level stage a worker process times each task in; its hooks are merged under the parent's stage
+TASK_STAGE = 'task'
+
+
+def discover_seeds(base_path, scenarios=None, trace_name='Packet Trace.csv'):
+    """SeedTasks for every seed folder under base_path that holds trace_name.
+
+    scenarios restricts (and orders) the scenario folders to visit; by
+    default every sub-folder of base_path is visited in name order.
+    """
+    if scenarios is None:
+        scenarios = sorted(os.listdir(base_path)) if os.path.isdir(base_path) else []
+
+    tasks = []
+    for scenario in scenarios:
+        scenario = str(scenario)
+        scenario_path = os.path.join(base_path, scenario)
+        if not os.path.isdir(scenario_path):
+            continue
+        for seed in sorted(os.listdir(scenario_path)):
+            seed_path = os.path.join(scenario_path, seed)
+            trace_path = os.path.join(seed_path, trace_name)
+            if os.path.isfile(trace_path):
+                tasks.append(SeedTask(scenario, seed, seed_path, os.path.getsize(trace_path)))
+    return tasks
+
+
+def largest_first(tasks):
+    """Submission order of tasks as indexes: largest size first, unknown sizes last, ties in task order."""
+    return sorted(range(len(tasks)), key=lambda i: (-(tasks[i].size or 0), i))
+
+
+def default_workers():
+    """Worker count used when none is given: one per CPU."""
+    return os.cpu_count() or 1
+
+
+def run_one(func, task, kwargs, instrumented=False):
+    """Run func(task, **kwargs) and return its TaskResult; an exception becomes a failed result."""
+    if instrumented:
+        # Collect the stage hooks of this worker process under one task stage and send them back with the result
+        collector = instrument.Instrumentation(f'{task.scenario}/{task.seed}')
+        with collector.activate(), collector.stage(TASK_STAGE):
+            result = run_one(func, task, kwargs)
+        return result._replace(stages=collector.export())
+
+    start = time.perf_counter()
+    try:
+        value = func(task, **kwargs)
+    except Exception:
+        return TaskResult(task, False, None, traceback.format_exc(limit=3).strip(), time.perf_counter() - start)
+    return TaskResult(task, True, value, None, time.perf_counter() - start)
+
+
+def run_tasks(func, tasks, workers=None, **kwargs):
+    """Run func(task, **kwargs) for every task and return TaskResults in task order.
+
+    func must be a module-level function so it can be sent to worker
+    processes. workers=1 runs everything in the calling process, which keeps
+    interactive matplotlib backends and debuggers usable. When an
+    instrument.Instrumentation is active, the stage hooks that run in the
+    worker processes are merged into it. Tasks are submitted largest first
+    (see largest_first), but the results keep the order of tasks.
+    """
+    tasks = list(tasks)
+    workers = workers or default_workers()
+    if workers == 1 or len(tasks) <= 1:
+        return [run_one(func, task, kwargs) for task in tasks]
+
+    collector = instrument.active()
+    results = [None] * len(tasks)
+    with ProcessPoolExecutor(max_workers=min(workers, len(tasks))) as pool:
+        futures = {pool.submit(run_one, func, tasks[i], kwargs, collector is not None): i
+                   for i in largest_first(tasks)}
+        for future in as_completed(futures):
+            result = future.result()
+            if collector is not None and result.stages:
+                collector.merge(result.stages)
+            results[futures[future]] = result
+    return results
+
+
+class ReadError(Exception):
+    """A pipelined task's read step failed; the message is the reader's traceback."""
+
+
+# End of one task's frames in a pipeline stream, with the read error if the read failed
+_TaskEnd = namedtuple('_TaskEnd', ['error'])
+
+# End of a prefetch stream, and an exception raised by its iterable
+_DONE = object()
+_Raised = namedtuple('_Raised', ['error'])
+
+
+def prefetch(iterable, depth=2):
+    """Iterate over iterable while a background thread produces up to depth items ahead.
+
+    The producer blocks while depth items wait to be consumed (back-pressure),
+    so at most depth + 2 items are alive at a time: the queued ones, the one
+    being put and the one being consumed. An exception raised by iterable is
+    raised to the consumer in its place. Time the consumer spends waiting is
+    recorded as the 'prefetch_wait' stage.
+    """
+    queue = Queue(maxsize=max(1, depth))
+    stop = threading.Event()
+
+    def put(item):
+        while not stop.is_set():
+            try:
+                queue.put(item, timeout=0.1)
+                return True
+            except Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(item):
+                    return
+        except BaseException as error:
+            put(_Raised(error))
+            return
+        put(_DONE)
+
+    def run():
+        # The reader's hooks count under the consumer's stage, not as stages of their own
+        with instrument.nest_under(parent):
+            produce()
+
+    parent = instrument.current_stage()
+    producer = threading.Thread(target=run, name='prefetch', daemon=True)
+    producer.start()
+    try:
+        while True:
+            with instrument.stage('prefetch_wait'):
+                item = queue.get()
+            if item is _DONE:
+                return
+            if isinstance(item, _Raised):
+                raise item.error
+            yield item
+    finally:
+        # A consumer that stops early releases a producer blocked on the full queue
+        stop.set()
+        while producer.is_alive():
+            try:
+                queue.get_nowait()
+            except Empty:
+                producer.join(0.1)
+
+
+def _read_frames(read, tasks):
+    # Every task's frames followed by its _TaskEnd; a failed read ends that task only
+    for task in tasks:
+        try:
+            for frame in read(task):
+                yield frame
+        except Exception:
+            yield _TaskEnd(traceback.format_exc(limit=3).strip())
+            continue
+        yield _TaskEnd(None)
+
+
+def _task_frames(stream):
+    # The current task's frames from the stream, up to its _TaskEnd
+    for item in stream:
+        if isinstance(item, _TaskEnd):
+            if item.error is not None:
+                raise ReadError(item.error)
+            return
+        yield item
+
+
+def _drain(frames):
+    # Skip the frames a failed process step left unread
+    try:
+        for _ in frames:
+            pass
+    except ReadError:
+        pass
+
+
+def _run_pipeline(read, process, tasks, depth, instrumented=False):
+    # In a worker process, collect the stage hooks under one task stage per task and send them back
+    collector = instrument.Instrumentation('pipeline') if instrumented else None
+    with collector.activate() if collector else nullcontext():
+        results = _pipeline_results(read, process, tasks, depth, collector)
+    return (results, collector.export()) if collector else results
+
+
+def _pipeline_results(read, process, tasks, depth, collector=None):
+    stream = prefetch(_read_frames(read, tasks), depth)
+    results = []
+    try:
+        for task in tasks:
+            with collector.stage(TASK_STAGE) if collector else nullcontext():
+                results.append(_process_task(process, task, _task_frames(stream)))
+    finally:
+        stream.close()
+    return results
+
+
+def _process_task(process, task, frames):
+    start = time.perf_counter()
+    try:
+        value = process(task, frames)
+        # Reach the task's end, which also surfaces a read error after the last frame process used
+        for _ in frames:
+            pass
+    except Exception:
+        _drain(frames)
+        return TaskResult(task, False, None, traceback.format_exc(limit=3).strip(), time.perf_counter() - start)
+    return TaskResult(task, True, value, None, time.perf_counter() - start)
+
+
+def run_pipelined(read, process, tasks, workers=1, depth=2):
+    """Run process(task, frames) for every task while read(task) prefetches upcoming frames.
+
+    read(task) returns an iterable of frames, e.g. a whole trace or its
+    chunks, and is run on a background thread up to depth frames ahead.
+    process(task, frames) consumes the task's frames (an iterator) and
+    returns the task's value. A read or process failure fails that task
+    only. With workers > 1, the tasks are dealt largest first over that many
+    processes, each running its own pipeline. Both functions must be
+    module-level (or functools.partial of one) to reach worker processes.
+    Returns TaskResults in task order.
+    """
+    tasks = list(tasks)
+    workers = min(workers or default_workers(), max(1, len(tasks)))
+    if workers == 1:
+        return _run_pipeline(read, process, tasks, depth)
+
+    collector = instrument.active()
+    order = largest_first(tasks)
+    shards = [order[i::workers] for i in range(workers)]
+    results = [None] * len(tasks)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(_run_pipeline, read, process, [tasks[i] for i in shard], depth,
+                               collector is not None): shard for shard in shards}
+        for future in as_completed(futures):
+            shard_results = future.result()
+            if collector is not None:
+                shard_results, stages = shard_results
+                collector.merge(stages)
+            for i, result in zip(futures[future], shard_results):
+                results[i] = result
+    return results
+
+
+def summarize(results, elapsed=None):
+    """Human-readable summary of a batch of TaskResults."""
+    failed = [result for result in results if not result.ok]
+    lines = [f"{len(results) - len(failed)} of {len(results)} tasks succeeded"
+             + (f" in {elapsed:.1f}s" if elapsed is not None else '')
+             + (f" (task time {sum(result.seconds for result in results):.1f}s)" if results else '')]
+    for result in failed:
+        lines.append(f"FAILED scenario {result.task.scenario}, seed {result.task.seed}: "
+                     f"{result.error.splitlines()[-1]}")
+    return '\n'.join(lines)
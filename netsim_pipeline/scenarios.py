@@ -0,0 +1,206 @@
+"""Ground truth of the NetSim test scenarios and the scenario manifest.
+
+Scenario folder N (2 to 15) runs N malicious sensors; each scenario adds one
+sensor to the previous scenario's set.
+
+A ScenarioManifest holds what the scripts used to hard-code: the
+Test-Scenarios folder, the scenarios with their malicious sensors, the
+scenarios that are merged into the feature dataset, the classification and
+confusion-matrix data folders, and optionally every seed with its Packet
+Trace size. It is read from a JSON or YAML file (--manifest or the
+NETSIM_MANIFEST environment variable) with command-line overrides; without
+one the built-in defaults below reproduce the original Windows layout.
+"""
+import json
+import os
+
+try:
+    import yaml
+except ImportError:
+    yaml = None
+
+# Malicious sensors of each scenario, keyed by main folder name
+MALICIOUS_SENSORS = {
+    '2': ['S-5', 'S-9'],
+    '3': ['S-5', 'S-9', 'S-10'],
+    '4': ['S-5', 'S-9', 'S-10', 'S-16'],
+    '5': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18'],
+    '6': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19'],
+    '7': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22'],
+    '8': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24'],
+    '9': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27'],
+    '10': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30'],
+    '11': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33'],
+    '12': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36'],
+    '13': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36', 'S-38'],
+    '14': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36', 'S-38', 'S-41'],
+    '15': ['S-5', 'S-9', 'S-10', 'S-16', 'S-18', 'S-19', 'S-22', 'S-24', 'S-27', 'S-30', 'S-33', 'S-36', 'S-38', 'S-41', 'S-43']
+}
+
+# Environment variable naming the manifest file when --manifest is not given
+MANIFEST_ENV = 'NETSIM_MANIFEST'
+
+# Built-in settings used when no manifest file is given
+DEFAULT_BASE_PATH = 'G:\\Test-Scenarios'
+DEFAULT_MERGE_SCENARIOS = ['2', '4', '5', '6', '8', '10', '12', '14']
+DEFAULT_CONFUSION_PATH = 'E:\\Test-Training-Data\\Confusion-Matrix'
+
+# Folder of the classifier training and test workbooks, inside the base path by default
+CLASSIFICATION_FOLDER = 'Data-Classification-of-4-Classifiers'
+
+
+class ScenarioManifest:
+    """Scenarios, ground truth and data folders of a NetSim sweep.
+
+    scenarios maps a scenario folder name to {'malicious': [sensor labels],
+    'seeds': {seed folder: Packet Trace bytes or None}}; seeds may also be a
+    plain list of seed folders, and without seeds they are discovered on disk.
+    """
+
+    def __init__(self, base_path=DEFAULT_BASE_PATH, scenarios=None, merge_scenarios=None,
+                 classification_path=None, confusion_path=DEFAULT_CONFUSION_PATH):
+        self.base_path = base_path
+        if scenarios is None:
+            scenarios = {name: {'malicious': sensors} for name, sensors in MALICIOUS_SENSORS.items()}
+        self.scenarios = {str(name): {'malicious': list(entry.get('malicious', [])), 'seeds': _seed_sizes(entry.get('seeds'))}
+                          for name, entry in scenarios.items()}
+        self.merge_scenarios = [str(name) for name in (merge_scenarios or DEFAULT_MERGE_SCENARIOS)]
+        self._classification_path = classification_path
+        self.confusion_path = confusion_path
+
+    @property
+    def classification_path(self):
+        """Folder of Training-Data.xlsx and Test-Data.xlsx."""
+        return self._classification_path or os.path.join(self.base_path, CLASSIFICATION_FOLDER)
+
+    @property
+    def train_data_path(self):
+        return os.path.join(self.classification_path, 'Training-Data.xlsx')
+
+    @property
+    def test_data_path(self):
+        return os.path.join(self.classification_path, 'Test-Data.xlsx')
+
+    def names(self):
+        """Scenario folder names, in manifest order."""
+        return list(self.scenarios)
+
+    def malicious_map(self):
+        """{scenario: malicious sensor labels}, the shape of MALICIOUS_SENSORS."""
+        return {name: entry['malicious'] for name, entry in self.scenarios.items()}
+
+    def restrict(self, names):
+        """Manifest of only the given scenarios, in the given order; they are also the ones merged.
+
+        A scenario the manifest does not list is kept with no malicious sensors.
+        """
+        names = [str(name) for name in names]
+        scenarios = {name: self.scenarios.get(name, {'malicious': []}) for name in names}
+        return ScenarioManifest(self.base_path, scenarios, names, self._classification_path, self.confusion_path)
+
+    def seed_tasks(self, trace_name='Packet Trace.csv'):
+        """runner.SeedTasks of every seed with a Packet Trace, sized for largest-first scheduling.
+
+        Listed seeds take the current file size, or the manifest's when the
+        trace is not reachable from this machine; scenarios without listed
+        seeds are discovered on disk.
+        """
+        from netsim_pipeline.runner import SeedTask, discover_seeds
+
+        tasks = []
+        for name, entry in self.scenarios.items():
+            if entry['seeds'] is None:
+                tasks.extend(discover_seeds(self.base_path, [name], trace_name))
+                continue
+            for seed, size in entry['seeds'].items():
+                seed_path = os.path.join(self.base_path, name, seed)
+                trace_path = os.path.join(seed_path, trace_name)
+                if os.path.isfile(trace_path):
+                    size = os.path.getsize(trace_path)
+                tasks.append(SeedTask(name, seed, seed_path, size))
+        return tasks
+
+    def scanned(self, trace_name='Packet Trace.csv'):
+        """Copy of the manifest with every scenario's seeds and trace sizes read from disk."""
+        from netsim_pipeline.runner import discover_seeds
+
+        scenarios = {}
+        for name, entry in self.scenarios.items():
+            seeds = {task.seed: task.size for task in discover_seeds(self.base_path, [name], trace_name)}
+            scenarios[name] = {'malicious': entry['malicious'], 'seeds': seeds}
+        return ScenarioManifest(self.base_path, scenarios, self.merge_scenarios, self._classification_path,
+                                self.confusion_path)
+
+    def to_dict(self):
+        data = {'base_path': self.base_path, 'merge_scenarios': self.merge_scenarios}
+        if self._classification_path:
+            data['classification_path'] = self._classification_path
+        data['confusion_path'] = self.confusion_path
+        data['scenarios'] = {name: {key: value for key, value in entry.items() if value is not None}
+                             for name, entry in self.scenarios.items()}
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data.get('base_path', DEFAULT_BASE_PATH), data.get('scenarios'), data.get('merge_scenarios'),
+                   data.get('classification_path'), data.get('confusion_path', DEFAULT_CONFUSION_PATH))
+
+
+def _seed_sizes(seeds):
+    # A manifest may list bare seed names; their sizes are then unknown
+    if seeds is None or isinstance(seeds, dict):
+        return seeds
+    return dict.fromkeys(str(seed) for seed in seeds)
+
+
+def _check_yaml(path):
+    if not path.lower().endswith(('.yaml', '.yml')):
+        return False
+    if yaml is None:
+        raise ImportError("YAML manifests need the PyYAML package (pip install pyyaml); or use a .json manifest")
+    return True
+
+
+def load_manifest(path=None):
+    """ScenarioManifest from a JSON or YAML file; path defaults to $NETSIM_MANIFEST, else the built-in defaults."""
+    path = path or os.environ.get(MANIFEST_ENV)
+    if not path:
+        return ScenarioManifest()
+    with open(path) as f:
+        data = yaml.safe_load(f) if _check_yaml(path) else json.load(f)
+    return ScenarioManifest.from_dict(data or {})
+
+
+def save_manifest(manifest, path):
+    """Write a manifest as JSON, or YAML for a .yaml/.yml path; returns path."""
+    with open(path, 'w') as f:
+        if _check_yaml(path):
+            yaml.safe_dump(manifest.to_dict(), f, sort_keys=False)
+        else:
+            json.dump(manifest.to_dict(), f, indent=2)
+    return path
+
+
+def add_arguments(parser, selection=True):
+    """Add --manifest and the --base-path/--scenarios overrides to a script's argparse parser.
+
+    selection=False leaves out --scenarios, for scripts that do not walk the
+    scenario folders.
+    """
+    parser.add_argument('--manifest', default=None,
+                        help=f'scenario manifest, JSON or YAML (default: ${MANIFEST_ENV}, else the built-in scenarios)')
+    parser.add_argument('--base-path', default=None,
+                        help='Test-Scenarios folder, overriding the manifest')
+    if selection:
+        parser.add_argument('--scenarios', nargs='+', default=None,
+                            help='scenario folders to process, overriding the manifest')
+
+
+def from_args(args):
+    """ScenarioManifest from add_arguments options, with the overrides applied."""
+    manifest = load_manifest(args.manifest)
+    if args.base_path:
+        manifest.base_path = args.base_path
+    if getattr(args, 'scenarios', None):
+        manifest = manifest.restrict(args.scenarios)
+    return manifest
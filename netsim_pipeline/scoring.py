@@ -0,0 +1,241 @@
+"""Warm, micro-batched scoring of Packet Traces.
+
+A Scorer loads the saved classifiers once and turns a Packet Trace (a path
+or an in-memory frame of trace rows) into per-sensor benign/malicious labels.
+It runs the trace through the shared feature extractor and the row-max
+normalization. Concurrent requests go through a MicroBatcher: the per-trace
+features of everything that arrived within a short window are scored with a
+single predict call per model.
+
+serve_http exposes the scorer on a localhost HTTP port; ScoringStats keeps
+the request, latency and throughput counters both front ends report.
+"""
+import io
+import json
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+from netsim_pipeline.artifacts import select_features
+from netsim_pipeline.classifiers import LABEL_NAMES, load_models
+from netsim_pipeline.merge import counts_to_features
+from netsim_pipeline.trace_features import extract_counts, extract_trace_counts
+
+
+def predict_labels(models, features):
+    """Per-row labels from every loaded model plus the number of models voting malicious.
+
+    models is {name: (estimator, meta)} as returned by classifiers.load_models.
+    """
+    labels = pd.DataFrame({name: pd.Series(clf.predict(select_features(features, meta)), index=features.index).map(LABEL_NAMES)
+                           for name, (clf, meta) in models.items()})
+    labels['votes_malicious'] = (labels == LABEL_NAMES[1]).sum(axis=1)
+    return labels
+
+
+class ScoringStats:
+    """Thread-safe request, latency and throughput counters."""
+
+    def __init__(self, window=1000):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.requests = 0
+        self.errors = 0
+        self.sensors = 0
+        self.batches = 0
+        self.batched_requests = 0
+        self.latencies = deque(maxlen=window)
+
+    def record_batch(self, size):
+        with self.lock:
+            self.batches += 1
+            self.batched_requests += size
+
+    def record_request(self, seconds, sensors=0, error=False):
+        with self.lock:
+            self.requests += 1
+            self.errors += error
+            self.sensors += sensors
+            self.latencies.append(seconds)
+
+    def snapshot(self):
+        """Counters as a JSON-serializable dict (latencies in milliseconds)."""
+        with self.lock:
+            uptime = time.time() - self.started
+            latencies = np.array(self.latencies) * 1000
+            return {
+                'uptime_s': round(uptime, 1),
+                'requests': self.requests,
+                'errors': self.errors,
+                'sensors_scored': self.sensors,
+                'batches': self.batches,
+                'mean_batch_size': round(self.batched_requests / self.batches, 2) if self.batches else 0,
+                'requests_per_s': round(self.requests / uptime, 3) if uptime else 0,
+                'latency_ms_p50': round(float(np.percentile(latencies, 50)), 2) if len(latencies) else None,
+                'latency_ms_p95': round(float(np.percentile(latencies, 95)), 2) if len(latencies) else None,
+                'latency_ms_max': round(float(latencies.max()), 2) if len(latencies) else None,
+            }
+
+
+class MicroBatcher:
+    """Collect submitted items for up to max_wait seconds (or max_batch items) and process them together.
+
+    process_batch receives a list of items and returns one result per item;
+    a result that is an Exception is raised to that item's submitter.
+    """
+
+    def __init__(self, process_batch, max_batch=32, max_wait=0.01, stats=None):
+        self.process_batch = process_batch
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.stats = stats
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._loop, name='micro-batcher', daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        """Queue an item and block until its result is ready."""
+        future = Future()
+        self.queue.put((item, future))
+        return future.result()
+
+    def _loop(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            if self.stats is not None:
+                self.stats.record_batch(len(batch))
+            try:
+                results = self.process_batch([item for item, _ in batch])
+            except Exception as e:
+                results = [e] * len(batch)
+            for (_, future), result in zip(batch, results):
+                if isinstance(result, Exception):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
+
+
+class Scorer:
+    """Saved classifiers kept warm in memory, scoring traces in micro-batches."""
+
+    def __init__(self, model_dir, names, version=None, chunksize=None, cache=False, max_batch=32, max_wait=0.01):
+        self.models = load_models(names, model_dir, version)
+        self.chunksize = chunksize
+        self.cache = cache
+        self.stats = ScoringStats()
+        self.batcher = MicroBatcher(self._score_batch, max_batch, max_wait, self.stats)
+
+    def _features(self, item):
+        # A request is either a trace path or a frame of trace rows
+        if isinstance(item, pd.DataFrame):
+            counts = extract_counts(item)
+        else:
+            counts = extract_trace_counts(item, self.chunksize, self.cache)
+        return counts_to_features(counts)
+
+    def _score_batch(self, items):
+        features, results = [], []
+        for item in items:
+            try:
+                features.append(self._features(item))
+                results.append(None)
+            except Exception as e:
+                results.append(e)
+        ok = [i for i, result in enumerate(results) if result is None]
+        if not ok:
+            return results
+
+        # One predict call per model for every trace in the batch
+        labels = predict_labels(self.models, pd.concat(features, keys=ok))
+        for i in ok:
+            results[i] = labels.loc[i]
+        return results
+
+    def score(self, item):
+        """Per-sensor labels (one column per model) for a trace path or frame of trace rows."""
+        start = time.perf_counter()
+        try:
+            labels = self.batcher.submit(item)
+        except Exception:
+            self.stats.record_request(time.perf_counter() - start, error=True)
+            raise
+        self.stats.record_request(time.perf_counter() - start, sensors=len(labels))
+        return labels
+
+
+def labels_to_json(labels):
+    """{sensor: {model: label, ..., 'votes_malicious': n}} for a Scorer result."""
+    return {sensor: {key: (int(value) if key == 'votes_malicious' else value) for key, value in row.items()}
+            for sensor, row in labels.to_dict(orient='index').items()}
+
+
+def read_trace_text(text):
+    """Frame of Packet Trace rows sent as CSV text."""
+    return pd.read_csv(io.StringIO(text))
+
+
+def serve_http(scorer, host='127.0.0.1', port=8765):
+    """Serve a Scorer over HTTP until interrupted.
+
+    POST /score   body {"path": "..."} (JSON) or Packet Trace CSV rows (text/csv)
+    GET  /stats   latency and throughput counters
+    GET  /health  liveness check
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):
+            if self.path == '/stats':
+                self._reply(200, scorer.stats.snapshot())
+            elif self.path == '/health':
+                self._reply(200, {'status': 'ok', 'models': sorted(scorer.models)})
+            else:
+                self._reply(404, {'error': f'unknown path {self.path}'})
+
+        def do_POST(self):
+            if self.path != '/score':
+                self._reply(404, {'error': f'unknown path {self.path}'})
+                return
+            text = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('latin1')
+            try:
+                if self.headers.get('Content-Type', '').startswith('text/csv'):
+                    item = read_trace_text(text)
+                else:
+                    item = json.loads(text)['path']
+                self._reply(200, labels_to_json(scorer.score(item)))
+            except Exception as e:
+                self._reply(400, {'error': f'{type(e).__name__}: {e}'})
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
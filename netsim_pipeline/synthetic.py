@@ -0,0 +1,128 @@
+"""Synthetic NetSim Packet Traces for scaling tests and benchmarks.
+
+generate_trace writes a ``Packet Trace.csv`` with the NetSim column layout.
+It contains RPL control traffic (DIO, DAO, DIS) and sensing packets between
+SENSOR-n nodes, a sink node and a router. The malicious sensors follow the
+signature visible in Training-Data.xlsx: they keep advertising routes (DIO
+and DAO sent) but never show up as receivers of DAO or sensing packets.
+generate_sweep lays out a whole Test-Scenarios tree
+(``<scenario>/seed<k>/Packet Trace.csv``) from a malicious-sensor map.
+"""
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from netsim_pipeline.scenarios import MALICIOUS_SENSORS
+
+# Packet Trace columns written by NetSim (the subset the pipeline and the online mode read)
+TRACE_COLUMNS = [
+    'PACKET_ID', 'SEGMENT_ID', 'PACKET_TYPE', 'CONTROL_PACKET_TYPE/APP_NAME', 'SOURCE_ID', 'DESTINATION_ID',
+    'TRANSMITTER_ID', 'RECEIVER_ID', 'APP_LAYER_ARRIVAL_TIME(US)', 'PHY_LAYER_START_TIME(US)',
+    'PHY_LAYER_END_TIME(US)', 'APP_LAYER_PAYLOAD(Bytes)', 'PHY_LAYER_PAYLOAD(Bytes)', 'PACKET_STATUS',
+]
+
+# Share of each kind of packet: (PACKET_TYPE, CONTROL_PACKET_TYPE/APP_NAME, probability)
+PACKET_MIX = [
+    ('Control_Packet', 'DIO', 0.25),
+    ('Control_Packet', 'DAO', 0.12),
+    ('Control_Packet', 'DIS', 0.03),
+    ('Sensing', 'App1_SENSOR', 0.60),
+]
+
+# Share of each packet status
+STATUS_MIX = [('Successful', 0.9), ('Errored', 0.05), ('Collided', 0.05)]
+
+# Rows generated and written per block, which bounds memory for large traces
+BLOCK_ROWS = 1_000_000
+
+
+def node_names(sensors):
+    """Node IDs of a network with the given number of sensors, plus its sink node and router."""
+    return [f'SENSOR-{i}' for i in range(1, sensors + 1)] + [f'SINKNODE-{sensors + 1}', f'ROUTER-{sensors + 2}']
+
+
+def _block(rng, nodes, malicious, start_id, rows, duration_us):
+    sensors = len(nodes) - 2
+    kinds = rng.choice(len(PACKET_MIX), rows, p=[p for _, _, p in PACKET_MIX])
+    packet_type = np.array([t for t, _, _ in PACKET_MIX], dtype=object)[kinds]
+    control_type = np.array([c for _, c, _ in PACKET_MIX], dtype=object)[kinds]
+
+    # Sensors do most of the talking; sensing data flows toward the sink
+    source = rng.integers(0, sensors + 2, rows)
+    from_sensor = rng.random(rows) < 0.9
+    source[from_sensor] = rng.integers(0, sensors, from_sensor.sum())
+    receiver = rng.integers(0, sensors + 2, rows)
+    receiver[receiver == source] = sensors
+
+    # Malicious sensors never appear as receivers of DAO or sensing packets
+    if malicious:
+        bad = np.isin(receiver, malicious) & ((control_type == 'DAO') | (packet_type == 'Sensing'))
+        receiver[bad] = sensors
+
+    status = np.array([s for s, _ in STATUS_MIX], dtype=object)[
+        rng.choice(len(STATUS_MIX), rows, p=[p for _, p in STATUS_MIX])]
+    start = np.sort(rng.uniform(0, duration_us, rows)).round(2)
+    payload = np.where(packet_type == 'Sensing', 50, 20)
+    names = np.array(nodes, dtype=object)
+
+    return pd.DataFrame({
+        'PACKET_ID': np.arange(start_id, start_id + rows),
+        'SEGMENT_ID': 0,
+        'PACKET_TYPE': packet_type,
+        'CONTROL_PACKET_TYPE/APP_NAME': control_type,
+        'SOURCE_ID': names[source],
+        'DESTINATION_ID': names[receiver],
+        'TRANSMITTER_ID': names[source],
+        'RECEIVER_ID': names[receiver],
+        'APP_LAYER_ARRIVAL_TIME(US)': start,
+        'PHY_LAYER_START_TIME(US)': start,
+        'PHY_LAYER_END_TIME(US)': (start + 250).round(2),
+        'APP_LAYER_PAYLOAD(Bytes)': payload,
+        'PHY_LAYER_PAYLOAD(Bytes)': payload + 31,
+        'PACKET_STATUS': status,
+    }, columns=TRACE_COLUMNS)
+
+
+def generate_trace(file_path, sensors=45, malicious=(), packets=100_000, duration_s=100, seed=0):
+    """Write a synthetic Packet Trace CSV and return its path.
+
+    malicious lists sensor labels ('S-5') or numbers; packets is the number
+    of rows. Blocks are generated in time order, so the trace also suits the
+    online (tailing) mode.
+    """
+    rng = np.random.default_rng(seed)
+    nodes = node_names(sensors)
+    malicious_index = [int(str(label).split('-')[-1]) - 1 for label in malicious
+                       if int(str(label).split('-')[-1]) <= sensors]
+
+    os.makedirs(os.path.dirname(os.path.abspath(file_path)), exist_ok=True)
+    blocks = max(1, -(-packets // BLOCK_ROWS))
+    written = 0
+    with open(file_path, 'w', encoding='latin1', newline='') as f:
+        for block in range(blocks):
+            rows = min(BLOCK_ROWS, packets - written)
+            df = _block(rng, nodes, malicious_index, written, rows, duration_s * 1_000_000 / blocks)
+            # Later blocks continue where the previous one ended in time
+            for column in ['APP_LAYER_ARRIVAL_TIME(US)', 'PHY_LAYER_START_TIME(US)', 'PHY_LAYER_END_TIME(US)']:
+                df[column] += block * duration_s * 1_000_000 / blocks
+            df.to_csv(f, index=False, header=block == 0)
+            written += rows
+    return file_path
+
+
+def generate_sweep(base_path, scenarios=None, seeds=3, sensors=45, packets=100_000, malicious_map=MALICIOUS_SENSORS):
+    """Write a Test-Scenarios tree of synthetic traces: {(scenario, seed): trace path}.
+
+    scenarios defaults to every scenario of malicious_map.
+    """
+    scenarios = list(malicious_map) if scenarios is None else [str(scenario) for scenario in scenarios]
+    paths = {}
+    for scenario in scenarios:
+        for k in range(1, seeds + 1):
+            seed = f'seed{k}'
+            file_path = os.path.join(base_path, scenario, seed, 'Packet Trace.csv')
+            paths[(scenario, seed)] = generate_trace(file_path, sensors, malicious_map.get(scenario, []), packets,
+                                                     seed=zlib.crc32(f'{scenario}/{seed}'.encode()))
+    return paths
@@ -0,0 +1,147 @@
+"""Columnar cache of Packet Trace CSVs.
+
+Each ``Packet Trace.csv`` is converted once into a zstd-compressed Parquet
+file next to it (``Packet Trace.parquet``), holding the counter columns as
+dictionary-encoded (categorical) strings. A small JSON sidecar records the
+source size, mtime and SHA-1; the cache is reused while those match and
+rebuilt automatically when the trace changes.
+
+The cache needs pyarrow. Without it every call transparently falls back to
+parsing the CSV.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+from netsim_pipeline.dataio import atomic_path, have_pyarrow
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.trace_features import DEFAULT_CHUNK_SIZE, REQUIRED_COLUMNS, iter_trace_chunks, load_trace
+
+# Bump when the cached layout changes so old caches are rebuilt
+CACHE_VERSION = 1
+
+
+def cache_paths(trace_path):
+    """(Parquet file, JSON sidecar) paths for a Packet Trace."""
+    base = os.path.splitext(trace_path)[0]
+    return base + '.parquet', base + '.cache.json'
+
+
+def file_sha1(path, block_size=1 << 20):
+    """SHA-1 of a file's contents, read in blocks."""
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _write_meta(meta_path, meta):
+    with atomic_path(meta_path) as tmp_path, open(tmp_path, 'w') as f:
+        json.dump(meta, f, indent=2)
+
+
+def cache_is_fresh(trace_path):
+    """True when the Parquet cache for trace_path matches the current CSV.
+
+    Size and mtime are checked first. If only the mtime moved (the file was
+    touched or copied), the content hash decides and the sidecar is refreshed
+    so the next check is cheap again.
+    """
+    cache_path, meta_path = cache_paths(trace_path)
+    meta = _read_meta(meta_path)
+    if meta is None or meta.get('version') != CACHE_VERSION or not os.path.exists(cache_path):
+        return False
+
+    stat = os.stat(trace_path)
+    if meta.get('size') != stat.st_size:
+        return False
+    if meta.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    if meta.get('sha1') != file_sha1(trace_path):
+        return False
+
+    meta['mtime_ns'] = stat.st_mtime_ns
+    _write_meta(meta_path, meta)
+    return True
+
+
+def build_cache(trace_path, chunksize=DEFAULT_CHUNK_SIZE):
+    """Convert a Packet Trace CSV into its Parquet cache and return the cache path.
+
+    The CSV is streamed chunk by chunk into row groups, so building the cache
+    needs no more memory than the streaming counter.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    cache_path, meta_path = cache_paths(trace_path)
+    stat = os.stat(trace_path)
+    schema = pa.schema([(column, pa.dictionary(pa.int32(), pa.string())) for column in REQUIRED_COLUMNS])
+
+    # Write to a temporary file first so an interrupted or concurrent build never looks valid
+    with atomic_path(cache_path) as tmp_path:
+        with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+            for chunk in iter_trace_chunks(trace_path, chunksize):
+                arrays = [pa.array(chunk[column], type=pa.string(), from_pandas=True).dictionary_encode()
+                          for column in REQUIRED_COLUMNS]
+                writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+
+    _write_meta(meta_path, {
+        'version': CACHE_VERSION,
+        'source': os.path.basename(trace_path),
+        'size': stat.st_size,
+        'mtime_ns': stat.st_mtime_ns,
+        'sha1': file_sha1(trace_path),
+        'columns': REQUIRED_COLUMNS,
+    })
+    return cache_path
+
+
+def ensure_cache(trace_path):
+    """Path of an up-to-date Parquet cache for trace_path, or None without pyarrow."""
+    if not have_pyarrow():
+        return None
+    if not cache_is_fresh(trace_path):
+        with stage('build_cache'):
+            build_cache(trace_path)
+    return cache_paths(trace_path)[0]
+
+
+def load_cached_trace(trace_path, columns=None):
+    """Packet Trace frame read from the Parquet cache (built or refreshed as needed).
+
+    Node-ID and packet-type columns come back as pandas categoricals.
+    """
+    cache_path = ensure_cache(trace_path)
+    if cache_path is None:
+        df = load_trace(trace_path)
+        return df if columns is None else df[columns]
+
+    with stage('read_parquet') as info:
+        df = pd.read_parquet(cache_path, columns=columns)
+        info['rows'] = len(df)
+    return df
+
+
+def iter_cached_trace_chunks(trace_path, chunksize=DEFAULT_CHUNK_SIZE, columns=None):
+    """Stream the cached trace in frames of at most chunksize rows."""
+    cache_path = ensure_cache(trace_path)
+    if cache_path is None:
+        for chunk in iter_trace_chunks(trace_path, chunksize):
+            yield chunk if columns is None else chunk[columns]
+        return
+
+    import pyarrow.parquet as pq
+    for batch in pq.ParquetFile(cache_path).iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
@@ -0,0 +1,328 @@
+"""Single-pass per-sensor counters from a NetSim ``Packet Trace.csv``.
+
+Every counter used by the feature-count and plot scripts (DAO/DIO sent and
+received, sensing packets received) comes out of one aggregation over the
+successful packets, instead of one filtered pass per counter. The trace
+columns are read as categoricals, so every node ID and packet type string is
+parsed once. The aggregation itself is an integer bincount over the codes
+(see nodes); node names are only parsed and renamed for the distinct nodes
+of the final table.
+
+Two CSV engines can parse a trace: pandas' C parser, which runs on one
+thread, and pyarrow's multithreaded reader, which reads only the required
+columns and dictionary-encodes them as it parses (they arrive as
+categoricals without a second pass). pyarrow is the default when it is
+installed; otherwise every reader falls back to pandas.
+"""
+import os
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+
+from netsim_pipeline.dataio import atomic_path, have_pyarrow
+from netsim_pipeline.instrument import stage
+from netsim_pipeline.nodes import NodeKind, intern, lookup, node_kinds, node_numbers, sensor_labels
+
+# Columns every Packet Trace must provide
+REQUIRED_COLUMNS = ['PACKET_TYPE', 'CONTROL_PACKET_TYPE/APP_NAME', 'SOURCE_ID', 'RECEIVER_ID', 'PACKET_STATUS']
+
+# Per-sensor counters, in the order they are written to Sensor_Message_Counts.csv
+COUNT_COLUMNS = ['DAO_Sent', 'DAO_Received', 'DIO_Sent', 'DIO_Received', 'Packet_Received']
+
+# Read dtypes of the required columns: a handful of distinct strings each, so
+# categoricals keep one copy of every string and int codes per row
+TRACE_DTYPES = dict.fromkeys(REQUIRED_COLUMNS, 'category')
+
+# Counter families, in the order of their integer codes
+FAMILIES = ['DAO', 'DIO', 'Packet']
+
+# Node kinds that are infrastructure, not sensors
+NON_SENSOR_KINDS = [NodeKind.SINK, NodeKind.ROUTER]
+
+# Name of the per-seed counts file written next to each Packet Trace
+COUNTS_FILE_NAME = 'Sensor_Message_Counts.csv'
+
+# Rows parsed per chunk when a trace is streamed instead of loaded whole
+DEFAULT_CHUNK_SIZE = 500_000
+
+# CSV parsers that can read a Packet Trace
+CSV_ENGINES = ['pandas', 'pyarrow']
+
+# Parser used when none is given: the multithreaded one when pyarrow is installed
+DEFAULT_CSV_ENGINE = 'pyarrow' if have_pyarrow() else 'pandas'
+
+
+def check_columns(columns, where=''):
+    """Raise ValueError if a trace's columns lack any of REQUIRED_COLUMNS."""
+    missing = set(REQUIRED_COLUMNS).difference(columns)
+    if missing:
+        raise ValueError(f"Required columns are missing from the DataFrame{' in ' + where if where else ''}: {sorted(missing)}")
+
+
+def aggregate_trace(df):
+    """Count sent/received packets per (counter family, node ID).
+
+    Returns a Series indexed by (metric, node ID), e.g. ('DAO_Sent',
+    'SENSOR-5'). Partial results from several frames can simply be added
+    together before calling finalize_counts.
+    """
+    with stage('aggregate', len(df)):
+        return _aggregate(df)
+
+
+def _aggregate(df):
+    family = packet_families(df)
+
+    # One bincount per direction covers every counter at once
+    partial = pd.concat([_count_by_node(family, df['SOURCE_ID'], '_Sent'),
+                         _count_by_node(family, df['RECEIVER_ID'], '_Received')])
+    partial.index.names = ['metric', 'node']
+    return partial
+
+
+def packet_families(df):
+    """Code of the counter family (index into FAMILIES) of each trace row, -1 for rows that feed none.
+
+    Only successful DAO and DIO control packets and successful sensing
+    packets belong to a family.
+    """
+    # Intern the packet columns; every string test below runs once per distinct value
+    status_codes, statuses = intern(df['PACKET_STATUS'])
+    type_codes, packet_types = intern(df['PACKET_TYPE'])
+    control_codes, control_types = intern(df['CONTROL_PACKET_TYPE/APP_NAME'])
+
+    # Tag each successful packet with the code of the counter family it feeds (-1 for none)
+    successful = lookup(status_codes, statuses == 'Successful', False)
+    is_control = lookup(type_codes, packet_types == 'Control_Packet', False)
+    is_sensing = lookup(type_codes, packet_types == 'Sensing', False)
+    control_family = lookup(control_codes, np.select([control_types == 'DAO', control_types == 'DIO'], [0, 1], -1), -1)
+    family = np.where(is_control, control_family, np.where(is_sensing, FAMILIES.index('Packet'), -1))
+    family[~successful] = -1
+    return family
+
+
+def _count_by_node(family, ids, suffix):
+    codes, nodes = intern(ids)
+    keep = (family >= 0) & (codes >= 0)
+    counts = np.bincount(family[keep] * len(nodes) + codes[keep], minlength=len(FAMILIES) * len(nodes))
+    counts = counts.reshape(len(FAMILIES), len(nodes))
+    family_index, node_index = np.nonzero(counts)
+    metrics = np.array([name + suffix for name in FAMILIES], dtype=object)
+    return pd.Series(counts[family_index, node_index],
+                     index=pd.MultiIndex.from_arrays([metrics[family_index], np.asarray(nodes, dtype=object)[node_index]]))
+
+
+def finalize_counts(partial):
+    """Turn aggregate_trace output into the per-sensor counts table.
+
+    The result is indexed by abbreviated sensor name ('S-5'), sorted by
+    sensor number, with one integer column per entry of COUNT_COLUMNS.
+    """
+    if partial.empty:
+        return pd.DataFrame(columns=COUNT_COLUMNS, dtype=int)
+    with stage('finalize'):
+        return _finalize(partial)
+
+
+def _finalize(partial):
+    partial = partial.groupby(level=['metric', 'node']).sum()
+    counts = partial.unstack('metric', fill_value=0).reindex(columns=COUNT_COLUMNS, fill_value=0)
+
+    # Drop sink nodes and routers and sort by sensor number; only the distinct node IDs are parsed
+    kinds = node_kinds(counts.index)
+    counts = counts[~np.isin(kinds, NON_SENSOR_KINDS)]
+    counts = counts.iloc[np.argsort(node_numbers(counts.index), kind='stable')]
+
+    # Abbreviated sensor names only for the output table
+    counts.index = sensor_labels(counts.index)
+    counts.index.name = None
+    counts.columns.name = None
+    return counts.astype(int)
+
+
+def sensor_numbers(labels):
+    """Numeric part of sensor labels such as 'S-5' (NaN when there is none)."""
+    return node_numbers(labels)
+
+
+def extract_counts(df):
+    """Per-sensor counts table for an in-memory Packet Trace frame."""
+    check_columns(df.columns)
+    return finalize_counts(aggregate_trace(df))
+
+
+def read_trace_header(file_path):
+    """Column names of a Packet Trace CSV, without reading any rows."""
+    return pd.read_csv(file_path, encoding='latin1', nrows=0).columns
+
+
+def csv_engine(engine=None):
+    """The CSV_ENGINES parser to use for engine (None for the default); pyarrow falls back to pandas."""
+    if engine is None:
+        return DEFAULT_CSV_ENGINE
+    if engine not in CSV_ENGINES:
+        raise ValueError(f"Unknown CSV engine {engine!r}; expected one of {CSV_ENGINES}")
+    return engine if engine != 'pyarrow' or have_pyarrow() else 'pandas'
+
+
+def _arrow_options():
+    import pyarrow as pa
+    from pyarrow import csv
+
+    # Project the required columns and dictionary-encode them while parsing; empty fields become
+    # missing values, as in pandas
+    return {
+        'read_options': csv.ReadOptions(encoding='latin1', use_threads=True),
+        'convert_options': csv.ConvertOptions(
+            include_columns=REQUIRED_COLUMNS, strings_can_be_null=True,
+            column_types={column: pa.dictionary(pa.int32(), pa.string()) for column in REQUIRED_COLUMNS}),
+    }
+
+
+def _arrow_chunks(file_path, chunksize):
+    import pyarrow as pa
+    from pyarrow import csv
+
+    # The streaming reader yields record batches of its own block size; regroup them into chunksize rows
+    reader = csv.open_csv(file_path, **_arrow_options())
+    pending, rows = [], 0
+    for batch in reader:
+        pending.append(batch)
+        rows += batch.num_rows
+        while rows >= chunksize:
+            table = pa.Table.from_batches(pending, reader.schema)
+            yield table.slice(0, chunksize).to_pandas()
+            rest = table.slice(chunksize)
+            pending, rows = rest.to_batches(), rest.num_rows
+    if rows:
+        yield pa.Table.from_batches(pending, reader.schema).to_pandas()
+
+
+def load_trace(file_path, engine=None):
+    """Read the columns the counters need from a Packet Trace CSV, with the given CSV engine."""
+    check_columns(read_trace_header(file_path), file_path)
+    with stage('read_csv') as info:
+        if csv_engine(engine) == 'pyarrow':
+            from pyarrow import csv
+            df = csv.read_csv(file_path, **_arrow_options()).to_pandas()
+        else:
+            df = pd.read_csv(file_path, encoding='latin1', usecols=REQUIRED_COLUMNS, dtype=TRACE_DTYPES)
+        info['rows'] = len(df)
+    return df
+
+
+def iter_trace_chunks(file_path, chunksize=DEFAULT_CHUNK_SIZE, engine=None):
+    """Stream the needed columns of a Packet Trace CSV in frames of chunksize rows."""
+    check_columns(read_trace_header(file_path), file_path)
+    if csv_engine(engine) == 'pyarrow':
+        reader = nullcontext(_arrow_chunks(file_path, chunksize))
+    else:
+        reader = pd.read_csv(file_path, encoding='latin1', usecols=REQUIRED_COLUMNS, dtype=TRACE_DTYPES,
+                             chunksize=chunksize)
+    with reader as chunks:
+        while True:
+            # Time the parsing of each chunk, not the consumer's work between chunks
+            with stage('read_csv') as info:
+                chunk = next(chunks, None)
+                info['rows'] = None if chunk is None else len(chunk)
+            if chunk is None:
+                return
+            yield chunk
+
+
+def fold_chunk_counts(chunks):
+    """Per-sensor counts folded over an iterable of trace frames.
+
+    Only one chunk plus the (metric, node) running totals are held in memory,
+    so peak usage does not grow with the length of the trace.
+    """
+    partial = None
+    for chunk in chunks:
+        chunk_counts = aggregate_trace(chunk)
+        partial = chunk_counts if partial is None else partial.add(chunk_counts, fill_value=0)
+    return finalize_counts(partial if partial is not None else pd.Series(dtype=int))
+
+
+def stream_trace_counts(file_path, chunksize=DEFAULT_CHUNK_SIZE, engine=None):
+    """Per-sensor counts of a Packet Trace CSV read in chunks of chunksize rows."""
+    return fold_chunk_counts(iter_trace_chunks(file_path, chunksize, engine))
+
+
+def iter_trace_frames(file_path, chunksize=None, cache=False, engine=None):
+    """The frames of a Packet Trace CSV: the whole trace, or chunks of chunksize rows.
+
+    With cache set they are read from the Parquet cache kept next to the CSV
+    (see trace_cache); otherwise the CSV is parsed with the given engine.
+    """
+    if cache:
+        # Imported here because trace_cache builds on this module
+        from netsim_pipeline.trace_cache import iter_cached_trace_chunks, load_cached_trace
+        if chunksize:
+            return iter_cached_trace_chunks(file_path, chunksize)
+        return iter([load_cached_trace(file_path)])
+    if chunksize:
+        return iter_trace_chunks(file_path, chunksize, engine)
+    return iter([load_trace(file_path, engine)])
+
+
+def extract_trace_counts(file_path, chunksize=None, cache=False, engine=None):
+    """Read a Packet Trace CSV and return its per-sensor counts table.
+
+    With chunksize set the trace is streamed (see fold_chunk_counts) instead
+    of being loaded in one frame. With cache set it is read from the Parquet
+    cache kept next to the CSV (see trace_cache); engine picks the CSV parser.
+    """
+    return fold_chunk_counts(iter_trace_frames(file_path, chunksize, cache, engine))
+
+
+def to_sensor_message_counts(counts):
+    """Lay a counts table out like Sensor_Message_Counts.csv (metrics as rows)."""
+    table = counts.copy()
+    table.index = ['Sensor' + label.split('-')[1] for label in table.index]
+    return table.T
+
+
+def from_sensor_message_counts(table):
+    """Inverse of to_sensor_message_counts."""
+    counts = table.T.reindex(columns=COUNT_COLUMNS, fill_value=0)
+    counts.index = ['S-' + str(label)[len('Sensor'):] for label in counts.index]
+    return counts.fillna(0).astype(int)
+
+
+def write_seed_counts(counts, seed_path):
+    """Save a counts table as the seed's Sensor_Message_Counts.csv and return its path."""
+    output_file_path = os.path.join(seed_path, COUNTS_FILE_NAME)
+    with stage('write_counts', len(counts)), atomic_path(output_file_path) as temp_path:
+        to_sensor_message_counts(counts).to_csv(temp_path)
+    return output_file_path
+
+
+def seed_counts(seed_path, trace_name='Packet Trace.csv', chunksize=None, cache=False):
+    """Per-sensor counts for a seed folder.
+
+    Reuses the seed's Sensor_Message_Counts.csv when it is at least as new as
+    the Packet Trace, so the plot scripts do not parse the trace again after
+    the feature-count script has run.
+    """
+    trace_path = os.path.join(seed_path, trace_name)
+    counts_path = os.path.join(seed_path, COUNTS_FILE_NAME)
+    if os.path.exists(counts_path) and (not os.path.exists(trace_path)
+                                        or os.path.getmtime(counts_path) >= os.path.getmtime(trace_path)):
+        return from_sensor_message_counts(pd.read_csv(counts_path, index_col=0))
+    return extract_trace_counts(trace_path, chunksize, cache)
+
+
+def read_seed_frames(task, chunksize=None, cache=False, engine=None):
+    """Pipeline read step: the frames of a seed's Packet Trace (see iter_trace_frames)."""
+    return iter_trace_frames(os.path.join(task.seed_path, 'Packet Trace.csv'), chunksize, cache, engine)
+
+
+def count_seed_frames(task, frames):
+    """Pipeline process step: write a seed's Sensor_Message_Counts.csv from its trace frames and return its path."""
+    return write_seed_counts(fold_chunk_counts(frames), task.seed_path)
+
+
+def count_seed(task, chunksize=None, cache=False, engine=None):
+    """Runner task: write Sensor_Message_Counts.csv for one seed and return its path."""
+    return count_seed_frames(task, read_seed_frames(task, chunksize, cache, engine))
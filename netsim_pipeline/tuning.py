@@ -0,0 +1,150 @@
+"""Cross-validated hyperparameter search over the registered classifiers.
+
+The training data is converted to contiguous float arrays and split into
+stratified folds once; every candidate of every model reuses the same arrays
+and fold indices. Candidates come from a grid or a random sample of
+SEARCH_SPACES and are scored fold by fold on a process pool. After each
+round only the best 1/eta of the candidates move on to the next fold
+(successive halving over folds), so clearly bad settings are dropped after
+one or two fits instead of a full cross-validation.
+
+The winner of each model is refit on all training data and can be saved as
+a regular model artifact, so Predict.py and the scoring service use it as
+they use the default models.
+"""
+import math
+import time
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import ParameterGrid, ParameterSampler, StratifiedKFold
+
+from netsim_pipeline.artifacts import save_model
+from netsim_pipeline.classifiers import make_model
+from netsim_pipeline.instrument import stage
+
+# Hyperparameters searched for each classifier
+SEARCH_SPACES = {
+    'knn': {'n_neighbors': [1, 3, 5, 7, 9, 15, 25], 'weights': ['uniform', 'distance'], 'p': [1, 2]},
+    'lr': {'C': [0.01, 0.1, 1.0, 10.0, 100.0], 'class_weight': [None, 'balanced']},
+    'nb': {'var_smoothing': [1e-11, 1e-9, 1e-7, 1e-5, 1e-3, 1e-1]},
+    'svm': {'C': [0.01, 0.1, 1.0, 10.0, 100.0], 'kernel': ['linear', 'rbf'], 'gamma': ['scale']},
+}
+
+# Columns of the timing/score table
+RESULT_COLUMNS = ['model', 'params', 'folds', 'mean_score', 'std_score', 'fit_seconds', 'rank', 'pruned_after']
+
+
+def make_folds(y, n_splits=5, seed=42):
+    """Stratified (train, test) index arrays, computed once and shared by every candidate.
+
+    The fold count is clamped to the size of the smallest class; a class with
+    fewer than two members cannot be cross-validated and raises ValueError.
+    """
+    y = np.asarray(y)
+    class_sizes = np.bincount(pd.factorize(y)[0])
+    if len(class_sizes) < 2:
+        raise ValueError(f"Cross-validation needs at least two classes; the training labels only hold {np.unique(y)}")
+    if class_sizes.min() < 2:
+        raise ValueError(f"Cross-validation needs at least two rows of every class; the smallest class has "
+                         f"{class_sizes.min()}")
+    # No more folds than members of the smallest class
+    n_splits = max(2, min(n_splits, int(class_sizes.min())))
+    return list(StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=seed).split(np.zeros(len(y)), y))
+
+
+def candidates(name, search='grid', n_iter=20, seed=42):
+    """Parameter dicts to try for a model: the full grid or n_iter random draws from it."""
+    space = SEARCH_SPACES[name]
+    if search == 'grid':
+        return list(ParameterGrid(space))
+    if search == 'random':
+        total = len(ParameterGrid(space))
+        return list(ParameterSampler(space, n_iter=min(n_iter, total), random_state=seed))
+    raise ValueError(f"Unknown search {search!r}; expected 'grid' or 'random'")
+
+
+def _score_fold(name, params, X, y, train, test, scorer):
+    start = time.perf_counter()
+    clf = make_model(name).set_params(**params)
+    clf.fit(X[train], y[train])
+    return scorer(clf, X[test], y[test]), time.perf_counter() - start
+
+
+def search_model(name, X, y, folds, search='grid', n_iter=20, scoring='f1', eta=2, min_candidates=2,
+                 parallel=None, seed=42):
+    """Successive-halving cross-validation of one model's candidates.
+
+    Every round scores the surviving candidates on the next fold; afterwards
+    only the best ceil(n / eta) (at least min_candidates) go on. Returns the
+    timing/score table of all candidates, best first.
+    """
+    scorer = get_scorer(scoring)
+    parallel = parallel or Parallel(n_jobs=1)
+    trials = [{'params': params, 'scores': [], 'seconds': 0.0, 'pruned_after': None}
+              for params in candidates(name, search, n_iter, seed)]
+
+    alive = list(range(len(trials)))
+    for fold, (train, test) in enumerate(folds):
+        with stage(f'cv_{name}', len(alive) * len(train)):
+            results = parallel(delayed(_score_fold)(name, trials[i]['params'], X, y, train, test, scorer)
+                               for i in alive)
+        for i, (score, seconds) in zip(alive, results):
+            trials[i]['scores'].append(score)
+            trials[i]['seconds'] += seconds
+
+        # Keep the best candidates by mean score so far; drop the rest
+        if fold < len(folds) - 1:
+            alive.sort(key=lambda i: np.mean(trials[i]['scores']), reverse=True)
+            keep = max(min_candidates, math.ceil(len(alive) / eta))
+            for i in alive[keep:]:
+                trials[i]['pruned_after'] = fold + 1
+            alive = alive[:keep]
+
+    table = pd.DataFrame([{
+        'model': name,
+        'params': trial['params'],
+        'folds': len(trial['scores']),
+        'mean_score': np.mean(trial['scores']),
+        'std_score': np.std(trial['scores']),
+        'fit_seconds': trial['seconds'],
+        'pruned_after': trial['pruned_after'],
+    } for trial in trials])
+    # Candidates that survived every fold rank first, then by score
+    table = table.sort_values(['folds', 'mean_score'], ascending=False, ignore_index=True)
+    table['rank'] = np.arange(1, len(table) + 1)
+    return table[RESULT_COLUMNS]
+
+
+def tune_models(names, X_train, y_train, search='grid', n_iter=20, n_splits=5, scoring='f1', eta=2,
+                workers=None, seed=42):
+    """Search every named model on shared folds and refit each winner on all data.
+
+    Returns (table, best) where table holds every candidate of every model and
+    best is {name: (fitted estimator, params, cv score, search seconds)}.
+    """
+    # Preprocess once: contiguous float features, integer labels and the fold indices
+    X = np.ascontiguousarray(X_train, dtype=float)
+    y = np.asarray(y_train)
+    folds = make_folds(y, n_splits, seed)
+
+    tables, best = [], {}
+    with Parallel(n_jobs=workers or -1) as parallel:
+        for name in names:
+            start = time.perf_counter()
+            table = search_model(name, X, y, folds, search, n_iter, scoring, eta, parallel=parallel, seed=seed)
+            params = table.loc[0, 'params']
+            with stage(f'refit_{name}', len(X)):
+                clf = make_model(name).set_params(**params).fit(X_train, y_train)
+            best[name] = (clf, params, table.loc[0, 'mean_score'], time.perf_counter() - start)
+            tables.append(table)
+    return pd.concat(tables, ignore_index=True), best
+
+
+def save_best(best, feature_columns, model_dir, scoring='f1'):
+    """Save each tuned winner as a new artifact version: {name: version folder}."""
+    return {name: save_model(clf, name, feature_columns, model_dir, tuned_params=params,
+                             cv_score=round(float(score), 6), cv_scoring=scoring, search_seconds=round(seconds, 3))
+            for name, (clf, params, score, seconds) in best.items()}
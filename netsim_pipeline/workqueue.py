@@ -0,0 +1,317 @@
+"""Coordinator/worker execution of a sweep through a shared SQLite work queue.
+
+runner.run_tasks spreads the (scenario, seed) tasks over the cores of one
+machine. For sweeps that outgrow a box, a coordinator puts the same tasks
+into a WorkQueue, a SQLite file on storage every node can reach (next to the
+Test-Scenarios tree by default). Any number of workers on any node then
+pull tasks from it:
+
+- a worker leases one task at a time; the lease expires after
+  lease_seconds unless the worker's heartbeat renews it, so a task held by a
+  crashed or disconnected worker goes back to the queue
+- a failed or expired attempt is retried until max_attempts, then the task
+  is marked failed with the last error
+- tasks are stored by scenario and seed, not by path; each worker resolves
+  them against its own mount of the Test-Scenarios tree
+- the task functions write their outputs atomically (dataio.atomic_path), so
+  a retried or duplicated task just rewrites the same files
+
+The larger traces are leased first, and counting tasks before plotting ones.
+The coordinator waits until no task is pending or leased and then merges the
+per-seed counts into the normalized dataset (merge.merge_tables).
+
+SQLite's file locking is what makes the lease atomic; on network file
+systems whose locking is unreliable, put the queue on a local disk of the
+coordinator host and mount it on the workers.
+"""
+import importlib
+import json
+import os
+import socket
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import closing, contextmanager
+from multiprocessing import Process
+
+from netsim_pipeline.runner import SeedTask, TaskResult, run_one
+
+# Runner task function of each task kind (module:function), in lease priority order
+TASK_KINDS = {
+    'count': 'netsim_pipeline.trace_features:count_seed',
+    'count_graph': 'netsim_pipeline.graph_features:count_graph_seed',
+    'graph': 'netsim_pipeline.graph_features:graph_seed',
+    'plot': 'netsim_pipeline.plots:render_seed',
+}
+
+# Queue file kept in the scenarios base folder
+QUEUE_FILE_NAME = '.sweep_queue.sqlite'
+
+DEFAULT_LEASE_SECONDS = 300
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Task states; pending and leased tasks are unfinished
+STATUSES = ['pending', 'leased', 'done', 'failed']
+
+# A task handed to a worker by lease
+LeasedTask = namedtuple('LeasedTask', ['id', 'kind', 'scenario', 'seed', 'size', 'params', 'attempt'])
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS tasks (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    scenario TEXT NOT NULL,
+    seed TEXT NOT NULL,
+    size INTEGER,
+    priority INTEGER NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    value TEXT,
+    error TEXT,
+    seconds REAL,
+    UNIQUE (kind, scenario, seed)
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+'''
+
+
+def task_function(kind):
+    """Runner task function of a TASK_KINDS kind, imported on first use."""
+    if kind not in TASK_KINDS:
+        raise ValueError(f"Unknown task kind {kind!r}; expected one of {list(TASK_KINDS)}")
+    module, name = TASK_KINDS[kind].split(':')
+    return getattr(importlib.import_module(module), name)
+
+
+def task_outputs(kind, params=None):
+    """Seed-folder file names a task kind writes, for the incremental-rebuild manifest."""
+    from netsim_pipeline.graph_features import GRAPH_FILE_NAME
+    from netsim_pipeline.trace_features import COUNTS_FILE_NAME
+
+    if kind == 'plot':
+        from netsim_pipeline.plots import CHARTS
+        return [CHARTS[chart][0] for chart in (params or {}).get('charts', CHARTS)]
+    return {'count': [COUNTS_FILE_NAME], 'count_graph': [COUNTS_FILE_NAME, GRAPH_FILE_NAME],
+            'graph': [GRAPH_FILE_NAME]}[kind]
+
+
+def default_worker_id():
+    """Worker name used when none is given: host name and process ID."""
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+class WorkQueue:
+    """Sweep tasks and their lease, retry and result state in a SQLite file.
+
+    Every call opens its own short transaction, so one queue file can be
+    shared by processes on many machines and by a worker's heartbeat thread.
+    """
+
+    def __init__(self, path, timeout=60.0):
+        self.path = path
+        self.timeout = timeout
+        with closing(sqlite3.connect(self.path, timeout=self.timeout)) as db:
+            db.executescript(_SCHEMA)
+
+    @contextmanager
+    def _transaction(self, immediate=False):
+        with closing(sqlite3.connect(self.path, timeout=self.timeout, isolation_level=None)) as db:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot lease the same task
+            db.execute('BEGIN IMMEDIATE' if immediate else 'BEGIN')
+            try:
+                yield db
+            except BaseException:
+                db.execute('ROLLBACK')
+                raise
+            db.execute('COMMIT')
+
+    @property
+    def base_path(self):
+        """Test-Scenarios folder the coordinator submitted the tasks from (None before any submit)."""
+        with self._transaction() as db:
+            row = db.execute("SELECT value FROM meta WHERE key = 'base_path'").fetchone()
+        return row[0] if row else None
+
+    def submit(self, kind, tasks, params=None, max_attempts=DEFAULT_MAX_ATTEMPTS, base_path=None, resume=False):
+        """Queue a kind of task for every runner.SeedTask; returns the number of tasks (re)queued.
+
+        params are the task function's keyword arguments and must be JSON
+        serializable. A task already in the queue is reset to pending, or
+        with resume kept in its current state, so a restarted coordinator
+        does not redo finished work.
+        """
+        task_function(kind)
+        params_json = json.dumps(params or {}, sort_keys=True)
+        priority = list(TASK_KINDS).index(kind)
+        rows = [(kind, task.scenario, task.seed, task.size, priority, params_json, max_attempts) for task in tasks]
+        insert = ('INSERT INTO tasks (kind, scenario, seed, size, priority, params, max_attempts) '
+                  'VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (kind, scenario, seed) DO ')
+        with self._transaction(immediate=True) as db:
+            if base_path is not None:
+                db.execute("INSERT OR REPLACE INTO meta VALUES ('base_path', ?)", (base_path,))
+            before = db.total_changes
+            if resume:
+                db.executemany(insert + 'NOTHING', rows)
+            else:
+                db.executemany(insert + 'UPDATE SET '
+                               "size = excluded.size, params = excluded.params, status = 'pending', attempts = 0, "
+                               'max_attempts = excluded.max_attempts, worker = NULL, lease_expires = NULL, '
+                               'value = NULL, error = NULL, seconds = NULL', rows)
+            return db.total_changes - before
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Take the next task for worker, or None when nothing is available right now.
+
+        Pending tasks and tasks whose lease expired are eligible; an expired
+        task that used up its attempts is marked failed instead.
+        """
+        now = time.time()
+        with self._transaction(immediate=True) as db:
+            db.execute("UPDATE tasks SET status = 'failed', error = 'lease expired on ' || worker "
+                       "WHERE status = 'leased' AND lease_expires < ? AND attempts >= max_attempts", (now,))
+            row = db.execute("SELECT id, kind, scenario, seed, size, params, attempts FROM tasks "
+                             "WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                             "ORDER BY priority, COALESCE(size, -1) DESC, id LIMIT 1", (now,)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE tasks SET status = 'leased', worker = ?, lease_expires = ?, attempts = attempts + 1 "
+                       "WHERE id = ?", (worker, now + lease_seconds, row[0]))
+        task_id, kind, scenario, seed, size, params, attempts = row
+        return LeasedTask(task_id, kind, scenario, seed, size, json.loads(params), attempts + 1)
+
+    def renew(self, task_id, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Extend worker's lease of a task; False if the lease was lost to another worker."""
+        with self._transaction(immediate=True) as db:
+            cursor = db.execute("UPDATE tasks SET lease_expires = ? WHERE id = ? AND worker = ? AND status = 'leased'",
+                                (time.time() + lease_seconds, task_id, worker))
+            return cursor.rowcount == 1
+
+    def complete(self, task_id, worker, value, seconds):
+        """Mark worker's task done with its JSON-serializable result; False if the lease was lost."""
+        with self._transaction(immediate=True) as db:
+            cursor = db.execute("UPDATE tasks SET status = 'done', value = ?, error = NULL, seconds = ?, "
+                                "lease_expires = NULL WHERE id = ? AND worker = ? AND status = 'leased'",
+                                (json.dumps(value, default=str), seconds, task_id, worker))
+            return cursor.rowcount == 1
+
+    def fail(self, task_id, worker, error, seconds):
+        """Record a failed attempt: the task is retried, or failed once it used up its attempts."""
+        with self._transaction(immediate=True) as db:
+            cursor = db.execute("UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN 'failed' "
+                                "ELSE 'pending' END, error = ?, seconds = ?, lease_expires = NULL "
+                                "WHERE id = ? AND worker = ? AND status = 'leased'",
+                                (error, seconds, task_id, worker))
+            return cursor.rowcount == 1
+
+    def progress(self, kinds=None):
+        """{status: number of tasks} over STATUSES, optionally for some task kinds only."""
+        query, args = 'SELECT status, COUNT(*) FROM tasks', []
+        if kinds:
+            query += f" WHERE kind IN ({', '.join('?' * len(kinds))})"
+            args = list(kinds)
+        with self._transaction() as db:
+            counts = dict(db.execute(query + ' GROUP BY status', args).fetchall())
+        return {status: counts.get(status, 0) for status in STATUSES}
+
+    def unfinished(self, kinds=None):
+        """Number of pending or leased tasks."""
+        progress = self.progress(kinds)
+        return progress['pending'] + progress['leased']
+
+    def results(self, kind, base_path=None):
+        """runner.TaskResults of a task kind's finished tasks, with seed paths under base_path."""
+        base_path = base_path or self.base_path
+        with self._transaction() as db:
+            rows = db.execute("SELECT scenario, seed, size, status, value, error, seconds FROM tasks "
+                              "WHERE kind = ? AND status IN ('done', 'failed') ORDER BY id", (kind,)).fetchall()
+        return [TaskResult(SeedTask(scenario, seed, os.path.join(base_path, scenario, seed), size), status == 'done',
+                           json.loads(value) if value is not None else None, error, seconds or 0.0)
+                for scenario, seed, size, status, value, error, seconds in rows]
+
+
+@contextmanager
+def _heartbeat(queue, task_id, worker, lease_seconds):
+    # Renew the lease a few times per lease period while the task runs
+    stop = threading.Event()
+
+    def beat():
+        while not stop.wait(lease_seconds / 3):
+            if not queue.renew(task_id, worker, lease_seconds):
+                return
+
+    thread = threading.Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
+
+
+def run_worker(queue_path, base_path=None, worker=None, lease_seconds=DEFAULT_LEASE_SECONDS, poll_interval=2.0,
+               idle_timeout=None, max_tasks=None):
+    """Lease and run queued tasks until none is unfinished; returns the number of tasks run.
+
+    base_path is this node's mount of the Test-Scenarios tree (default: the
+    coordinator's). While other workers still hold leases, the worker keeps
+    polling, so it can pick up their retries; idle_timeout (seconds) ends it
+    earlier, and max_tasks after that many tasks.
+    """
+    queue = WorkQueue(queue_path)
+    worker = worker or default_worker_id()
+    ran = 0
+    idle_since = time.monotonic()
+    while max_tasks is None or ran < max_tasks:
+        leased = queue.lease(worker, lease_seconds)
+        if leased is None:
+            if queue.unfinished() == 0:
+                break
+            if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                break
+            time.sleep(poll_interval)
+            continue
+
+        seed_path = os.path.join(base_path or queue.base_path, leased.scenario, leased.seed)
+        task = SeedTask(leased.scenario, leased.seed, seed_path, leased.size)
+        with _heartbeat(queue, leased.id, worker, lease_seconds):
+            result = run_one(task_function(leased.kind), task, leased.params)
+        if result.ok:
+            queue.complete(leased.id, worker, result.value, result.seconds)
+        else:
+            queue.fail(leased.id, worker, result.error, result.seconds)
+            print(f"{worker}: {leased.kind} {leased.scenario}/{leased.seed} failed "
+                  f"(attempt {leased.attempt}): {result.error.splitlines()[-1]}")
+        ran += 1
+        idle_since = time.monotonic()
+    return ran
+
+
+def start_workers(queue_path, count, base_path=None, worker=None, **kwargs):
+    """Start count run_worker processes on this machine and return them (join them when done).
+
+    Process i leases as '<worker>-<i>', worker defaulting to default_worker_id().
+    """
+    worker = worker or default_worker_id()
+    processes = [Process(target=run_worker, args=(queue_path, base_path), kwargs={'worker': f'{worker}-{i}', **kwargs})
+                 for i in range(count)]
+    for process in processes:
+        process.start()
+    return processes
+
+
+def wait_for(queue, kinds=None, poll_interval=2.0, report=print):
+    """Block until no task of the given kinds is pending or leased; report progress changes."""
+    last = None
+    while True:
+        progress = queue.progress(kinds)
+        if progress != last:
+            report(', '.join(f'{count} {status}' for status, count in progress.items()))
+            last = progress
+        if progress['pending'] + progress['leased'] == 0:
+            return progress
+        time.sleep(poll_interval)